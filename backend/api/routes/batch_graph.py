@@ -0,0 +1,45 @@
+import json
+import logging
+import os
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from backend.models.graph_spec import BatchGraphRequest
+from backend.core.graph_runner import get_compiled_graph, run_graph_batch
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+MAX_BATCH_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+MAX_BATCH_TICKERS = int(os.getenv("BATCH_MAX_TICKERS", "5000"))
+
+@router.post("/execute-graph/batch")
+async def execute_graph_batch(request: BatchGraphRequest):
+    """Runs one GraphSpec template for every ticker and streams results as NDJSON.
+
+    Each line is {"ticker", "status", "result", "error"} and lines are written
+    in completion order, not request order.
+    """
+    tickers = [ticker.strip() for ticker in request.tickers if ticker and ticker.strip()]
+    logger.info(f"Received batch request: {len(tickers)} tickers, concurrency={request.concurrency}")
+
+    if not tickers:
+        raise HTTPException(status_code=400, detail="At least one ticker is required.")
+    if len(tickers) > MAX_BATCH_TICKERS:
+        raise HTTPException(status_code=400, detail=f"Too many tickers (max {MAX_BATCH_TICKERS}).")
+    concurrency = max(1, min(request.concurrency, MAX_BATCH_CONCURRENCY))
+
+    # Validate the template up front so a bad graph is a 400, not a stream of errors
+    try:
+        get_compiled_graph(request.graph)
+    except ValueError as ve:
+        logger.error(f"Graph validation error: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    async def stream_results():
+        async for ticker, result, error in run_graph_batch(request.graph, tickers, concurrency):
+            status = "error" if error is not None or result.get("errors") else "ok"
+            line = {"ticker": ticker, "status": status, "result": result, "error": error}
+            yield json.dumps(line, default=str) + "\n"
+        logger.info(f"Batch of {len(tickers)} tickers finished.")
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,38 @@
+import logging
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
+from backend.models.graph_spec import GraphSpec
+from backend.core.graph_runner import get_compiled_graph
+from backend.core.job_manager import JobManagerNotRunningError, JobQueueFullError, job_manager
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+MAX_WAIT_SECONDS = 60.0
+
+@router.post("/jobs", status_code=202)
+async def submit_job(graph_spec: GraphSpec):
+    """Queues a graph run and returns its job id without waiting for it."""
+    try:
+        get_compiled_graph(graph_spec)
+    except ValueError as ve:
+        logger.error(f"Graph validation error: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    try:
+        record = job_manager.submit(graph_spec)
+    except JobQueueFullError as e:
+        logger.warning(str(e))
+        return JSONResponse(status_code=503, content={"detail": str(e)}, headers={"Retry-After": "5"})
+    except JobManagerNotRunningError as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"job_id": record.job_id, "status": record.status}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0.0, ge=0.0, le=MAX_WAIT_SECONDS)):
+    """Returns the job's status and result. With wait > 0, long-polls until it finishes or the wait expires."""
+    record = await job_manager.wait(job_id, wait)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found or expired.")
+    return record.to_dict()
@@ -0,0 +1,73 @@
+import logging
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from backend.core import metrics
+from backend.core.graph_runner import graph_cache_stats
+from backend.core.job_manager import job_manager
+from backend.utils import fmp_client, llm_client
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- Scrape-time metrics, read from the stats the components already keep ---
+def _cache_lookups():
+    samples = {}
+    for cache_name, stats in (("fmp", fmp_client.cache_stats()), ("llm", llm_client.cache_stats())):
+        for result in ("hits", "stale_hits", "misses"):
+            if result in stats:
+                samples[(cache_name, result)] = stats[result]
+    graph_stats = graph_cache_stats()
+    samples[("graph", "hits")] = graph_stats["hits"]
+    samples[("graph", "misses")] = graph_stats["misses"]
+    return samples
+
+def _cache_hit_ratio():
+    samples = {}
+    for cache_name, stats in (("fmp", fmp_client.cache_stats()), ("llm", llm_client.cache_stats())):
+        if "hit_rate" in stats:
+            samples[(cache_name,)] = stats["hit_rate"]
+    graph_stats = graph_cache_stats()
+    lookups = graph_stats["hits"] + graph_stats["misses"]
+    samples[("graph",)] = graph_stats["hits"] / lookups if lookups else 0.0
+    return samples
+
+def _cache_entries():
+    samples = {(name,): stats["entries"] for name, stats in
+               (("fmp", fmp_client.cache_stats()), ("llm", llm_client.cache_stats())) if "entries" in stats}
+    samples[("graph",)] = graph_cache_stats()["size"]
+    return samples
+
+def _coalesced_requests():
+    stats = fmp_client.cache_stats()
+    return {("singleflight",): stats["singleflight"].get("coalesced", 0),
+            ("profile_batch",): stats["profile_batches"].get("keys", 0)}
+
+def _limiter_concurrency():
+    return {(name,): stats["concurrency_limit"] for name, stats in
+            (("fmp", fmp_client.rate_limiter_stats()), ("openai", llm_client.rate_limiter_stats()))}
+
+def _limiter_throttled():
+    return {(name,): stats["throttled"] for name, stats in
+            (("fmp", fmp_client.rate_limiter_stats()), ("openai", llm_client.rate_limiter_stats()))}
+
+metrics.callback_metric("assetgraph_cache_lookups_total", "Cache lookups by result.",
+                        ["cache", "result"], _cache_lookups, kind="counter")
+metrics.callback_metric("assetgraph_cache_hit_ratio", "Fraction of cache lookups that hit.",
+                        ["cache"], _cache_hit_ratio)
+metrics.callback_metric("assetgraph_cache_entries", "Entries held in the in-memory cache tier.",
+                        ["cache"], _cache_entries)
+metrics.callback_metric("assetgraph_fmp_coalesced_requests_total", "FMP lookups served by another caller's request.",
+                        ["mechanism"], _coalesced_requests, kind="counter")
+metrics.callback_metric("assetgraph_rate_limiter_concurrency_limit", "Current adaptive concurrency limit.",
+                        ["service"], _limiter_concurrency)
+metrics.callback_metric("assetgraph_rate_limiter_throttled_total", "Responses treated as throttling.",
+                        ["service"], _limiter_throttled, kind="counter")
+metrics.callback_metric("assetgraph_job_queue_depth", "Jobs waiting for a worker.",
+                        [], lambda: {(): job_manager.queue_depth()})
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(metrics.render_latest(), media_type=PROMETHEUS_CONTENT_TYPE)
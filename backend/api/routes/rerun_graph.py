@@ -0,0 +1,38 @@
+import logging
+import uuid
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from backend.models.graph_spec import RerunGraphRequest
+from backend.core.graph_runner import rerun_graph
+from backend.engine.run_store import RunNotFoundError
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.post("/execute-graph/rerun")
+async def execute_graph_rerun(request: RerunGraphRequest):
+    """Re-runs an earlier run with a modified spec, executing only what changed.
+
+    Nodes that are new, whose type, params or parents changed, or that failed
+    last time are re-executed along with everything downstream of them. All
+    other nodes reuse their previous output. The response has the same
+    X-Run-Id header as a recorded /execute-graph, so reruns can be chained.
+    """
+    run_id = uuid.uuid4().hex
+    try:
+        result, dirty, reused = await rerun_graph(request.previous_run_id, request.graph, run_id)
+    except RunNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as ve:
+        logger.error(f"Graph validation error: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.exception("Unexpected error during incremental graph execution:")
+        raise HTTPException(status_code=500, detail=f"An unexpected server error occurred: {e}")
+
+    logger.info(f"Rerun {run_id} of {request.previous_run_id}: executed {dirty}, reused {reused}")
+    return JSONResponse(
+        status_code=500 if result.get("errors") else 200,
+        content={"run_id": run_id, "executed_nodes": dirty, "reused_nodes": reused, "result": result},
+        headers={"X-Run-Id": run_id},
+    )
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import logging
+import time
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from backend.models.graph_spec import GraphSpec
+from backend.core.graph_runner import get_compiled_graph, stream_graph
+from backend.core.events import set_event_sink, reset_event_sink
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no", # Stop nginx from buffering the stream
+}
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/execute-graph/stream")
+async def execute_graph_stream(graph_spec: GraphSpec):
+    """Runs the graph and streams server-sent events while it executes.
+
+    Events, in order of appearance:
+      start        right away, with the node ids
+      node_start   when a node begins ({"node", "started_at"})
+      token        each chunk of markdown_report from GenerateLLMReport
+      node_finish  when a node completes ({"node", "finished_at", "duration_ms", "delta"});
+                   the timing is measured around the node's own run
+      result       the final state (or "error" if the run failed unexpectedly)
+    """
+    logger.info(f"Received request to stream graph: {graph_spec.dict()}")
+    try:
+        get_compiled_graph(graph_spec)
+    except ValueError as ve:
+        logger.error(f"Graph validation error: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    async def event_stream():
+        queue: asyncio.Queue = asyncio.Queue()
+        timings = {} # Node id -> its node_end event, sent out with the node's update
+
+        def sink(event: str, data: dict):
+            if event == "node_end":
+                timings[data["node"]] = data
+                return
+            queue.put_nowait((event, data))
+
+        async def run():
+            try:
+                async for kind, payload in stream_graph(graph_spec):
+                    if kind == "update":
+                        timing = timings.pop(payload["node"], {"finished_at": time.time(), "duration_ms": None})
+                        queue.put_nowait(("node_finish", {
+                            **payload,
+                            "finished_at": timing["finished_at"],
+                            "duration_ms": timing["duration_ms"],
+                        }))
+                    else:
+                        queue.put_nowait(("result", payload))
+            except Exception as e:
+                logger.exception("Unexpected error during streamed graph execution:")
+                queue.put_nowait(("error", {"detail": f"An unexpected server error occurred: {e}"}))
+            finally:
+                queue.put_nowait(None) # Sentinel: no more events
+
+        # The run task copies the current context, sink included
+        sink_token = set_event_sink(sink)
+        task = asyncio.create_task(run())
+        reset_event_sink(sink_token)
+
+        try:
+            yield format_sse("start", {"nodes": [node.id for node in graph_spec.nodes]})
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield format_sse(*item)
+        finally:
+            # Client went away before the run finished
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,17 +1,23 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import JSONResponse
 from backend.models.graph_spec import GraphSpec
 from backend.core.graph_runner import run_graph, GraphState
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.post("/execute-graph", response_model=GraphState)
-async def execute_graph(graph_spec: GraphSpec):
+async def execute_graph(graph_spec: GraphSpec, record: bool = Query(False)):
     logger.info(f"Received request to execute graph: {graph_spec.dict()}")
+    # With ?record=true the run is kept under this id so it can be re-run
+    # incrementally via /execute-graph/rerun. Recording streams the run to
+    # collect each node's update, so it is off by default.
+    run_id = uuid.uuid4().hex if record else None
+    headers = {"X-Run-Id": run_id} if run_id else None
     try:
-        result: GraphState = await run_graph(graph_spec)
+        result: GraphState = await run_graph(graph_spec, run_id=run_id)
         logger.info(f"Graph execution finished. Result errors: {result.get('errors')}")
 
         # Check if any errors were recorded in the state
@@ -20,13 +26,15 @@ async def execute_graph(graph_spec: GraphSpec):
             # which now contains the error details.
             return JSONResponse(
                 status_code=500,
-                content=result
+                content=result,
+                headers=headers
             )
         else:
             # Return 200 OK with the successful result
             return JSONResponse(
                 status_code=200,
-                content=result
+                content=result,
+                headers=headers
             )
 
     except ValueError as ve:
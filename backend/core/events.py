@@ -0,0 +1,42 @@
+import contextvars
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Streaming endpoints install a sink for the duration of a graph run. Node
+# tasks inherit it through their context, so nodes can emit events (e.g. LLM
+# tokens) without knowing who is listening. Without a sink, emit is a no-op.
+EventSink = Callable[[str, Dict[str, Any]], None]
+
+_event_sink: contextvars.ContextVar[Optional[EventSink]] = contextvars.ContextVar("event_sink", default=None)
+_current_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_node", default=None)
+
+def set_event_sink(sink: Optional[EventSink]) -> contextvars.Token:
+    return _event_sink.set(sink)
+
+def reset_event_sink(token: contextvars.Token):
+    _event_sink.reset(token)
+
+def streaming_enabled() -> bool:
+    return _event_sink.get() is not None
+
+def set_current_node(node_id: Optional[str]) -> contextvars.Token:
+    return _current_node.set(node_id)
+
+def reset_current_node(token: contextvars.Token):
+    _current_node.reset(token)
+
+def emit(event: str, data: Dict[str, Any]):
+    """Sends an event to the active sink, tagged with the running node's id."""
+    sink = _event_sink.get()
+    if sink is None:
+        return
+    node_id = _current_node.get()
+    if node_id is not None and "node" not in data:
+        data = {"node": node_id, **data}
+    try:
+        sink(event, data)
+    except Exception:
+        # A broken listener must never fail the graph run
+        logger.exception(f"Event sink failed for event '{event}'")
@@ -1,71 +1,167 @@
 import operator # Import operator
-from typing import Dict, Any, Optional, List
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional, List, AsyncIterator, Tuple
 from typing_extensions import TypedDict, Annotated
-from langgraph.channels import LastValue
 from backend.models.graph_spec import GraphSpec
-from langgraph.graph import StateGraph
-from backend.nodes.load_ticker_data import load_ticker_data_node
-from backend.nodes.load_income_statement import load_income_statement_node
-from backend.nodes.load_balance_sheet import load_balance_sheet_node
-from backend.nodes.load_cash_flow import load_cash_flow_node
-from backend.nodes.preprocess_financials import preprocess_financials_node
-from backend.nodes.summarize_income_statement import summarize_income_statement_node
-from backend.nodes.generate_llm_report import generate_llm_report_node
-
-# Define the state schema for the graph
+from backend.core.events import emit, set_current_node, reset_current_node
+from backend.core import metrics
+from backend.engine.graph import Graph, GraphError, dirty_nodes
+from backend.engine.run_store import RunStore
+
+# langgraph and the node modules (which pull in httpx and openai) are imported
+# on first graph build rather than with this module, to keep worker cold starts fast.
+
+# Define the state schema for the graph. Keys without a reducer get LangGraph's
+# default LastValue channel; concurrent writes to the same key in one step are rejected.
 class GraphState(TypedDict):
-    # Ticker being processed - Use Annotated LastValue for concurrency
-    current_ticker: Annotated[Optional[str], LastValue]
+    # Ticker being processed
+    current_ticker: Optional[str]
     # Raw profile data fetched for the ticker (FMP returns list)
-    # Annotate potentially concurrent writes, even if to distinct keys within the step
-    ticker_profile: Annotated[Optional[List[Dict[str, Any]]], LastValue]
+    ticker_profile: Optional[List[Dict[str, Any]]]
     # Raw financial statements (FMP returns list)
-    raw_income_statement: Annotated[Optional[List[Dict[str, Any]]], LastValue]
-    raw_balance_sheet: Annotated[Optional[List[Dict[str, Any]]], LastValue]
-    raw_cash_flow: Annotated[Optional[List[Dict[str, Any]]], LastValue]
+    raw_income_statement: Optional[List[Dict[str, Any]]]
+    raw_balance_sheet: Optional[List[Dict[str, Any]]]
+    raw_cash_flow: Optional[List[Dict[str, Any]]]
     # Processed financial data (example: structure as needed)
-    processed_financials: Annotated[Optional[Dict[str, Any]], LastValue]
+    processed_financials: Optional[Dict[str, Any]]
     # Text summary of income statement
-    income_summary: Annotated[Optional[str], LastValue]
+    income_summary: Optional[str]
     # Final markdown report content
-    markdown_report: Annotated[Optional[str], LastValue]
+    markdown_report: Optional[str]
+    # Ranked output of a ScreenUniverse node
+    screen_results: Optional[Dict[str, Any]]
     # List to accumulate errors from nodes - Use operator.add reducer
     errors: Annotated[List[str], operator.add]
+    # Per-run node params keyed by node id, supplied at invoke time so one
+    # compiled graph can serve every run with the same structure
+    node_params: Optional[Dict[str, Dict[str, Any]]]
 
+# Node type -> (module, factory). Modules are imported when a graph using them is built.
 NODE_TYPE_MAPPING = {
-    "LoadTickerData": load_ticker_data_node,
-    "LoadIncomeStatement": load_income_statement_node,
-    "LoadBalanceSheet": load_balance_sheet_node,
-    "LoadCashFlow": load_cash_flow_node,
-    "PreprocessFinancials": preprocess_financials_node,
-    "SummarizeIncomeStatement": summarize_income_statement_node,
-    "GenerateLLMReport": generate_llm_report_node
+    "LoadTickerData": ("backend.nodes.load_ticker_data", "load_ticker_data_node"),
+    "LoadIncomeStatement": ("backend.nodes.load_income_statement", "load_income_statement_node"),
+    "LoadBalanceSheet": ("backend.nodes.load_balance_sheet", "load_balance_sheet_node"),
+    "LoadCashFlow": ("backend.nodes.load_cash_flow", "load_cash_flow_node"),
+    "PreprocessFinancials": ("backend.nodes.preprocess_financials", "preprocess_financials_node"),
+    "SummarizeIncomeStatement": ("backend.nodes.summarize_income_statement", "summarize_income_statement_node"),
+    "GenerateLLMReport": ("backend.nodes.generate_llm_report", "generate_llm_report_node"),
+    "ScreenUniverse": ("backend.nodes.screen_universe", "screen_universe_node"),
 }
 
-async def run_graph(graph_spec: GraphSpec):
+def get_node_factory(node_type: str) -> Optional[Callable]:
+    """The factory for a node type, importing its module on first use. None if unknown."""
+    entry = NODE_TYPE_MAPPING.get(node_type)
+    if entry is None:
+        return None
+    module_name, factory_name = entry
+    return getattr(importlib.import_module(module_name), factory_name)
+
+# --- Compiled Graph Cache ---
+# Most traffic uses a handful of graph shapes that differ only in params, so
+# compiled graphs are cached on structure (node ids, types and edges) alone.
+GRAPH_CACHE_SIZE = int(os.getenv("GRAPH_CACHE_SIZE", "128"))
+_compiled_graphs: "OrderedDict[str, Any]" = OrderedDict()
+_graph_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def graph_structure_key(graph_spec: GraphSpec) -> str:
+    """Hash of the graph's node ids, node types and edges (params excluded)."""
+    structure = {
+        "nodes": sorted([node.id, node.type] for node in graph_spec.nodes),
+        "edges": sorted({(edge.from_, edge.to) for edge in graph_spec.edges}),
+    }
+    return hashlib.sha256(json.dumps(structure).encode("utf-8")).hexdigest()
+
+def graph_cache_stats() -> Dict[str, int]:
+    return {**_graph_cache_stats, "size": len(_compiled_graphs)}
+
+def _parametrized_node(node_id: str, node_type: str, node_factory):
+    """Wraps a node factory so its params are read from the state at invoke time."""
+    async def node(state: dict) -> dict:
+        params = (state.get("node_params") or {}).get(node_id) or {}
+        token = set_current_node(node_id) # Tags events emitted by the node
+        emit("node_start", {"started_at": time.time()})
+        start = time.perf_counter()
+        status = "error"
+        try:
+            delta = await node_factory(params)(state)
+            # Nodes report failures through the errors key rather than raising
+            status = "error" if (delta or {}).get("errors") else "done"
+            return delta
+        finally:
+            duration = time.perf_counter() - start
+            # Timed here rather than when the update reaches a listener, which can be a step later
+            emit("node_end", {"finished_at": time.time(), "duration_ms": round(duration * 1000, 2)})
+            metrics.NODE_DURATION.observe(duration, runner="langgraph", node_type=node_type, status=status)
+            reset_current_node(token)
+    return node
+
+@contextmanager
+def _track_run(runner: str):
+    """Records in-flight, outcome and duration metrics for one graph run.
+
+    The caller sets outcome["status"] once the run has produced its final state.
+    """
+    outcome = {"status": "exception"}
+    start = time.perf_counter()
+    metrics.GRAPHS_IN_FLIGHT.inc(runner=runner)
+    try:
+        yield outcome
+    finally:
+        metrics.GRAPHS_IN_FLIGHT.dec(runner=runner)
+        metrics.GRAPH_RUNS.inc(runner=runner, status=outcome["status"])
+        metrics.GRAPH_DURATION.observe(time.perf_counter() - start, runner=runner)
+
+def get_compiled_graph(graph_spec: GraphSpec):
+    """Returns the compiled graph for this spec's structure, building it on a cache miss."""
+    key = graph_structure_key(graph_spec)
+    graph = _compiled_graphs.get(key)
+    if graph is not None:
+        _compiled_graphs.move_to_end(key)
+        _graph_cache_stats["hits"] += 1
+        return graph
+
+    _graph_cache_stats["misses"] += 1
+    graph = _build_graph(graph_spec)
+    _compiled_graphs[key] = graph
+    while len(_compiled_graphs) > GRAPH_CACHE_SIZE:
+        _compiled_graphs.popitem(last=False)
+        _graph_cache_stats["evictions"] += 1
+    return graph
+
+def _build_graph(graph_spec: GraphSpec):
+    from langgraph.graph import StateGraph, START
+
     # Pass the state schema to StateGraph
     builder = StateGraph(GraphState)
 
-    node_instances = {}
-
     # Instantiate nodes based on spec
     for node_spec in graph_spec.nodes:
-        node_factory = NODE_TYPE_MAPPING.get(node_spec.type)
+        node_factory = get_node_factory(node_spec.type)
         if not node_factory:
             raise ValueError(f"Unknown node type: {node_spec.type}")
-        # Pass params to the node factory function to get the actual node function
-        node_function = node_factory(node_spec.params)
-        # Add node to the graph builder
-        builder.add_node(node_spec.id, node_function)
+        # Params are bound per run from state["node_params"], not at build time
+        builder.add_node(node_spec.id, _parametrized_node(node_spec.id, node_spec.type, node_factory))
 
-    # Add edges based on spec
+    # Add edges based on spec. A node with several parents gets one join edge
+    # so it runs once, after all of them have finished (fan-in).
+    parents: Dict[str, List[str]] = {}
     for edge_spec in graph_spec.edges:
-        builder.add_edge(edge_spec.from_, edge_spec.to)
+        sources = parents.setdefault(edge_spec.to, [])
+        if edge_spec.from_ not in sources:
+            sources.append(edge_spec.from_)
+    for target_id, source_ids in parents.items():
+        builder.add_edge(source_ids if len(source_ids) > 1 else source_ids[0], target_id)
 
-    # Identify nodes with no incoming edges to set as entry points
-    all_node_ids = {node.id for node in graph_spec.nodes}
-    target_node_ids = {edge.to for edge in graph_spec.edges}
-    entry_node_ids = list(all_node_ids - target_node_ids)
+    # Identify nodes with no incoming edges to set as entry points (kept in spec order)
+    target_node_ids = set(parents)
+    entry_node_ids = [node.id for node in graph_spec.nodes if node.id not in target_node_ids]
 
     if not graph_spec.nodes:
         raise ValueError("GraphSpec must contain at least one node.")
@@ -74,17 +170,170 @@ async def run_graph(graph_spec: GraphSpec):
         # This could happen if the graph is empty (caught above) or cyclic with no clear start
         raise ValueError("Could not determine entry point(s) for the graph. Check for cycles or ensure at least one node has no incoming edges.")
 
-    # Set the identified entry points
-    builder.set_entry_point(entry_node_ids[0]) # set_entry_point expects a single ID
-    # If multiple entry points were intended, langgraph typically uses conditional edges from START
-    # For now, we'll just use the first identified entry node. 
-    # If multiple are needed, the graph definition pattern might need adjustment.
+    # Fan out from START to every root. Independent branches then run
+    # concurrently in the same superstep instead of one after another.
+    for entry_node_id in entry_node_ids:
+        builder.add_edge(START, entry_node_id)
 
     # Build the graph
-    graph = builder.compile()
+    return builder.compile()
 
-    # Invoke the graph with an initial empty state
+async def run_graph(graph_spec: GraphSpec, node_params: Optional[Dict[str, Dict[str, Any]]] = None,
+                    run_id: Optional[str] = None):
+    """Runs the graph. node_params, if given, replaces the params from the spec.
+
+    With a run_id, each node's state update is kept in the run store so the
+    run can later be re-run incrementally with rerun_graph.
+    """
+    if run_id is not None:
+        deltas, result = await _run_collecting(graph_spec, node_params)
+        _run_store.put(run_id, graph_spec, deltas)
+        return result
+
+    graph = get_compiled_graph(graph_spec)
+
+    # Invoke the graph with an initial state holding this run's params
     # Initialize the errors list
-    initial_state = {"errors": []}
-    result = await graph.ainvoke(initial_state)
+    if node_params is None:
+        node_params = {node.id: node.params for node in graph_spec.nodes}
+    initial_state = {"errors": [], "node_params": node_params}
+    with _track_run("langgraph") as outcome:
+        result = await graph.ainvoke(initial_state)
+        outcome["status"] = "error" if result.get("errors") else "ok"
+    result.pop("node_params", None) # Internal plumbing, not part of the response
     return result
+
+async def stream_graph(graph_spec: GraphSpec, node_params: Optional[Dict[str, Dict[str, Any]]] = None,
+                       base_state: Optional[Dict[str, Any]] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Runs the graph, yielding progress as it happens.
+
+    Yields ("update", {"node": node_id, "delta": {...}}) each time a node
+    finishes, with the state keys that node wrote, and finally
+    ("result", final_state). base_state, if given, seeds the initial state.
+    """
+    graph = get_compiled_graph(graph_spec)
+    if node_params is None:
+        node_params = {node.id: node.params for node in graph_spec.nodes}
+    initial_state = {"errors": [], **(base_state or {}), "node_params": node_params}
+
+    final_state: Dict[str, Any] = dict(initial_state)
+    with _track_run("langgraph") as outcome:
+        async for mode, chunk in graph.astream(initial_state, stream_mode=["updates", "values"]):
+            if mode == "values":
+                final_state = chunk
+                continue
+            for node_id, delta in chunk.items():
+                if node_id.startswith("__"): # LangGraph internals (e.g. interrupts)
+                    continue
+                yield "update", {"node": node_id, "delta": delta or {}}
+        outcome["status"] = "error" if final_state.get("errors") else "ok"
+
+    final_state = dict(final_state)
+    final_state.pop("node_params", None)
+    yield "result", final_state
+
+# --- Batch Execution ---
+# Node types that take the batch ticker even if the template doesn't set one
+TICKER_NODE_TYPES = {"LoadTickerData"}
+
+def ticker_node_params(graph_spec: GraphSpec, ticker: str) -> Dict[str, Dict[str, Any]]:
+    """Params for one batch item: the template's params with the ticker filled in."""
+    node_params = {}
+    for node in graph_spec.nodes:
+        params = dict(node.params)
+        if node.type in TICKER_NODE_TYPES or "ticker" in params:
+            params["ticker"] = ticker
+        node_params[node.id] = params
+    return node_params
+
+async def run_graph_batch(graph_spec: GraphSpec, tickers: List[str],
+                          concurrency: int = 8) -> AsyncIterator[Tuple[str, Optional[dict], Optional[str]]]:
+    """Runs one graph template per ticker, yielding (ticker, result, error) as runs finish.
+
+    All runs share the compiled graph, the FMP connection pool and the caches.
+    At most `concurrency` runs are in flight at once.
+    """
+    get_compiled_graph(graph_spec) # Validate (and compile) once, before any run starts
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(ticker: str):
+        async with semaphore:
+            try:
+                return ticker, await run_graph(graph_spec, ticker_node_params(graph_spec, ticker)), None
+            except Exception as e:
+                return ticker, None, str(e)
+
+    tasks = [asyncio.ensure_future(run_one(ticker)) for ticker in tickers]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The consumer may stop early (e.g. client disconnected); don't leave runs behind
+        for task in tasks:
+            task.cancel()
+
+# --- Incremental Re-execution ---
+# Runs started with a run_id keep each node's state update, keyed by node id.
+# A re-run of a modified spec replays the updates of unchanged nodes into
+# the initial state and executes only the dirty subgraph.
+RUN_STORE_SIZE = int(os.getenv("RUN_STORE_SIZE", "256"))
+RUN_STORE_TTL = float(os.getenv("RUN_STORE_TTL", "3600"))
+_run_store = RunStore(max_runs=RUN_STORE_SIZE, ttl=RUN_STORE_TTL)
+
+async def _run_collecting(graph_spec: GraphSpec, node_params: Optional[Dict[str, Dict[str, Any]]] = None,
+                          base_state: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, dict], dict]:
+    """Runs the graph and returns (per-node state updates, final state)."""
+    deltas: Dict[str, dict] = {}
+    result: Dict[str, Any] = {}
+    async for kind, payload in stream_graph(graph_spec, node_params, base_state):
+        if kind == "update":
+            deltas[payload["node"]] = payload["delta"]
+        else:
+            result = payload
+    return deltas, result
+
+async def rerun_graph(previous_run_id: str, graph_spec: GraphSpec, run_id: str) -> Tuple[dict, List[str], List[str]]:
+    """Re-runs a stored run with a modified spec, executing only dirty nodes.
+
+    Returns (final_state, dirty node ids, reused node ids). Raises
+    RunNotFoundError for an unknown or expired run, and ValueError for an
+    invalid spec.
+    """
+    record = _run_store.require(previous_run_id)
+    previous_deltas: Dict[str, dict] = record.data
+    get_compiled_graph(graph_spec) # Validate the full spec before running part of it
+
+    # Nodes that reported errors (or never ran) last time are retried
+    failed = [node.id for node in record.graph_spec.nodes
+              if node.id not in previous_deltas or previous_deltas[node.id].get("errors")]
+    try:
+        dirty = dirty_nodes(record.graph_spec, graph_spec, failed)
+        order = Graph(graph_spec).topological_sort()
+    except GraphError as e:
+        raise ValueError(str(e))
+    reused = [node_id for node_id in order if node_id not in dirty]
+
+    # Replay the clean nodes' updates in dependency order
+    base_state: Dict[str, Any] = {"errors": []}
+    deltas = {}
+    for node_id in reused:
+        delta = previous_deltas.get(node_id) or {}
+        deltas[node_id] = delta
+        for key, value in delta.items():
+            if key == "errors":
+                base_state["errors"] = base_state["errors"] + list(value)
+            else:
+                base_state[key] = value
+
+    if dirty:
+        # Dirty nodes are closed under descendants, so the subgraph's roots only
+        # depend on clean nodes, whose outputs are already in base_state
+        sub_spec = GraphSpec(nodes=[node for node in graph_spec.nodes if node.id in dirty],
+                             edges=[edge for edge in graph_spec.edges if edge.from_ in dirty and edge.to in dirty])
+        new_deltas, result = await _run_collecting(sub_spec, base_state=base_state)
+        deltas.update(new_deltas)
+    else:
+        result = base_state
+
+    _run_store.put(run_id, graph_spec, deltas)
+    return result, [node_id for node_id in order if node_id in dirty], reused
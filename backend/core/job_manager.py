@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from backend.models.graph_spec import GraphSpec
+from backend.core.graph_runner import run_graph
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+
+class JobQueueFullError(Exception):
+    pass
+
+class JobManagerNotRunningError(RuntimeError):
+    pass
+
+class JobRecord:
+    def __init__(self, job_id: str, graph_spec: GraphSpec):
+        self.job_id = job_id
+        self.graph_spec = graph_spec
+        self.status = "queued" # "queued", "running", "done", "error"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class JobManager:
+    """Runs submitted graphs on a fixed pool of background workers.
+
+    Submissions beyond the queue limit are rejected instead of piling up.
+    Finished jobs are kept for `result_ttl` seconds so clients can fetch them.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_SIZE,
+                 result_ttl: float = JOB_RESULT_TTL):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, JobRecord] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._purge_expired()))
+        logger.info(f"Job manager started ({self.workers} workers, queue size {self.max_queue})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs still waiting will never run; finish them so pollers aren't left hanging
+        while self._queue is not None and not self._queue.empty():
+            record = self._queue.get_nowait()
+            record.status = "error"
+            record.error = "Job cancelled (server shutting down)."
+            record.finished_at = time.time()
+            record.done.set()
+        self._queue = None # Bound to the stopped loop; start() makes a new one
+        logger.info("Job manager stopped.")
+
+    def submit(self, graph_spec: GraphSpec) -> JobRecord:
+        if self._queue is None:
+            raise JobManagerNotRunningError("Job manager is not running.")
+        record = JobRecord(uuid.uuid4().hex, graph_spec)
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"Job queue is full ({self.max_queue} jobs waiting).")
+        self._jobs[record.job_id] = record
+        logger.info(f"Job {record.job_id} queued (depth {self._queue.qsize()})")
+        return record
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[JobRecord]:
+        """Waits up to `timeout` seconds for the job to finish, then returns it."""
+        record = self._jobs.get(job_id)
+        if record is not None and timeout > 0 and not record.done.is_set():
+            try:
+                await asyncio.wait_for(record.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return record
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self, index: int):
+        while True:
+            record = await self._queue.get()
+            record.status = "running"
+            record.started_at = time.time()
+            try:
+                result = await run_graph(record.graph_spec)
+                record.result = result
+                record.status = "error" if result.get("errors") else "done"
+            except asyncio.CancelledError:
+                record.status = "error"
+                record.error = "Job cancelled (server shutting down)."
+                raise
+            except Exception as e:
+                logger.exception(f"Job {record.job_id} failed:")
+                record.status = "error"
+                record.error = str(e)
+            finally:
+                record.finished_at = time.time()
+                record.done.set()
+                self._queue.task_done()
+            logger.info(f"Job {record.job_id} finished with status {record.status} (worker {index})")
+
+    async def _purge_expired(self):
+        while True:
+            await asyncio.sleep(min(60.0, max(1.0, self.result_ttl / 10)))
+            cutoff = time.time() - self.result_ttl
+            expired = [job_id for job_id, record in self._jobs.items()
+                       if record.finished_at is not None and record.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+            if expired:
+                logger.info(f"Purged {len(expired)} expired jobs")
+
+job_manager = JobManager()
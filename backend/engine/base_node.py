@@ -1,7 +1,32 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+class NodeRunError(Exception):
+    """A node's run() failed. Carries the original error and when the run started and stopped."""
+
+    def __init__(self, error: Exception, started_at: float, finished_at: float):
+        super().__init__(str(error))
+        self.error = error
+        self.started_at = started_at
+        self.finished_at = finished_at
+
+    def __reduce__(self): # Rebuilt from its fields when it comes back from a worker process
+        return type(self), (self.error, self.started_at, self.finished_at)
 
 class BaseNode(ABC):
+    # Scheduling hints read by the ExecutionEngine.
+    # cpu_bound nodes count against the engine's CPU concurrency limit instead of the I/O one,
+    # and run in its process pool when it has one (the class must then be importable by workers).
+    cpu_bound: bool = False
+    # Seconds a cpu_bound node may run in the engine's process pool before it is stopped (None: no limit).
+    timeout: Optional[float] = None
+    # Relative cost used to find the critical path; nodes on longer paths are started first.
+    estimated_cost: float = 1.0
+    # Output caching, used when the engine is given a node_cache.
+    # Set cacheable = False for non-deterministic nodes; bump cache_version when run() changes.
+    cacheable: bool = True
+    cache_version: str = "1"
+
     @abstractmethod
     def run(self, context: Dict[str, Any], params: Dict[str, Any]) -> Any:
         """Execute the node's logic."""
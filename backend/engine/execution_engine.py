@@ -1,24 +1,124 @@
+import heapq
 import logging
-from typing import Any, Dict
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-from .graph import Graph, GraphError
+from .base_node import NodeRunError
+from .graph import Graph, GraphError, dirty_nodes
 from .models import GraphSpec, NodeResult
+from .node_cache import NodeCache, hash_value, node_cache_key
+from .process_pool import ProcessNodePool
+from .shared_results import DEFAULT_MIN_BYTES, SharedResults
+from .run_store import RunStore
 from .node_loader import NodeLoaderError, get_node_class, reload_node_classes
+from backend.core import metrics
 
 logger = logging.getLogger(__name__)
 
+class _Outcome(NamedTuple):
+    """What a finished node's future resolves to."""
+    result: Any
+    started_at: float
+    finished_at: float
+    result_hash: Optional[str]
+    cached: bool = False
+
 class ExecutionEngine:
-    def __init__(self, reload_nodes: bool = False):
+    def __init__(self, reload_nodes: bool = False, max_workers: int = 8,
+                 max_io_workers: Optional[int] = None, max_cpu_workers: Optional[int] = None,
+                 node_cache: Optional[NodeCache] = None, run_store: Optional[RunStore] = None,
+                 process_pool: Optional[ProcessNodePool] = None,
+                 shared_memory_min_bytes: Optional[int] = DEFAULT_MIN_BYTES):
         """Initializes the ExecutionEngine.
 
         Args:
             reload_nodes: If True, forces reloading of node classes on each run.
                           Useful for development environments.
+            max_workers: Maximum number of nodes running at the same time.
+                         Set to 1 to run nodes one at a time in topological order.
+            max_io_workers: Concurrency limit for I/O-bound nodes (defaults to max_workers).
+            max_cpu_workers: Concurrency limit for nodes with cpu_bound=True
+                             (defaults to the CPU count, or the process pool's size,
+                             capped at max_workers).
+            node_cache: If given, outputs of cacheable nodes are stored and reused when
+                        the node type, params and dependency results are unchanged.
+            run_store: If given, runs started with a run_id are kept so rerun() can
+                       re-execute only what changed.
+            process_pool: If given, nodes with cpu_bound=True run in its worker processes
+                          (with their timeout) instead of on the engine's threads. The
+                          pool is not owned by the engine and can be shared between engines.
+            shared_memory_min_bytes: With a process_pool, numpy arrays of at least this
+                                     size travel to and from workers through shared
+                                     memory instead of being pickled. None disables it.
         """
         self.reload_nodes = reload_nodes
+        self.max_workers = max(1, max_workers)
+        self.max_io_workers = max(1, min(max_io_workers or self.max_workers, self.max_workers))
+        cpu_slots = process_pool.max_workers if process_pool is not None else os.cpu_count() or 1
+        self.max_cpu_workers = max(1, min(max_cpu_workers or cpu_slots, self.max_workers))
+        self.node_cache = node_cache
+        self.run_store = run_store
+        self.process_pool = process_pool
+        self.shared_memory_min_bytes = shared_memory_min_bytes
+
+    def run(self, graph_spec: GraphSpec, run_id: Optional[str] = None) -> Dict[str, NodeResult]:
+        """Executes the graph defined by the GraphSpec.
+
+        See _run for the scheduling details. This wrapper records run metrics
+        and, with a run_id and a run store, keeps the results for rerun().
+        """
+        return self._run_recorded(graph_spec, run_id, {})
+
+    def rerun(self, previous_run_id: str, graph_spec: GraphSpec,
+              run_id: Optional[str] = None) -> Dict[str, NodeResult]:
+        """Runs a modified version of a stored run, re-executing only what changed.
+
+        Nodes that are new, whose type, params or parents changed, or that did
+        not finish last time are dirty, together with all their descendants.
+        Every other node reuses its previous result (marked reused=True).
+        Raises RunNotFoundError if the previous run is unknown or expired.
+        """
+        if self.run_store is None:
+            raise RuntimeError("ExecutionEngine was created without a run_store.")
+        record = self.run_store.require(previous_run_id)
+        previous_results: Dict[str, NodeResult] = record.data
+        failed = [node_id for node_id, result in previous_results.items() if result.status != "done"]
+        try:
+            dirty = dirty_nodes(record.graph_spec, graph_spec, failed)
+        except GraphError:
+            dirty = {node.id for node in graph_spec.nodes} # Let _run report the invalid graph
+        reuse = {node.id: previous_results[node.id] for node in graph_spec.nodes
+                 if node.id not in dirty and node.id in previous_results}
+        logger.info(f"Re-running {previous_run_id}: {len(dirty)} dirty node(s), {len(reuse)} reused.")
+        return self._run_recorded(graph_spec, run_id, reuse)
+
+    def _run_recorded(self, graph_spec: GraphSpec, run_id: Optional[str],
+                      reuse: Dict[str, NodeResult]) -> Dict[str, NodeResult]:
+        run_start = time.perf_counter()
+        metrics.GRAPHS_IN_FLIGHT.inc(runner="engine")
+        status = "error"
+        try:
+            results = self._run(graph_spec, reuse)
+            status = "error" if any(r.status == "error" for r in results.values()) else "ok"
+            if run_id is not None and self.run_store is not None:
+                self.run_store.put(run_id, graph_spec, {k: v.copy() for k, v in results.items()})
+            return results
+        finally:
+            metrics.GRAPHS_IN_FLIGHT.dec(runner="engine")
+            metrics.GRAPH_RUNS.inc(runner="engine", status=status)
+            metrics.GRAPH_DURATION.observe(time.perf_counter() - run_start, runner="engine")
 
-    def run(self, graph_spec: GraphSpec) -> Dict[str, NodeResult]:
-        """Executes the graph defined by the GraphSpec."""
+    def _run(self, graph_spec: GraphSpec, reuse: Dict[str, NodeResult]) -> Dict[str, NodeResult]:
+        """Executes the graph defined by the GraphSpec.
+
+        Nodes are started as soon as all of their dependencies have finished,
+        so independent branches run concurrently on a bounded worker pool.
+        When more nodes are ready than there are free slots, nodes on the
+        longest remaining path are started first. With a node cache, a node
+        whose inputs are unchanged since an earlier run is served from it.
+        """
         if self.reload_nodes:
             reload_node_classes() # Reload classes if requested
 
@@ -26,7 +126,7 @@ class ExecutionEngine:
         try:
             graph = Graph(graph_spec)
             sorted_node_ids = graph.topological_sort()
-            logger.info(f"Execution order: {sorted_node_ids}")
+            logger.info(f"Topological order: {sorted_node_ids}")
         except (GraphError, NodeLoaderError) as e:
             logger.error(f"Graph validation failed: {e}")
             # Return results indicating the error occurred before execution started
@@ -39,61 +139,269 @@ class ExecutionEngine:
                        for node in graph_spec.nodes}
             return results
 
-        context: Dict[str, Any] = {}
         results: Dict[str, NodeResult] = {node_id: NodeResult() for node_id in graph.nodes}
 
+        # Resolve node classes up front so their scheduling hints can be used.
+        # Load failures are reported on the node itself once it becomes ready.
+        node_classes: Dict[str, Any] = {}
+        load_errors: Dict[str, str] = {}
+        for node_id in sorted_node_ids:
+            try:
+                node_classes[node_id] = get_node_class(graph.get_node(node_id).type)
+            except NodeLoaderError as e:
+                load_errors[node_id] = f"Failed to load node class: {e}"
+
+        costs = {node_id: getattr(cls, "estimated_cost", 1.0) for node_id, cls in node_classes.items()}
+        priority = graph.critical_path_lengths(costs)
+        order_index = {node_id: i for i, node_id in enumerate(sorted_node_ids)}
+
+        remaining_deps = {node_id: len(graph.get_dependencies(node_id)) for node_id in graph.nodes}
+        ready: List[Tuple[float, int, str]] = []
+
+        def push_ready(node_id: str):
+            heapq.heappush(ready, (-priority[node_id], order_index[node_id], node_id))
+
+        def release_children(node_id: str):
+            for child_id in graph.adj[node_id]:
+                remaining_deps[child_id] -= 1
+                if remaining_deps[child_id] == 0:
+                    push_ready(child_id)
+
         for node_id in sorted_node_ids:
-            node_spec = graph.get_node(node_id)
-            if not node_spec:
-                 # This shouldn't happen if graph validation is correct, but defensive check
-                 logger.error(f"Node ID {node_id} from sorted list not found in graph.")
-                 results[node_id] = NodeResult(status="error", error="Node definition not found during execution")
-                 continue
+            if remaining_deps[node_id] == 0:
+                push_ready(node_id)
 
-            results[node_id].status = "running"
-            logger.info(f"Running node '{node_id}' (Type: {node_spec.type})")
+        limits = {"io": self.max_io_workers, "cpu": self.max_cpu_workers}
+        in_use = {"io": 0, "cpu": 0}
+        running: Dict[Future, Tuple[str, str]] = {}
+        node_types = {node_id: graph.get_node(node_id).type for node_id in graph.nodes}
+        # Shared memory blocks holding process pool results, freed as their consumers finish
+        shared = (SharedResults(self.shared_memory_min_bytes)
+                  if self.process_pool is not None and self.shared_memory_min_bytes is not None else None)
 
-            try:
-                # Get node class dynamically
-                NodeClass = get_node_class(node_spec.type)
-                node_instance = NodeClass()
-
-                # Prepare context for the current node (results of dependencies)
-                node_context = {}
-                dependencies = graph.get_dependencies(node_id)
-                for dep_id in dependencies:
-                    if results[dep_id].status == "done":
-                        node_context[dep_id] = results[dep_id].result
-                    else:
-                        # This indicates an issue, as dependencies should be 'done'
-                        error_msg = f"Dependency '{dep_id}' did not complete successfully (status: {results[dep_id].status})."
-                        logger.error(f"Node '{node_id}': {error_msg} Error: {results[dep_id].error}")
-                        raise RuntimeError(error_msg)
-
-                # Execute the node's run method
-                node_result_data = node_instance.run(context=node_context, params=node_spec.params)
-
-                # Update context and results
-                context[node_id] = node_result_data
-                results[node_id].result = node_result_data
-                results[node_id].status = "done"
-                logger.info(f"Node '{node_id}' finished successfully.")
+        def node_done(node_id: str):
+            if shared is not None:
+                shared.consumer_done(graph.get_dependencies(node_id))
+            release_children(node_id)
 
-            except NodeLoaderError as e:
-                error_msg = f"Failed to load node class: {e}"
-                logger.error(f"Node '{node_id}': {error_msg}", exc_info=True)
-                results[node_id].status = "error"
-                results[node_id].error = error_msg
-                # Optional: Decide if the entire graph execution should stop on error
-                # For now, we continue, but subsequent nodes might fail if they depend on this one.
-
-            except Exception as e:
-                error_msg = f"Execution failed: {e}"
-                logger.error(f"Node '{node_id}': {error_msg}", exc_info=True)
-                results[node_id].status = "error"
-                results[node_id].error = error_msg
-                # Optional: Stop execution globally on node error?
-                # break # Uncomment to stop execution on the first error
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="graph-node") as pool:
+                while ready or running:
+                    # --- Dispatch every ready node that has a free slot ---
+                    deferred = []
+                    while ready and len(running) < self.max_workers:
+                        item = heapq.heappop(ready)
+                        node_id = item[2]
+                        NodeClass = node_classes.get(node_id)
+                        kind = "cpu" if getattr(NodeClass, "cpu_bound", False) else "io"
+                        if NodeClass is not None and in_use[kind] >= limits[kind]:
+                            deferred.append(item)
+                            continue
+
+                        if node_id in reuse:
+                            future = self._reuse_node(node_id, reuse[node_id], results)
+                        else:
+                            future = self._start_node(pool, graph, node_id, NodeClass, load_errors.get(node_id),
+                                                      results, shared)
+                        if future is None:
+                            # Failed before it could be submitted; downstream nodes still need to be released
+                            self._record_timing(results[node_id], node_types[node_id], time.time(), time.time())
+                            node_done(node_id)
+                            continue
+                        in_use[kind] += 1
+                        running[future] = (node_id, kind)
+
+                    for item in deferred:
+                        heapq.heappush(ready, item)
+
+                    if not running:
+                        continue
+
+                    # --- Wait for at least one running node to finish ---
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        node_id, kind = running.pop(future)
+                        in_use[kind] -= 1
+                        self._finish_node(future, node_id, node_types[node_id], results)
+                        node_done(node_id)
+        finally:
+            if shared is not None:
+                shared.close() # Arrays already in results stay valid
 
         logger.info("Graph execution finished.")
-        return results 
\ No newline at end of file
+        return results
+
+    def _start_node(self, pool: ThreadPoolExecutor, graph: Graph, node_id: str, NodeClass: Any,
+                    load_error: Optional[str], results: Dict[str, NodeResult],
+                    shared: Optional[SharedResults] = None) -> Optional[Future]:
+        """Prepares a ready node and submits it. Returns None if it failed before submission.
+
+        The node cache is checked on the worker thread, so reading and
+        unpickling an entry doesn't hold up scheduling.
+        """
+        node_spec = graph.get_node(node_id)
+        results[node_id].status = "running"
+        logger.info(f"Running node '{node_id}' (Type: {node_spec.type})")
+
+        if load_error is not None:
+            logger.error(f"Node '{node_id}': {load_error}")
+            results[node_id].status = "error"
+            results[node_id].error = load_error
+            # Subsequent nodes will fail if they depend on this one.
+            return None
+
+        try:
+            # Prepare context for the current node (results of dependencies)
+            node_context = {}
+            for dep_id in graph.get_dependencies(node_id):
+                if results[dep_id].status == "done":
+                    node_context[dep_id] = results[dep_id].result
+                else:
+                    error_msg = f"Dependency '{dep_id}' did not complete successfully (status: {results[dep_id].status})."
+                    logger.error(f"Node '{node_id}': {error_msg} Error: {results[dep_id].error}")
+                    raise RuntimeError(error_msg)
+
+            cache_key = self._cache_key(graph, node_id, NodeClass, results)
+            if self.process_pool is not None and getattr(NodeClass, "cpu_bound", False):
+                # The thread just waits on the worker process, so it doesn't hold the GIL
+                return pool.submit(self._run_in_process, NodeClass, node_context, node_spec.params, cache_key,
+                                   node_id, len(graph.adj.get(node_id, [])), shared)
+            return pool.submit(self._run_timed, NodeClass(), node_context, node_spec.params, cache_key)
+
+        except Exception as e:
+            error_msg = f"Execution failed: {e}"
+            logger.error(f"Node '{node_id}': {error_msg}", exc_info=True)
+            results[node_id].status = "error"
+            results[node_id].error = error_msg
+            return None
+
+    @staticmethod
+    def _reuse_node(node_id: str, previous: NodeResult, results: Dict[str, NodeResult]) -> Future:
+        """Completes a clean node with its result from the previous run."""
+        logger.info(f"Node '{node_id}' reused from the previous run.")
+        results[node_id].status = "running"
+        results[node_id].reused = True
+        now = time.time()
+        future = Future()
+        future.set_result(_Outcome(previous.result, now, now, previous.result_hash))
+        return future
+
+    def _cached(self, NodeClass: Any, cache_key: Optional[str]) -> Optional[_Outcome]:
+        """The node's outcome from the node cache, or None on a miss (or if it isn't cached)."""
+        if cache_key is None:
+            return None
+        cached = self.node_cache.get(cache_key)
+        metrics.NODE_CACHE_LOOKUPS.inc(node_type=NodeClass.__name__, result="hit" if cached else "miss")
+        if cached is None:
+            return None
+        result, result_hash = cached
+        now = time.time()
+        return _Outcome(result, now, now, result_hash, cached=True)
+
+    def _cache_key(self, graph: Graph, node_id: str, NodeClass: Any,
+                   results: Dict[str, NodeResult]) -> Optional[str]:
+        """The node's cache key, or None if it should not be cached."""
+        if self.node_cache is None or not getattr(NodeClass, "cacheable", True):
+            return None
+        dependency_hashes = {dep_id: results[dep_id].result_hash for dep_id in graph.get_dependencies(node_id)}
+        if any(h is None for h in dependency_hashes.values()):
+            return None
+        node_spec = graph.get_node(node_id)
+        return node_cache_key(node_spec.type, getattr(NodeClass, "cache_version", "1"),
+                              node_spec.params, dependency_hashes)
+
+    def _run_timed(self, node_instance: Any, context: Dict[str, Any], params: Dict[str, Any],
+                   cache_key: Optional[str] = None):
+        """Runs the node on a worker thread, unless the node cache has its result.
+
+        Returns an _Outcome. Cache lookups, hashing and caching happen here
+        too, to keep them off the scheduling thread.
+        """
+        cached = self._cached(type(node_instance), cache_key)
+        if cached is not None:
+            return cached
+        started_at = time.time()
+        try:
+            result = node_instance.run(context=context, params=params)
+        except Exception as e:
+            raise NodeRunError(e, started_at, time.time()) from e # Keep timings for failed nodes too
+        finished_at = time.time()
+        return _Outcome(result, started_at, finished_at, self._hash_and_store(type(node_instance), result, cache_key))
+
+    def _run_in_process(self, NodeClass: Any, context: Dict[str, Any], params: Dict[str, Any],
+                        cache_key: Optional[str] = None, node_id: Optional[str] = None, consumers: int = 0,
+                        shared: Optional[SharedResults] = None):
+        """Runs a cpu_bound node in the process pool, from a worker thread.
+
+        Same return value as _run_timed. The result is hashed in the worker
+        process. With shared, large arrays go both ways through shared memory;
+        the result's arrays are views of it, kept for its `consumers`.
+        """
+        cached = self._cached(NodeClass, cache_key)
+        if cached is not None:
+            return cached
+        task_blocks: List[str] = []
+        prefix = shared.task_prefix() if shared is not None else None
+        adopted = shared is None
+        try:
+            if shared is not None:
+                context = {dep_id: shared.for_process(dep_id, value, task_blocks) for dep_id, value in context.items()}
+            result, started_at, finished_at, result_hash = self.process_pool.run(
+                NodeClass, context, params, timeout=getattr(NodeClass, "timeout", None),
+                hash_result=self.node_cache is not None,
+                share_min_bytes=shared.min_bytes if shared is not None else None, share_prefix=prefix)
+            if shared is not None:
+                result = shared.adopt(node_id, result, consumers)
+                adopted = True
+        finally:
+            if shared is not None:
+                shared.release_task(task_blocks)
+                if not adopted:
+                    shared.sweep(prefix) # Blocks the worker made for a result that never got here
+        return _Outcome(result, started_at, finished_at,
+                        self._hash_and_store(NodeClass, result, cache_key, result_hash))
+
+    def _hash_and_store(self, NodeClass: Any, result: Any, cache_key: Optional[str],
+                        result_hash: Optional[str] = None) -> Optional[str]:
+        """Hashes the result (unless already hashed) and stores it in the node cache."""
+        if self.node_cache is None:
+            return None
+        try:
+            if result_hash is None:
+                result_hash = hash_value(result)
+            if cache_key is not None:
+                self.node_cache.set(cache_key, (result, result_hash))
+        except Exception as e:
+            # An uncacheable result must not fail the node; its dependents just won't be cached
+            logger.warning(f"Could not cache result of {NodeClass.__name__}: {e}")
+        return result_hash
+
+    @staticmethod
+    def _record_timing(node_result: NodeResult, node_type: str, started_at: float, finished_at: float):
+        node_result.started_at = started_at
+        node_result.finished_at = finished_at
+        node_result.duration_ms = round((finished_at - started_at) * 1000, 3)
+        metrics.NODE_DURATION.observe(finished_at - started_at, runner="engine",
+                                      node_type=node_type, status=node_result.status)
+
+    def _finish_node(self, future: Future, node_id: str, node_type: str, results: Dict[str, NodeResult]):
+        """Records the outcome and timings of a completed node."""
+        try:
+            outcome: _Outcome = future.result()
+            started_at, finished_at = outcome.started_at, outcome.finished_at
+            results[node_id].result = outcome.result
+            results[node_id].result_hash = outcome.result_hash
+            results[node_id].cached = outcome.cached
+            results[node_id].status = "done"
+            logger.info(f"Node '{node_id}' " + ("served from the node cache." if outcome.cached
+                                                else "finished successfully."))
+        except Exception as e:
+            error_msg = f"Execution failed: {e.error if isinstance(e, NodeRunError) else e}"
+            logger.error(f"Node '{node_id}': {error_msg}", exc_info=e)
+            results[node_id].status = "error"
+            results[node_id].error = error_msg
+            if isinstance(e, NodeRunError):
+                started_at, finished_at = e.started_at, e.finished_at
+            else: # Failed around the node (e.g. a crashed worker), not in run()
+                started_at = finished_at = time.time()
+        self._record_timing(results[node_id], node_type, started_at, finished_at)
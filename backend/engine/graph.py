@@ -1,5 +1,5 @@
 from collections import defaultdict, deque
-from typing import Dict, List, Set
+from typing import Dict, Iterable, List, Set
 
 from .models import GraphSpec
 
@@ -40,6 +40,28 @@ class Graph:
         """Returns the list of node IDs that this node depends on."""
         return self.rev_adj.get(node_id, [])
 
+    def descendants(self, node_ids: Iterable[str]) -> Set[str]:
+        """The given nodes plus every node reachable from them."""
+        seen = set(node_id for node_id in node_ids if node_id in self.nodes)
+        queue = deque(seen)
+        while queue:
+            for child in self.adj[queue.popleft()]:
+                if child not in seen:
+                    seen.add(child)
+                    queue.append(child)
+        return seen
+
+    def critical_path_lengths(self, costs: Dict[str, float]) -> Dict[str, float]:
+        """Returns, for each node, the cost of the longest path from it to any sink (inclusive).
+
+        Nodes missing from `costs` count as 1.0. Assumes the graph is acyclic.
+        """
+        lengths: Dict[str, float] = {}
+        for node_id in reversed(self.topological_sort()):
+            downstream = max((lengths[child] for child in self.adj[node_id]), default=0.0)
+            lengths[node_id] = costs.get(node_id, 1.0) + downstream
+        return lengths
+
     def topological_sort(self) -> List[str]:
         """Performs topological sort using Kahn's algorithm."""
         queue = deque([node_id for node_id in self.nodes if self.in_degree[node_id] == 0])
@@ -86,4 +108,28 @@ class Graph:
 
             raise GraphError(f"Graph contains a cycle. Involved nodes might include: {cycle_nodes}")
 
-        return sorted_order 
\ No newline at end of file
+        return sorted_order
+
+
+def dirty_nodes(previous_spec: GraphSpec, graph_spec: GraphSpec, failed: Iterable[str] = ()) -> Set[str]:
+    """Nodes of graph_spec that must run again after changing previous_spec into graph_spec.
+
+    A node is changed if it is new, its type or params differ, or its set of
+    parents differs. Changed nodes, nodes listed in `failed` and everything
+    downstream of them are dirty; the rest can reuse their previous results.
+    """
+    previous_nodes = {node.id: node for node in previous_spec.nodes}
+    previous_parents: Dict[str, Set[str]] = defaultdict(set)
+    for edge in previous_spec.edges:
+        previous_parents[edge.to].add(edge.from_)
+    parents: Dict[str, Set[str]] = defaultdict(set)
+    for edge in graph_spec.edges:
+        parents[edge.to].add(edge.from_)
+
+    changed = set(failed)
+    for node in graph_spec.nodes:
+        previous = previous_nodes.get(node.id)
+        if (previous is None or previous.type != node.type or previous.params != node.params
+                or previous_parents[node.id] != parents[node.id]):
+            changed.add(node.id)
+    return Graph(graph_spec).descendants(changed)
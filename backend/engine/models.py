@@ -5,6 +5,15 @@ class NodeResult(BaseModel):
     status: str = "pending"  # "pending", "running", "done", "error"
     result: Any = None
     error: Optional[str] = None
+    # Wall-clock timings (epoch seconds) and duration, filled in by the ExecutionEngine
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    duration_ms: Optional[float] = None
+    # Content hash of the result (set when the engine has a node cache) and whether it came from the cache
+    result_hash: Optional[str] = None
+    cached: bool = False
+    # True when rerun() carried the result over from the previous run
+    reused: bool = False
 
 class NodeSpec(BaseModel):
     id: str
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed cache of node outputs for the ExecutionEngine.
+#
+# A node's key is derived from its type, its cache_version, a canonical hash
+# of its params and the result hashes of its dependencies, so an entry is
+# only reused when everything the node could see is identical. Values are
+# stored pickled: every hit returns a fresh copy that callers may mutate.
+
+def _json_default(value: Any):
+    if hasattr(value, "tobytes") and hasattr(value, "dtype"): # numpy arrays and scalars
+        return {"__ndarray__": hashlib.sha256(value.tobytes()).hexdigest(),
+                "dtype": str(value.dtype), "shape": list(getattr(value, "shape", ()))}
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if isinstance(value, bytes):
+        return {"__bytes__": hashlib.sha256(value).hexdigest()}
+    if hasattr(value, "dict") and callable(value.dict): # pydantic models
+        return value.dict()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+def _pickled(value: Any) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _canonical(value: Any) -> Any:
+    """The value with dicts and sets in a fixed order, so equal values pickle the same."""
+    if isinstance(value, dict):
+        items = [(_canonical(k), _canonical(v)) for k, v in value.items()]
+        return ("__dict__", sorted(items, key=lambda item: _pickled(item[0])))
+    if isinstance(value, (set, frozenset)):
+        return ("__set__", sorted((_canonical(v) for v in value), key=_pickled))
+    if type(value) in (list, tuple):
+        return type(value)(_canonical(v) for v in value)
+    return value
+
+def hash_value(value: Any) -> str:
+    """Stable content hash: canonical JSON where possible, canonical pickle otherwise."""
+    try:
+        payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=_json_default).encode("utf-8")
+    except (TypeError, ValueError):
+        payload = b"pickle:" + _pickled(_canonical(value))
+    return hashlib.sha256(payload).hexdigest()
+
+def node_cache_key(node_type: str, cache_version: str, params: Dict[str, Any],
+                   dependency_hashes: Dict[str, str]) -> str:
+    """Key for a node run: type, version, params hash and upstream result hashes (by dependency id)."""
+    return hash_value({
+        "type": node_type,
+        "version": cache_version,
+        "params": hash_value(params),
+        "deps": dependency_hashes,
+    })
+
+class NodeCache(ABC):
+    """Interface for node output caches. Implementations must be thread-safe."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """The cached value, or None on a miss."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        pass
+
+class MemoryNodeCache(NodeCache):
+    """In-process LRU cache bounded by total pickled size and entry count."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_entries: int = 10000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        return pickle.loads(blob)
+
+    def set(self, key: str, value: Any):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return # Would evict everything else; not worth caching
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = blob
+            self._size += len(blob)
+            self.stats["sets"] += 1
+            while self._entries and (self._size > self.max_bytes or len(self._entries) > self.max_entries):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "bytes": self._size}
+
+class DiskNodeCache(NodeCache):
+    """One pickle file per key under a directory, pruned to max_bytes (least recently used first).
+
+    Reads touch the file's mtime so pruning approximates LRU. Sizes are
+    re-measured every `prune_every` writes, so the limit can be overshot briefly.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024 * 1024 * 1024, prune_every: int = 50):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.prune_every = max(1, prune_every)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "errors": 0}
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pkl"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            blob = path.read_bytes()
+            value = pickle.loads(blob)
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Node cache: unreadable entry {path}: {e}")
+            with self._lock:
+                self.stats["errors"] += 1
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            os.replace(tmp, path) # Atomic, so readers never see a partial file
+        except Exception as e:
+            logger.warning(f"Node cache: failed to write {path}: {e}")
+            with self._lock:
+                self.stats["errors"] += 1
+            return
+        with self._lock:
+            self.stats["sets"] += 1
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self._prune()
+
+    def _prune(self):
+        files = []
+        total = 0
+        for path in self.directory.glob("*/*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                with self._lock:
+                    self.stats["evictions"] += 1
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for path in self.directory.glob("*/*.pkl"):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats)
+
+def build_node_cache(kind: str = "memory", directory: str = ".cache/nodes",
+                     max_bytes: Optional[int] = None) -> Optional[NodeCache]:
+    """Node cache from settings: "memory", "disk" or "none"."""
+    kind = (kind or "none").lower()
+    if kind == "memory":
+        return MemoryNodeCache(max_bytes=max_bytes) if max_bytes else MemoryNodeCache()
+    if kind == "disk":
+        return DiskNodeCache(directory, max_bytes=max_bytes) if max_bytes else DiskNodeCache(directory)
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown node cache backend: {kind}")
@@ -1,9 +1,12 @@
+import ast
+import hashlib
 import importlib
 import inspect
-import pkgutil
+import logging
 import sys
+import threading
 from pathlib import Path
-from typing import Type
+from typing import Dict, List, Optional, Set, Tuple, Type
 
 # Ensure the backend directory is in the Python path
 # This might be needed if running scripts from the root directory
@@ -14,66 +17,221 @@ if str(backend_dir) not in sys.path:
 # Now import BaseNode safely
 from backend.engine.base_node import BaseNode
 
+logger = logging.getLogger(__name__)
+
 # Define the path to the nodes directory relative to this file
 NODES_DIR = Path(__file__).parent.parent / "nodes"
+NODES_PACKAGE = "backend.nodes"
 
 class NodeLoaderError(Exception):
     pass
 
-_node_classes = None
-
-def _find_node_classes():
-    global _node_classes
-    if _node_classes is not None:
-        return _node_classes
-
-    _node_classes = {}
-    # Ensure the nodes directory is importable
-    if str(NODES_DIR.parent) not in sys.path:
-        sys.path.insert(0, str(NODES_DIR.parent))
-
-    # Import all modules in the nodes directory
-    for _, name, is_pkg in pkgutil.iter_modules([str(NODES_DIR)]):
-        if not is_pkg:
-            try:
-                module = importlib.import_module(f"backend.nodes.{name}")
-                for _, obj in inspect.getmembers(module):
-                    if inspect.isclass(obj) and \
-                       issubclass(obj, BaseNode) and \
-                       obj is not BaseNode and \
-                       not inspect.isabstract(obj):
-                        if obj.__name__ in _node_classes:
-                           raise NodeLoaderError(
-                               f"Duplicate node type found: {obj.__name__} in {module.__file__} "
-                               f"and {_node_classes[obj.__name__].__module__}")
-                        _node_classes[obj.__name__] = obj
-            except ImportError as e:
-                print(f"Warning: Could not import module {name}: {e}")
-            except Exception as e:
-                 print(f"Warning: Error loading node classes from module {name}: {e}")
-
-    if not _node_classes:
-        print(f"Warning: No node classes found in {NODES_DIR}")
-
-    return _node_classes
+# Node types are resolved lazily. An index of node type -> module is built by
+# parsing the sources in NODES_DIR (no imports), and a module is only imported
+# when one of its node types is first requested. On reload, only modules whose
+# source actually changed (and modules subclassing their classes) are dropped
+# and re-imported on next use.
+
+class _ModuleEntry:
+    def __init__(self, name: str, path: Path, signature: Tuple[int, int], digest: str,
+                 classes: Dict[str, Tuple[Set[str], bool]]):
+        self.name = name # Module name without the package, e.g. "load_10k"
+        self.path = path
+        self.signature = signature # (mtime_ns, size), checked first on reload
+        self.digest = digest # Content hash, so touched-but-unchanged files aren't re-imported
+        self.classes = classes # Class name -> (base names, declares abstract methods)
+        self.node_types: List[str] = [] # Filled in by _rebuild_index
+
+_lock = threading.RLock()
+_modules: Optional[Dict[str, _ModuleEntry]] = None # Module name -> entry
+_index: Dict[str, str] = {} # Node type -> module name
+_duplicates: Dict[str, Set[str]] = {} # Node type -> modules defining it
+_loaded: Dict[str, Type[BaseNode]] = {} # Node type -> class, for imported modules
+_registered: Dict[str, Type[BaseNode]] = {} # Classes registered from outside NODES_DIR
+
+def _signature(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+def _name(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    return getattr(node, "attr", None) # e.g. base_node.BaseNode
+
+def _scan_classes(source: str, filename: str) -> Dict[str, Tuple[Set[str], bool]]:
+    """Top-level classes in the source with their base names, without importing it."""
+    try:
+        tree = ast.parse(source, filename=filename)
+    except SyntaxError as e:
+        logger.warning(f"Could not parse node module {filename}: {e}")
+        return {}
+    classes = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            abstract = any(_name(decorator) == "abstractmethod"
+                           for item in node.body if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                           for decorator in item.decorator_list)
+            classes[node.name] = ({_name(base) for base in node.bases} - {None}, abstract)
+    return classes
+
+def _scan_module(path: Path, previous: Optional[_ModuleEntry] = None) -> _ModuleEntry:
+    signature = _signature(path)
+    if previous is not None and previous.signature == signature:
+        return previous
+    source = path.read_bytes()
+    digest = hashlib.sha1(source).hexdigest()
+    if previous is not None and previous.digest == digest:
+        previous.signature = signature
+        return previous
+    classes = _scan_classes(source.decode("utf-8", errors="replace"), str(path))
+    return _ModuleEntry(path.stem, path, signature, digest, classes)
+
+def _rebuild_index():
+    """Resolves which scanned classes are node types (BaseNode subclasses, followed across modules)."""
+    node_bases = {"BaseNode"}
+    changed = True
+    while changed:
+        changed = False
+        for entry in _modules.values():
+            for name, (bases, _) in entry.classes.items():
+                if name not in node_bases and bases & node_bases:
+                    node_bases.add(name)
+                    changed = True
+
+    _index.clear()
+    _duplicates.clear()
+    for entry in _modules.values():
+        # Abstract intermediates (declaring abstract methods) aren't runnable node types
+        entry.node_types = [name for name, (_, abstract) in entry.classes.items()
+                            if name in node_bases and name != "BaseNode" and not abstract]
+        for node_type in entry.node_types:
+            if node_type in _index:
+                _duplicates.setdefault(node_type, {_index[node_type]}).add(entry.name)
+            else:
+                _index[node_type] = entry.name
+
+def _scan(previous: Optional[Dict[str, _ModuleEntry]] = None) -> Dict[str, _ModuleEntry]:
+    modules = {}
+    for path in sorted(NODES_DIR.glob("*.py")):
+        if path.name.startswith("_"):
+            continue
+        try:
+            modules[path.stem] = _scan_module(path, (previous or {}).get(path.stem))
+        except OSError as e:
+            logger.warning(f"Could not read node module {path}: {e}")
+    return modules
+
+def _dependents(changed: Set[str], previous: Dict[str, _ModuleEntry],
+                current: Dict[str, _ModuleEntry]) -> Set[str]:
+    """Unchanged modules with classes that inherit, directly or not, from a class in a changed module.
+
+    Their classes hold on to the old base classes, so they must be re-imported too.
+    """
+    stale_classes: Set[str] = set()
+    for name in changed:
+        for entry in (previous.get(name), current.get(name)):
+            if entry is not None:
+                stale_classes.update(entry.classes)
+    dependents: Set[str] = set()
+    found = True
+    while found:
+        found = False
+        for name, entry in current.items():
+            if name in changed or name in dependents:
+                continue
+            if any(bases & stale_classes for bases, _ in entry.classes.values()):
+                dependents.add(name)
+                stale_classes.update(entry.classes)
+                found = True
+    return dependents
+
+def _ensure_index():
+    global _modules
+    if _modules is None:
+        _modules = _scan()
+        _rebuild_index()
+        if not _index and not _registered:
+            logger.warning(f"No node classes found in {NODES_DIR}")
+
+def _import_module_types(module_name: str):
+    """Imports one node module and records its node classes."""
+    try:
+        module = importlib.import_module(f"{NODES_PACKAGE}.{module_name}")
+    except Exception as e:
+        raise NodeLoaderError(f"Could not import node module {module_name}: {e}") from e
+    for name, obj in inspect.getmembers(module, inspect.isclass):
+        if (issubclass(obj, BaseNode) and obj is not BaseNode and not inspect.isabstract(obj)
+                and obj.__module__ == module.__name__ and _index.get(name) == module_name):
+            _loaded[name] = obj
+
+def available_node_types() -> List[str]:
+    """Every known node type, without importing any node module."""
+    with _lock:
+        _ensure_index()
+        return sorted(set(_index) | set(_registered))
+
+def register_node_class(node_class: Type[BaseNode]):
+    """Registers a node class defined outside backend/nodes (e.g. benchmark or script nodes)."""
+    with _lock:
+        _ensure_index()
+        name = node_class.__name__
+        existing = _registered.get(name)
+        if name in _index or (existing is not None and existing is not node_class):
+            other = existing.__module__ if existing is not None else f"{NODES_PACKAGE}.{_index[name]}"
+            raise NodeLoaderError(
+                f"Duplicate node type found: {name} in {node_class.__module__} and {other}")
+        _registered[name] = node_class
 
 def get_node_class(node_type: str) -> Type[BaseNode]:
-    classes = _find_node_classes()
-    node_class = classes.get(node_type)
-    if node_class is None:
-        raise NodeLoaderError(f"Node type '{node_type}' not found. Available types: {list(classes.keys())}")
-    return node_class
-
-def reload_node_classes():
-    """Forces reloading of node classes. Useful for development with --reload."""
-    global _node_classes
-    _node_classes = None
-    # Clear previously imported node modules from sys.modules
-    modules_to_remove = []
-    prefix = "backend.nodes."
-    for mod_name in sys.modules:
-        if mod_name.startswith(prefix):
-            modules_to_remove.append(mod_name)
-    for mod_name in modules_to_remove:
-        del sys.modules[mod_name]
-    _find_node_classes() 
\ No newline at end of file
+    with _lock:
+        _ensure_index()
+        node_class = _registered.get(node_type) or _loaded.get(node_type)
+        if node_class is not None:
+            return node_class
+
+        if node_type in _duplicates:
+            modules = ", ".join(f"{NODES_PACKAGE}.{m}" for m in sorted(_duplicates[node_type]))
+            raise NodeLoaderError(f"Duplicate node type found: {node_type} in {modules}")
+        module_name = _index.get(node_type)
+        if module_name is None:
+            raise NodeLoaderError(f"Node type '{node_type}' not found. Available types: {available_node_types()}")
+
+        _import_module_types(module_name)
+        node_class = _loaded.get(node_type)
+        if node_class is None:
+            raise NodeLoaderError(f"Node type '{node_type}' is indexed in {NODES_PACKAGE}.{module_name} "
+                                  f"but the module does not define a concrete BaseNode subclass with that name.")
+        return node_class
+
+def reload_node_classes() -> List[str]:
+    """Picks up changes in the nodes directory. Useful for development with --reload.
+
+    Only modules whose source changed (or that were added or removed) are
+    dropped, along with modules whose classes inherit from theirs; they are
+    re-imported the next time one of their types is used. Returns the names
+    of the modules that changed.
+    """
+    global _modules
+    with _lock:
+        if _modules is None:
+            _ensure_index()
+            return []
+        previous = _modules
+        current = _scan(previous)
+        changed = sorted(name for name in set(previous) | set(current)
+                         if previous.get(name) is not current.get(name))
+        dependents = _dependents(set(changed), previous, current)
+        for name in changed + sorted(dependents):
+            sys.modules.pop(f"{NODES_PACKAGE}.{name}", None)
+            entry = previous.get(name)
+            for node_type in (entry.node_types if entry else []):
+                _loaded.pop(node_type, None)
+        _modules = current
+        if changed:
+            _rebuild_index()
+            # An edit can move a node type between modules; drop stale classes
+            for node_type in [t for t, cls in _loaded.items()
+                              if f"{NODES_PACKAGE}.{_index.get(t)}" != cls.__module__]:
+                _loaded.pop(node_type, None)
+            logger.info(f"Node modules changed: {changed}, dependents reloaded: {sorted(dependents)}")
+        return changed
@@ -0,0 +1,205 @@
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple, Type
+
+from backend.engine.base_node import NodeRunError
+
+logger = logging.getLogger(__name__)
+
+# Process pool for cpu_bound nodes run by the ExecutionEngine.
+#
+# CPU-heavy nodes hold the GIL, so on the engine's thread pool they stall every
+# other node. Run here, they scale across cores. Workers are started once and
+# reused across runs. Only the node class (pickled by reference), its params and
+# its dependencies' results are sent, with large arrays passed through shared
+# memory (see shared_results.py). The result is hashed in the worker, so large
+# outputs aren't hashed on the scheduling side as well.
+
+class NodeTimeoutError(Exception):
+    pass
+
+def _alarm(signum, frame):
+    raise NodeTimeoutError("Node exceeded its timeout")
+
+def _warm_up() -> int:
+    # Importing here keeps the first real task from paying for it
+    import backend.engine.node_cache  # noqa: F401
+    import backend.engine.shared_results  # noqa: F401
+    return os.getpid()
+
+def _run_in_worker(node_class: Type, context: Dict[str, Any], params: Dict[str, Any],
+                   timeout: Optional[float], hash_result: bool, share_min_bytes: Optional[int] = None,
+                   share_prefix: Optional[str] = None):
+    """Runs one node in a worker process. Returns (result, started_at, finished_at, result_hash).
+
+    Errors raised by the node come back as NodeRunError, with its timings.
+
+    With share_min_bytes, SharedArray handles in the context are attached as
+    zero-copy views and large arrays in the result are returned as handles
+    to blocks named after share_prefix.
+    """
+    from backend.engine.node_cache import hash_value
+    from backend.engine.shared_results import attach_arrays, share_arrays, unlink_block
+
+    if share_min_bytes is not None:
+        context = attach_arrays(context, {})
+
+    # Soft timeout: interrupts the node inside the worker, which stays usable.
+    # Tasks run on the worker's main thread, so SIGALRM can be used (POSIX only).
+    use_alarm = timeout is not None and hasattr(signal, "setitimer")
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    started_at = time.time()
+    try:
+        result = node_class().run(context=context, params=params)
+    except Exception as e:
+        raise NodeRunError(e, started_at, time.time()) from e
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    finished_at = time.time()
+
+    result_hash = None
+    if hash_result:
+        try:
+            result_hash = hash_value(result)
+        except Exception:
+            pass # Left to the caller, which decides how to handle unhashable results
+    if share_min_bytes is not None:
+        created = []
+        try:
+            result = share_arrays(result, share_min_bytes, created, share_prefix)
+        except BaseException:
+            for name in created:
+                unlink_block(name)
+            raise
+    return result, started_at, finished_at, result_hash
+
+class ProcessNodePool:
+    """A warm, self-healing ProcessPoolExecutor for cpu_bound nodes.
+
+    Workers are replaced after max_tasks_per_child tasks, so leaks in node code
+    are bounded. A node that runs past its timeout is interrupted inside the
+    worker. If it does not stop within `kill_grace` seconds more (e.g. it is
+    stuck in C code), the pool is recycled and its workers are killed. A crashed
+    worker also triggers a recycle. Tasks caught up in a recycle they did not
+    cause are resubmitted once.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_tasks_per_child: Optional[int] = 100,
+                 start_method: str = "spawn", kill_grace: float = 5.0, warm: bool = True):
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        # max_tasks_per_child needs Python 3.11+ and a start method other than fork
+        if max_tasks_per_child is not None and (sys.version_info < (3, 11) or start_method == "fork"):
+            logger.warning("max_tasks_per_child needs Python 3.11+ and a non-fork start method; workers won't be recycled.")
+            max_tasks_per_child = None
+        self.max_tasks_per_child = max_tasks_per_child
+        self.start_method = start_method
+        self.kill_grace = kill_grace
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+        self.stats = {"tasks": 0, "timeouts": 0, "recycles": 0, "resubmits": 0}
+        if warm:
+            self.warm()
+
+    def _current(self) -> Tuple[ProcessPoolExecutor, int]:
+        with self._lock:
+            if self._executor is None:
+                kwargs = {"max_workers": self.max_workers,
+                          "mp_context": multiprocessing.get_context(self.start_method)}
+                if self.max_tasks_per_child is not None:
+                    kwargs["max_tasks_per_child"] = self.max_tasks_per_child
+                self._executor = ProcessPoolExecutor(**kwargs)
+                self._generation += 1
+            return self._executor, self._generation
+
+    def warm(self, timeout: float = 60.0):
+        """Starts every worker now instead of on the first cpu_bound node."""
+        executor, _ = self._current()
+        futures = [executor.submit(_warm_up) for _ in range(self.max_workers)]
+        wait(futures, timeout=timeout)
+
+    def _recycle(self, generation: int, reason: str):
+        """Replaces the executor of the given generation (if still current) and kills its workers."""
+        with self._lock:
+            if generation != self._generation or self._executor is None:
+                return # Already replaced by another task
+            executor, self._executor = self._executor, None
+            self.stats["recycles"] += 1
+        logger.warning(f"Recycling CPU node worker pool: {reason}")
+        _kill_workers(executor)
+
+    def run(self, node_class: Type, context: Dict[str, Any], params: Dict[str, Any],
+            timeout: Optional[float] = None, hash_result: bool = False, share_min_bytes: Optional[int] = None,
+            share_prefix: Optional[str] = None):
+        """Runs the node in a worker and blocks until it finishes.
+
+        Returns (result, started_at, finished_at, result_hash). Raises
+        NodeRunError if the node fails (wrapping NodeTimeoutError if it was
+        interrupted by its timeout), or NodeTimeoutError if its worker had to
+        be killed. With
+        share_min_bytes, large arrays come back as SharedArray handles that the
+        caller must adopt (see shared_results.SharedResults), in blocks named
+        after share_prefix so they can be swept if the task fails.
+        """
+        with self._lock:
+            self.stats["tasks"] += 1
+        for attempt in range(2):
+            executor, generation = self._current()
+            try:
+                future: Future = executor.submit(_run_in_worker, node_class, context, params, timeout, hash_result,
+                                                 share_min_bytes, share_prefix)
+            except (BrokenProcessPool, RuntimeError) as e: # RuntimeError: shut down by a concurrent recycle
+                self._recycle(generation, f"submit failed: {e}")
+                continue
+            try:
+                return future.result(timeout=None if timeout is None else timeout + self.kill_grace)
+            except (NodeRunError, NodeTimeoutError) as e:
+                if isinstance(getattr(e, "error", e), NodeTimeoutError):
+                    with self._lock:
+                        self.stats["timeouts"] += 1
+                raise
+            except FutureTimeoutError:
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                self._recycle(generation, f"{node_class.__name__} did not stop after its {timeout}s timeout")
+                raise NodeTimeoutError(f"Node exceeded its {timeout}s timeout and its worker was killed")
+            except BrokenProcessPool:
+                with self._lock:
+                    recycled_underneath = generation != self._generation or self._executor is None
+                    if recycled_underneath and attempt == 0:
+                        self.stats["resubmits"] += 1
+                if recycled_underneath and attempt == 0:
+                    continue # Another node's timeout killed this worker; try once more
+                self._recycle(generation, f"worker died while running {node_class.__name__}")
+                raise
+        raise BrokenProcessPool(f"Could not run {node_class.__name__}: worker pool kept failing")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "workers": self.max_workers, "generation": self._generation}
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+def _kill_workers(executor: ProcessPoolExecutor):
+    kill = getattr(executor, "kill_workers", None) # Python 3.14+
+    if kill is not None:
+        kill()
+    else:
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.kill()
+    executor.shutdown(wait=False, cancel_futures=True)
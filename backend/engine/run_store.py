@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+class RunNotFoundError(Exception):
+    pass
+
+class RunRecord:
+    def __init__(self, run_id: str, graph_spec: Any, data: Any):
+        self.run_id = run_id
+        self.graph_spec = graph_spec
+        self.data = data # Per-node outputs, in whatever form the runner needs to reuse them
+        self.created_at = time.time()
+
+class RunStore:
+    """Keeps the specs and per-node outputs of recent runs so they can be re-run incrementally.
+
+    Bounded by entry count (least recently stored runs go first) and by age.
+    """
+
+    def __init__(self, max_runs: int = 256, ttl: float = 3600.0):
+        self.max_runs = max(1, max_runs)
+        self.ttl = ttl
+        self._runs: "OrderedDict[str, RunRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, run_id: str, graph_spec: Any, data: Any) -> RunRecord:
+        record = RunRecord(run_id, graph_spec, data)
+        with self._lock:
+            self._runs[run_id] = record
+            self._runs.move_to_end(run_id)
+            while len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+        return record
+
+    def get(self, run_id: str) -> Optional[RunRecord]:
+        with self._lock:
+            record = self._runs.get(run_id)
+            if record is not None and time.time() - record.created_at > self.ttl:
+                del self._runs[run_id]
+                return None
+            return record
+
+    def require(self, run_id: str) -> RunRecord:
+        record = self.get(run_id)
+        if record is None:
+            raise RunNotFoundError(f"Run '{run_id}' not found or expired.")
+        return record
+
+    def __len__(self):
+        return len(self._runs)
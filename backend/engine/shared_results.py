@@ -0,0 +1,243 @@
+import math
+import os
+import secrets
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import _posixshmem # What shared_memory itself uses on POSIX
+except ImportError: # Windows: a block is freed when its last handle closes
+    _posixshmem = None
+
+# Shared-memory envelope for large node results crossing the process pool.
+#
+# Without it, every array a cpu_bound node returns (or receives) is pickled,
+# pushed through a pipe and unpickled. Arrays of at least min_bytes are instead
+# copied once into a shared memory block and replaced by a SharedArray handle,
+# which pickles to a few bytes. The other side attaches to the block and gets a
+# zero-copy view. Blocks are unlinked as soon as no pending node can still need
+# the handle, and at the latest when the graph finishes. Arrays already handed
+# out stay valid until they are dropped: the mapping outlives the name.
+#
+# Blocks a worker creates for its result are named after the task
+# (<prefix>_0, <prefix>_1, ...), so if the task fails before its result is
+# adopted (worker killed, result lost) the scheduler can still unlink them.
+
+DEFAULT_MIN_BYTES = 1024 * 1024
+
+class SharedArray:
+    """Handle to a numpy array stored in a shared memory block."""
+    __slots__ = ("name", "shape", "dtype")
+
+    def __init__(self, name: str, shape: Tuple[int, ...], dtype: str):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return self.name, self.shape, self.dtype
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype = state
+
+    def __repr__(self) -> str:
+        return f"SharedArray({self.name!r}, shape={self.shape}, dtype={self.dtype!r})"
+
+class _Block(shared_memory.SharedMemory):
+    """A shared memory block whose mapping lives as long as any array viewing it.
+
+    Views pin the mapping (see _view), so closing a block that is still
+    viewed leaves it mapped until the last view is dropped.
+    """
+
+    def __init__(self, name: Optional[str] = None, create: bool = False, size: int = 0):
+        super().__init__(name=name, create=create, size=size)
+        # mmap keeps its own duplicate descriptor, so this one can go now rather
+        # than staying open for as long as views of the block are alive
+        if getattr(self, "_fd", -1) >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def close(self):
+        try:
+            super().close()
+        except BufferError:
+            pass # Arrays still view the mapping; it is unmapped once they are gone
+
+def _view(block: _Block, handle: SharedArray) -> np.ndarray:
+    # frombuffer holds a buffer export on the mapping, which keeps close() from
+    # unmapping it; np.ndarray(buffer=...) would not
+    dtype = np.dtype(handle.dtype)
+    return np.frombuffer(block.buf, dtype=dtype, count=math.prod(handle.shape)).reshape(handle.shape)
+
+def unlink_block(name: str) -> bool:
+    """Unlinks a block by name, without mapping it. Returns False if it didn't exist."""
+    if _posixshmem is None:
+        return False
+    try:
+        _posixshmem.shm_unlink("/" + name)
+    except FileNotFoundError:
+        return False
+    resource_tracker.unregister("/" + name, "shared_memory")
+    return True
+
+def _create_block(name: Optional[str], size: int) -> _Block:
+    try:
+        return _Block(name, create=True, size=size)
+    except FileExistsError:
+        # Left by an earlier attempt at the same task (e.g. resubmitted after a pool recycle)
+        unlink_block(name)
+        return _Block(name, create=True, size=size)
+
+def _map(value: Any, fn: Callable[[Any], Any]) -> Any:
+    """Applies fn to every leaf of nested dicts, lists and tuples."""
+    if isinstance(value, dict):
+        return {key: _map(item, fn) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_map(item, fn) for item in value]
+    if isinstance(value, tuple) and not hasattr(value, "_fields"): # Namedtuples are left alone
+        return tuple(_map(item, fn) for item in value)
+    return fn(value)
+
+def handle_names(value: Any) -> List[str]:
+    """Block names of every SharedArray in the value."""
+    names: List[str] = []
+
+    def collect(item):
+        if isinstance(item, SharedArray):
+            names.append(item.name)
+        return item
+
+    _map(value, collect)
+    return names
+
+def share_arrays(value: Any, min_bytes: int, created: List[str], prefix: Optional[str] = None) -> Any:
+    """The value with numpy arrays of at least min_bytes moved to new blocks.
+
+    The names of the new blocks are appended to `created`; the caller (or
+    whoever receives the handles) is responsible for unlinking them. With a
+    prefix, blocks are named <prefix>_0, <prefix>_1, ... instead of randomly.
+    """
+    def share(item):
+        if not isinstance(item, np.ndarray) or item.nbytes < min_bytes or item.dtype.hasobject:
+            return item
+        name = f"{prefix}_{len(created)}" if prefix is not None else None
+        block = _create_block(name, item.nbytes)
+        handle = SharedArray(block.name, item.shape, item.dtype.str)
+        _view(block, handle)[...] = item
+        created.append(block.name)
+        return handle
+
+    return _map(value, share)
+
+def attach_arrays(value: Any, blocks: Dict[str, _Block]) -> Any:
+    """The value with every SharedArray replaced by a zero-copy view.
+
+    Blocks not in `blocks` yet are attached and added to it.
+    """
+    def attach(item):
+        if not isinstance(item, SharedArray):
+            return item
+        block = blocks.get(item.name)
+        if block is None:
+            block = blocks[item.name] = _Block(item.name)
+        return _view(block, item)
+
+    return _map(value, attach)
+
+class SharedResults:
+    """The shared memory blocks of one graph run, counted by the nodes that may still read them.
+
+    Used by the ExecutionEngine on the scheduling side of the process pool.
+    """
+
+    def __init__(self, min_bytes: int = DEFAULT_MIN_BYTES):
+        self.min_bytes = min_bytes
+        self._lock = threading.Lock()
+        self._blocks: Dict[str, _Block] = {}
+        self._handles: Dict[str, Any] = {} # Node id -> its result in handle form
+        self._names: Dict[str, List[str]] = {} # Node id -> its blocks
+        self._pending: Dict[str, int] = {} # Node id -> consumers that haven't finished yet
+        self._token = secrets.token_hex(4)
+        self._tasks = 0
+        self.stats = {"blocks": 0, "bytes": 0, "swept": 0}
+
+    def task_prefix(self) -> str:
+        """A name prefix for the blocks one worker task creates (short enough for macOS's 31 characters)."""
+        with self._lock:
+            self._tasks += 1
+            return f"ag{self._token}_{self._tasks}"
+
+    def adopt(self, node_id: str, result: Any, consumers: int) -> Any:
+        """Takes over the blocks in a worker's result and returns it with views in place of handles.
+
+        The handles are kept for the node's `consumers` (its children), so
+        cpu_bound children get them instead of a fresh copy.
+        """
+        names = handle_names(result)
+        if not names:
+            return result
+        with self._lock:
+            view = attach_arrays(result, self._blocks)
+            self.stats["blocks"] += len(names)
+            self.stats["bytes"] += sum(self._blocks[name].size for name in names)
+            self._names[node_id] = names
+            if consumers > 0:
+                self._handles[node_id] = result
+                self._pending[node_id] = consumers
+            else:
+                self._release(node_id)
+        return view
+
+    def for_process(self, node_id: str, value: Any, created: List[str]) -> Any:
+        """A dependency's result as sent to a worker.
+
+        Results adopted from workers are sent as their handles; large arrays
+        in any other result are moved to new blocks, whose names are appended
+        to `created` for release_task.
+        """
+        with self._lock:
+            handles = self._handles.get(node_id)
+        if handles is not None:
+            return handles
+        return share_arrays(value, self.min_bytes, created)
+
+    def release_task(self, names: List[str]):
+        """Unlinks blocks created for a single task once it has finished."""
+        for name in names:
+            unlink_block(name)
+
+    def sweep(self, prefix: str):
+        """Unlinks the blocks a task created under prefix, for a result that was never adopted."""
+        index = 0
+        while unlink_block(f"{prefix}_{index}"):
+            index += 1
+        if index:
+            with self._lock:
+                self.stats["swept"] += index
+
+    def consumer_done(self, dependency_ids: List[str]):
+        """Called when a node finishes; releases dependencies no other pending node needs."""
+        with self._lock:
+            for dep_id in dependency_ids:
+                if dep_id in self._pending:
+                    self._pending[dep_id] -= 1
+                    if self._pending[dep_id] <= 0:
+                        self._release(dep_id)
+
+    def _release(self, node_id: str):
+        self._pending.pop(node_id, None)
+        self._handles.pop(node_id, None)
+        for name in self._names.pop(node_id, []):
+            self._blocks.pop(name, None)
+            unlink_block(name) # Views already handed out keep the memory mapped
+
+    def close(self):
+        """Unlinks every remaining block. Call when the graph has finished."""
+        with self._lock:
+            for node_id in list(self._names):
+                self._release(node_id)
+            self._blocks.clear()
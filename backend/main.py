@@ -1,6 +1,8 @@
 import logging
 from fastapi import FastAPI
-from backend.api.routes import submit_graph
+from backend.api.routes import submit_graph, batch_graph, stream_graph, jobs, metrics, rerun_graph
+from backend.core.job_manager import job_manager
+from backend.utils import fmp_client, llm_client
 
 # Basic logging configuration
 logging.basicConfig(level=logging.INFO,
@@ -11,6 +13,24 @@ app = FastAPI(title="FinRobot 2.0 Backend")
 
 logger.info("Including /api router")
 app.include_router(submit_graph.router, prefix="/api")
+app.include_router(batch_graph.router, prefix="/api")
+app.include_router(stream_graph.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
+app.include_router(rerun_graph.router, prefix="/api")
+app.include_router(metrics.router) # Scrapers expect /metrics at the root
+
+@app.on_event("startup")
+async def startup():
+    # Open the shared FMP connection pool once per worker process
+    await fmp_client.init_client()
+    await job_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_manager.stop()
+    await fmp_client.close_client()
+    await fmp_client.close_cache()
+    await llm_client.close_cache()
 
 @app.get("/")
 def read_root():
@@ -13,3 +13,12 @@ class EdgeSpec(BaseModel):
 class GraphSpec(BaseModel):
     nodes: List[NodeSpec]
     edges: List[EdgeSpec]
+
+class BatchGraphRequest(BaseModel):
+    graph: GraphSpec # Template, run once per ticker
+    tickers: List[str]
+    concurrency: int = 8
+
+class RerunGraphRequest(BaseModel):
+    previous_run_id: str # X-Run-Id of an earlier /execute-graph?record=true or rerun response
+    graph: GraphSpec # Modified spec; only changed nodes and their descendants run
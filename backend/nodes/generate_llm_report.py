@@ -1,6 +1,7 @@
 import logging
 import json
-from backend.utils.llm_client import call_llm
+from backend.utils.llm_client import call_llm, stream_llm
+from backend.core.events import emit, streaming_enabled
 
 logger = logging.getLogger(__name__)
 
@@ -10,11 +11,11 @@ NODE_REQUIRES = ["current_ticker", "processed_financials", "income_summary"]
 def generate_llm_report_node(params):
     # Potential params for LLM call (e.g., model, length constraint)
     llm_model = params.get("model", "gpt-4o") # Default model
+    use_cache = params.get("use_cache", True) # Set False to always request a fresh report
 
     async def node(state: dict) -> dict:
         node_name = "GenerateLLMReport"
         logger.info(f"Running {node_name} with params: {params}")
-        current_errors = state.get("errors", [])
         new_errors = []
 
         # --- Dependency Check ---
@@ -25,7 +26,7 @@ def generate_llm_report_node(params):
             # Return update with error message and placeholder report
             return {
                 "markdown_report": f"# Report Generation Failed\n\nMissing required inputs: {error_msg}", 
-                "errors": current_errors + [f"{node_name}: {error_msg}"]
+                "errors": [f"{node_name}: {error_msg}"]
             }
 
         # --- Gather Data from State for Prompt Context --- 
@@ -39,7 +40,7 @@ def generate_llm_report_node(params):
             logger.error(f"{node_name}: {error_msg}")
             return {
                 "markdown_report": f"# Report Generation Failed\n\n{error_msg}",
-                "errors": current_errors + [f"{node_name}: {error_msg}"]
+                "errors": [f"{node_name}: {error_msg}"]
             }
             
         report_update = {}
@@ -88,7 +89,15 @@ Generate the Markdown report now.
 
         # --- Call LLM and Update State --- 
         try:
-            markdown_report = await call_llm(prompt, model=llm_model)
+            if streaming_enabled():
+                # A streaming endpoint is listening: forward tokens as they arrive
+                chunks = []
+                async for text in stream_llm(prompt, model=llm_model, use_cache=use_cache):
+                    chunks.append(text)
+                    emit("token", {"key": "markdown_report", "text": text})
+                markdown_report = "".join(chunks).strip()
+            else:
+                markdown_report = await call_llm(prompt, model=llm_model, use_cache=use_cache)
             
             # Check if LLM call itself returned an error message
             if markdown_report.startswith("Error:"):
@@ -109,7 +118,7 @@ Generate the Markdown report now.
         # Return only the updates (report and errors)
         return {
             **report_update,
-            "errors": current_errors + [f"{node_name}: {e}" for e in new_errors]
+            "errors": [f"{node_name}: {e}" for e in new_errors]
         }
 
     return node 
\ No newline at end of file
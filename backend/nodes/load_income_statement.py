@@ -1,6 +1,6 @@
 import logging
 import asyncio
-from backend.utils.fmp_client import fetch_income_statement
+from backend.utils.statement_store import load_statement
 
 logger = logging.getLogger(__name__)
 
@@ -10,26 +10,30 @@ NODE_REQUIRES = ["current_ticker"]
 def load_income_statement_node(params):
     period = params.get("period", "annual")
     limit = params.get("limit", 5)
+    # Optional: lets the loader run as an independent root instead of after LoadTickerData
+    ticker_param = params.get("ticker")
+    # Optional: "off", "prefer", "sync" or "only" (see statement_store); defaults to STATEMENT_STORE_MODE
+    store_mode = params.get("store")
 
     async def node(state: dict) -> dict:
         node_name = "LoadIncomeStatement"
-        current_errors = state.get("errors", []) # Get existing errors
 
         # --- Dependency Check ---
         missing_keys = [key for key in NODE_REQUIRES if key not in state or state[key] is None]
-        if missing_keys:
+        if missing_keys and not ticker_param:
             error_msg = f"Missing required state keys: {', '.join(missing_keys)}"
             logger.error(f"{node_name}: {error_msg}")
             # Return only the new error for this key
-            return {"errors": current_errors + [f"{node_name}: {error_msg}"]}
+            return {"errors": [f"{node_name}: {error_msg}"]}
 
         # --- Get Data from State ---
-        ticker = state["current_ticker"] 
+        ticker = ticker_param or state["current_ticker"]
         
         logger.info(f"Running {node_name} for {ticker} (period={period}, limit={limit})")
 
         try:
-            income_statement_data = await fetch_income_statement(ticker, period=period, limit=limit)
+            income_statement_data = await load_statement("income-statement", ticker, period=period,
+                                                         limit=limit, mode=store_mode)
             logger.info(f"Successfully fetched income statement for {ticker}")
             # Return the successful state update (only the changed key)
             return {"raw_income_statement": income_statement_data}
@@ -37,6 +41,6 @@ def load_income_statement_node(params):
             error_msg = f"Failed to fetch income statement for {ticker}: {e}"
             logger.error(f"{node_name}: {error_msg}")
             # Return only the new error
-            return {"errors": current_errors + [f"{node_name}: {error_msg}"]}
+            return {"errors": [f"{node_name}: {error_msg}"]}
 
     return node 
\ No newline at end of file
@@ -1,4 +1,5 @@
 import logging
+from backend.utils.statements import financial_history
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +11,6 @@ def preprocess_financials_node(params):
     async def node(state: dict) -> dict:
         node_name = "PreprocessFinancials"
         logger.info(f"Running {node_name} with params: {params}")
-        current_errors = state.get("errors", [])
         new_errors = []
 
         # --- Dependency Check ---
@@ -18,8 +18,8 @@ def preprocess_financials_node(params):
         if missing_keys:
             error_msg = f"Missing required state keys: {', '.join(missing_keys)}"
             logger.error(f"{node_name}: {error_msg}")
-            # Return existing errors plus the new dependency error
-            return {"errors": current_errors + [f"{node_name}: {error_msg}"]} 
+            # Return only the new dependency error (errors are merged by the state reducer)
+            return {"errors": [f"{node_name}: {error_msg}"]} 
 
         # --- Get Raw Data from State --- 
         # We know these exist now due to the check above
@@ -27,7 +27,7 @@ def preprocess_financials_node(params):
         raw_balance_sheet = state["raw_balance_sheet"]
         # Optional data - use .get()
         ticker_profile_list = state.get("ticker_profile") 
-        # raw_cash_flow = state.get("raw_cash_flow") # Not used in this example yet
+        raw_cash_flow = state.get("raw_cash_flow") # Optional: adds cash flow metrics to the history
 
         processed_update = {} # Initialize here
 
@@ -47,9 +47,9 @@ def preprocess_financials_node(params):
             valid_input = False
 
         if not valid_input:
-            # Return existing errors plus the new validation errors
+            # Return only the new validation errors
             # We don't set processed_financials here
-            return {"errors": current_errors + [f"{node_name}: {e}" for e in new_errors]}
+            return {"errors": [f"{node_name}: {e}" for e in new_errors]}
 
 
         # --- Preprocessing Logic (Example) --- 
@@ -87,6 +87,11 @@ def preprocess_financials_node(params):
                 logger.warning("No valid balance sheet data found for preprocessing.")
                 new_errors.append("Balance sheet data missing or invalid format.")
 
+            # Multi-period metrics over every fetched period (columnar, vectorized)
+            processed_financials["history"] = financial_history(
+                raw_income_statement, raw_balance_sheet,
+                raw_cash_flow if isinstance(raw_cash_flow, list) else None)
+
             # Add profile info if available
             if isinstance(ticker_profile_list, list) and ticker_profile_list:
                 ticker_profile = ticker_profile_list[0] # Extract dict from list
@@ -116,7 +121,7 @@ def preprocess_financials_node(params):
         # Combine the state updates and any new errors
         return {
             **processed_update, 
-            "errors": current_errors + [f"{node_name}: {e}" for e in new_errors]
+            "errors": [f"{node_name}: {e}" for e in new_errors]
         }
 
     return node 
\ No newline at end of file
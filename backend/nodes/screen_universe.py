@@ -0,0 +1,98 @@
+import logging
+import asyncio
+import math
+from backend.utils.fmp_client import fetch_income_statement, fetch_balance_sheet
+from backend.utils.screening import (INCOME_FIELDS, BALANCE_FIELDS, stack_arrays, stack_statements,
+                                     screening_metrics, screen)
+from backend.utils.statement_store import STATEMENT_STORE_MODE, load_statement_array
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RANK_BY = "return_on_equity"
+
+def screen_universe_node(params):
+    tickers = [t.strip().upper() for t in params.get("tickers", []) if isinstance(t, str) and t.strip()]
+    period = params.get("period", "annual")
+    limit = int(params.get("limit", 5))
+    rank_by = params.get("rank_by", DEFAULT_RANK_BY)
+    # e.g. {"net_margin": {"min": 0.1}, "debt_to_equity": {"max_percentile": 50}}
+    filters = params.get("filters", {})
+    top_n = int(params.get("top_n", 25))
+    concurrency = max(1, int(params.get("concurrency", 50)))
+    # Optional: "off", "prefer", "sync" or "only" (see statement_store); defaults to STATEMENT_STORE_MODE
+    store_mode = (params.get("store") or STATEMENT_STORE_MODE).lower()
+
+    async def node(state: dict) -> dict:
+        node_name = "ScreenUniverse"
+
+        if not tickers:
+            error_msg = "tickers parameter missing or empty"
+            logger.error(f"{node_name}: {error_msg}")
+            return {"errors": [f"{node_name}: {error_msg}"]}
+
+        logger.info(f"Running {node_name} over {len(tickers)} tickers (rank_by={rank_by}, top_n={top_n})")
+
+        # --- Load statements through the shared client (cached, coalesced, rate limited) ---
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def load(ticker: str):
+            async with semaphore:
+                if store_mode != "off":
+                    # Memory-mapped arrays from the statement store; only missing or stale tickers are fetched
+                    return await asyncio.gather(
+                        load_statement_array("income-statement", ticker, period, limit, mode=store_mode),
+                        load_statement_array("balance-sheet-statement", ticker, period, limit, mode=store_mode))
+                income, balance = await asyncio.gather(
+                    fetch_income_statement(ticker, period=period, limit=limit),
+                    fetch_balance_sheet(ticker, period=period, limit=limit))
+                return income, balance
+
+        loaded = await asyncio.gather(*(load(ticker) for ticker in tickers), return_exceptions=True)
+        failed = [ticker for ticker, outcome in zip(tickers, loaded) if isinstance(outcome, Exception)]
+        if failed:
+            logger.warning(f"{node_name}: failed to load {len(failed)} of {len(tickers)} tickers")
+
+        # --- Vectorized screening ---
+        def compute():
+            income_statements = [o[0] if not isinstance(o, Exception) else None for o in loaded]
+            balance_sheets = [o[1] if not isinstance(o, Exception) else None for o in loaded]
+            stack = stack_arrays if store_mode != "off" else stack_statements
+            income, income_dates = stack(income_statements, INCOME_FIELDS, limit)
+            balance, balance_dates = stack(balance_sheets, BALANCE_FIELDS, limit)
+            metrics = screening_metrics(income, income_dates, balance, balance_dates)
+            return (income_dates, metrics, *screen(metrics, filters, rank_by, top_n))
+
+        try:
+            # CPU-bound numpy work; off the event loop so other nodes and requests keep running
+            income_dates, metrics, selected, passed, percentiles = await asyncio.to_thread(compute)
+        except ValueError as e:
+            logger.error(f"{node_name}: {e}")
+            return {"errors": [f"{node_name}: {e}"]}
+        except Exception as e:
+            error_msg = f"Error during screening: {e}"
+            logger.exception(f"{node_name}: {error_msg}")
+            return {"errors": [f"{node_name}: {error_msg}"]}
+
+        def clean(value):
+            value = float(value)
+            return round(value, 6) if math.isfinite(value) else None
+
+        results = [{
+            "ticker": tickers[i],
+            "rank": position + 1,
+            "date": str(income_dates[i, 0]) or None,
+            f"{rank_by}_percentile": clean(percentiles[rank_by][i]),
+            **{name: clean(values[i]) for name, values in metrics.items()},
+        } for position, i in enumerate(selected)]
+
+        logger.info(f"{node_name}: {passed} of {len(tickers)} tickers passed, returning {len(results)}")
+        return {"screen_results": {
+            "universe_size": len(tickers),
+            "passed": passed,
+            "failed": failed,
+            "rank_by": rank_by,
+            "filters": filters,
+            "results": results,
+        }}
+
+    return node
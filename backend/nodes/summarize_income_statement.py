@@ -9,7 +9,6 @@ def summarize_income_statement_node(params):
     async def node(state: dict) -> dict:
         node_name = "SummarizeIncomeStatement"
         logger.info(f"Running {node_name} with params: {params}")
-        current_errors = state.get("errors", [])
         new_errors = []
 
         # --- Dependency Check ---
@@ -17,7 +16,7 @@ def summarize_income_statement_node(params):
         if missing_keys:
             error_msg = f"Missing required state keys: {', '.join(missing_keys)}"
             logger.error(f"{node_name}: {error_msg}")
-            return {"income_summary": None, "errors": current_errors + [f"{node_name}: {error_msg}"]}
+            return {"income_summary": None, "errors": [f"{node_name}: {error_msg}"]}
 
         # --- Get Data from State --- 
         processed_financials = state["processed_financials"]
@@ -29,7 +28,7 @@ def summarize_income_statement_node(params):
             logger.warning(f"{node_name}: {error_msg}")
             new_errors.append(error_msg)
             summary_update["income_summary"] = None
-            return {**summary_update, "errors": current_errors + [f"{node_name}: {e}" for e in new_errors]}
+            return {**summary_update, "errors": [f"{node_name}: {e}" for e in new_errors]}
 
         latest_is = processed_financials.get("latest_income_statement")
         if not latest_is or not isinstance(latest_is, dict):
@@ -38,7 +37,7 @@ def summarize_income_statement_node(params):
              new_errors.append(error_msg)
              summary_update["income_summary"] = None
              # Return only the updates (summary and errors)
-             return {**summary_update, "errors": current_errors + [f"{node_name}: {e}" for e in new_errors]}
+             return {**summary_update, "errors": [f"{node_name}: {e}" for e in new_errors]}
 
         # --- Summarization Logic (Placeholder - No LLM yet) --- 
         # TODO: Replace with actual LLM call for summarization
@@ -76,7 +75,7 @@ def summarize_income_statement_node(params):
         # Return only the updates (summary and errors)
         return {
             **summary_update,
-            "errors": current_errors + [f"{node_name}: {e}" for e in new_errors]
+            "errors": [f"{node_name}: {e}" for e in new_errors]
         }
 
     return node 
\ No newline at end of file
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class _PendingBatch:
+    def __init__(self):
+        self.waiters: Dict[Hashable, List[asyncio.Future]] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+class MicroBatcher:
+    """Collects single-key loads arriving within a short window into one batch call.
+
+    batch_func receives the list of distinct keys and returns a dict mapping
+    each key to its value. Keys missing from the dict resolve to a fresh
+    default_factory() (or None without a factory), like a defaultdict.
+    If batch_func raises, every waiter in that batch gets the exception.
+    """
+
+    def __init__(self, batch_func: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+                 window: float = 0.01, max_batch_size: int = 50,
+                 default_factory: Optional[Callable[[], Any]] = None, name: str = "batcher"):
+        self.batch_func = batch_func
+        self.window = window
+        self.max_batch_size = max(1, max_batch_size)
+        self.default_factory = default_factory
+        self.name = name
+        # Pending batches per event loop, since futures can't be shared across loops
+        self._pending: Dict[int, _PendingBatch] = {}
+        self._tasks = set()
+        self.stats = {"loads": 0, "batches": 0, "keys": 0}
+
+    async def load(self, key: Hashable) -> Any:
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(id(loop), _PendingBatch())
+        future = loop.create_future()
+        pending.waiters.setdefault(key, []).append(future)
+        self.stats["loads"] += 1
+
+        if len(pending.waiters) >= self.max_batch_size:
+            self._flush(loop)
+        elif pending.timer is None:
+            pending.timer = loop.call_later(self.window, self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        pending = self._pending.pop(id(loop), None)
+        if pending is None or not pending.waiters:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        task = loop.create_task(self._run_batch(pending.waiters))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, waiters: Dict[Hashable, List[asyncio.Future]]):
+        keys = list(waiters)
+        self.stats["batches"] += 1
+        self.stats["keys"] += len(keys)
+        logger.debug(f"{self.name}: sending batch of {len(keys)} keys")
+        try:
+            results = await self.batch_func(keys)
+        except Exception as e:
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for key, futures in waiters.items():
+            if key in results:
+                value = results[key]
+            else:
+                value = self.default_factory() if self.default_factory is not None else None
+            for future in futures:
+                if not future.done(): # The waiter may have been cancelled
+                    future.set_result(value)
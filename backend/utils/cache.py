@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A cache lookup returns (value, is_fresh). Stale values are still returned
+# so callers can serve them immediately and revalidate in the background.
+CacheLookup = Optional[Tuple[Any, bool]]
+
+# Values that can be handed out as they are; anything else is stored pickled,
+# so every hit is a fresh copy and callers can't mutate the cached value
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+class _Pickled(bytes):
+    pass
+
+class LRUCache:
+    """In-process LRU cache with per-entry TTL and stale window.
+
+    get() returns a copy of the value, so mutating it leaves the cache intact.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+
+    def get(self, key: str) -> CacheLookup:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, stale_until = entry
+        now = time.time()
+        if now >= stale_until:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        if isinstance(value, _Pickled):
+            value = pickle.loads(value)
+        return value, now < expires_at
+
+    def set(self, key: str, value: Any, expires_at: float, stale_until: float):
+        if not isinstance(value, _IMMUTABLE_TYPES):
+            try:
+                value = _Pickled(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception as e:
+                logger.warning(f"Not caching {key}: value can't be pickled ({e})")
+                self._entries.pop(key, None)
+                return
+        self._entries[key] = (value, expires_at, stale_until)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class DiskTier:
+    """Persistent tier storing one JSON file per key under a directory.
+
+    With max_bytes set, the oldest files are pruned once the directory grows
+    past the limit. Sizes are re-measured every `prune_every` writes, so the
+    limit can be overshot briefly.
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None, prune_every: int = 100):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.prune_every = max(1, prune_every)
+        self._writes = 0
+        self._writes_lock = threading.Lock() # Writes run on several asyncio.to_thread workers at once
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        # Shard by prefix so a large cache doesn't put everything in one directory
+        return self.directory / digest[:2] / f"{digest}.json"
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache file {path}: {e}")
+            return None
+        if time.time() >= record.get("stale_until", 0):
+            path.unlink(missing_ok=True)
+            return None
+        return record
+
+    def _write(self, key: str, record: Dict[str, Any]):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path) # Atomic so readers never see a partial file
+        with self._writes_lock:
+            self._writes += 1
+            prune = self.max_bytes and self._writes % self.prune_every == 0
+        if prune:
+            self._prune()
+
+    def _prune(self):
+        files = []
+        total = 0
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        # Remove the oldest entries until we're comfortably under the limit
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        logger.info(f"Pruned disk cache {self.directory} to {total} bytes")
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, record: Dict[str, Any]):
+        await asyncio.to_thread(self._write, key, record)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(lambda: self._path(key).unlink(missing_ok=True))
+
+    async def close(self):
+        pass
+
+class RedisTier:
+    """Shared tier backed by Redis, so cached data survives restarts and is shared by workers."""
+
+    def __init__(self, url: str, prefix: str = "assetgraph:"):
+        import aioredis # Optional dependency, only needed when this tier is configured
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url, encoding="utf-8", decode_responses=True)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self._redis.get(self.prefix + key)
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    async def set(self, key: str, record: Dict[str, Any]):
+        ttl = max(1, int(record["stale_until"] - time.time()))
+        await self._redis.set(self.prefix + key, json.dumps(record), ex=ttl)
+
+    async def delete(self, key: str):
+        await self._redis.delete(self.prefix + key)
+
+    async def close(self):
+        await self._redis.close()
+
+class TieredCache:
+    """LRU in front of an optional persistent tier (disk or Redis).
+
+    Values must be JSON-serializable when a persistent tier is configured.
+    Errors from the persistent tier are logged and treated as misses so a
+    cache outage never fails a request.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, backend: Any = None):
+        self.name = name
+        self.memory = LRUCache(max_entries)
+        self.backend = backend
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "backend_hits": 0, "backend_errors": 0}
+
+    async def get(self, key: str) -> CacheLookup:
+        found = self.memory.get(key)
+        if found is None and self.backend is not None:
+            try:
+                record = await self.backend.get(key)
+            except Exception as e:
+                logger.warning(f"{self.name} cache backend read failed: {e}")
+                self.stats["backend_errors"] += 1
+                record = None
+            if record is not None:
+                self.stats["backend_hits"] += 1
+                self.memory.set(key, record["value"], record["expires_at"], record["stale_until"])
+                found = self.memory.get(key)
+
+        if found is None:
+            self.stats["misses"] += 1
+        elif found[1]:
+            self.stats["hits"] += 1
+        else:
+            self.stats["stale_hits"] += 1
+        return found
+
+    async def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0.0):
+        now = time.time()
+        expires_at = now + ttl
+        stale_until = expires_at + stale_ttl
+        self.memory.set(key, value, expires_at, stale_until)
+        if self.backend is not None:
+            record = {"value": value, "expires_at": expires_at, "stale_until": stale_until}
+            try:
+                await self.backend.set(key, record)
+            except Exception as e:
+                logger.warning(f"{self.name} cache backend write failed: {e}")
+                self.stats["backend_errors"] += 1
+
+    async def delete(self, key: str):
+        self.memory.delete(key)
+        if self.backend is not None:
+            try:
+                await self.backend.delete(key)
+            except Exception as e:
+                logger.warning(f"{self.name} cache backend delete failed: {e}")
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["stale_hits"]) / lookups if lookups else 0.0
+        return {**self.stats, "entries": len(self.memory), "hit_rate": round(hit_rate, 4)}
+
+def build_backend(kind: str, directory: Optional[str] = None, redis_url: Optional[str] = None,
+                  max_bytes: Optional[int] = None):
+    """Creates a persistent tier from config values ('memory', 'disk' or 'redis')."""
+    kind = (kind or "memory").lower()
+    if kind == "memory":
+        return None
+    if kind == "disk":
+        return DiskTier(directory or ".cache", max_bytes=max_bytes)
+    if kind == "redis":
+        if not redis_url:
+            logger.warning("Redis cache backend requested but no REDIS_URL is set. Using memory only.")
+            return None
+        try:
+            return RedisTier(redis_url)
+        except Exception as e:
+            logger.warning(f"Could not initialize Redis cache backend ({e}). Using memory only.")
+            return None
+    logger.warning(f"Unknown cache backend '{kind}'. Using memory only.")
+    return None
@@ -1,55 +1,329 @@
-import httpx
+import asyncio
 import os
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 import logging
+import time
+from backend.core import metrics
+from backend.utils.cache import TieredCache, build_backend
+from backend.utils.singleflight import SingleFlight
+from backend.utils.batcher import MicroBatcher
+from backend.utils.rate_limiter import AdaptiveRateLimiter, RetryDecision, call_with_retry, parse_retry_after
+
+if TYPE_CHECKING:
+    import httpx # Imported on first use; it isn't needed until the first request
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
-API_KEY = os.getenv("FMP_API_KEY")
-BASE_URL = "https://financialmodelingprep.com/api/v3"
-
-if not API_KEY:
-    logger.error("FMP_API_KEY not found in environment variables.")
-    raise ValueError("FMP_API_KEY not found in environment variables. Please set it in your .env file.")
-
-async def _fetch_fmp(endpoint: str, params: dict = {}):
-    """Helper function to fetch data from FMP API."""
-    params["apikey"] = API_KEY
-    url = f"{BASE_URL}/{endpoint}"
-    async with httpx.AsyncClient(timeout=30.0) as client: # Add timeout
-        try:
-            logger.debug(f"Fetching FMP URL: {url} with params: {params}")
-            response = await client.get(url, params=params)
-            response.raise_for_status() # Raises HTTPStatusError for 4xx/5xx responses
-            logger.debug(f"FMP Response Status: {response.status_code}")
-            return response.json()
-        except httpx.RequestError as exc:
-            logger.error(f"An error occurred while requesting {exc.request.url!r}: {exc}")
-            raise # Re-raise the exception to be handled by the caller node
-        except httpx.HTTPStatusError as exc:
-            logger.error(f"Error response {exc.response.status_code} while requesting {exc.request.url!r}: {exc.response.text}")
-            raise # Re-raise the exception
+# Read on first request (see get_api_key), so importing this module never fails
+API_KEY: Optional[str] = None
+# Overridable so benchmarks can point the client at a local stand-in
+BASE_URL = os.getenv("FMP_BASE_URL", "https://financialmodelingprep.com/api/v3")
+
+# --- Connection Pool Settings ---
+# One AsyncClient per event loop is shared by every request on that loop, so
+# TCP/TLS connections are kept alive and reused across nodes and graph runs.
+# A client's connections belong to the loop that opened them, so scripts
+# calling asyncio.run repeatedly and engine threads each get their own.
+HTTP2_ENABLED = os.getenv("FMP_HTTP2", "false").lower() in ("1", "true", "yes")
+MAX_CONNECTIONS = int(os.getenv("FMP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("FMP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("FMP_KEEPALIVE_EXPIRY", "30.0"))
+REQUEST_TIMEOUT = float(os.getenv("FMP_TIMEOUT", "30.0"))
+
+# --- Cache Settings ---
+# Statements change a few times a year, so entries stay fresh for hours and can
+# be served stale (while refreshed in the background) for much longer.
+CACHE_ENABLED = os.getenv("FMP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_BACKEND = os.getenv("FMP_CACHE_BACKEND", "memory") # "memory", "disk" or "redis"
+CACHE_DIR = os.getenv("FMP_CACHE_DIR", ".cache/fmp")
+CACHE_MAX_ENTRIES = int(os.getenv("FMP_CACHE_MAX_ENTRIES", "4096"))
+CACHE_STALE_SECONDS = float(os.getenv("FMP_CACHE_STALE_SECONDS", str(7 * 24 * 3600)))
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Fresh TTL (seconds) per endpoint, overridable with e.g. FMP_CACHE_TTL_INCOME_STATEMENT
+ENDPOINT_TTLS = {
+    "profile": 6 * 3600,
+    "income-statement": 24 * 3600,
+    "balance-sheet-statement": 24 * 3600,
+    "cash-flow-statement": 24 * 3600,
+}
+for _endpoint in ENDPOINT_TTLS:
+    _override = os.getenv(f"FMP_CACHE_TTL_{_endpoint.upper().replace('-', '_')}")
+    if _override:
+        ENDPOINT_TTLS[_endpoint] = float(_override)
+
+# --- Profile Micro-Batching ---
+# The profile endpoint accepts comma-separated symbols, so lookups arriving
+# within a short window are sent as one request. A window of 0 disables it.
+PROFILE_BATCH_WINDOW_MS = float(os.getenv("FMP_PROFILE_BATCH_WINDOW_MS", "10"))
+PROFILE_BATCH_MAX_SIZE = int(os.getenv("FMP_PROFILE_BATCH_MAX_SIZE", "50"))
+
+# --- Rate Limiting ---
+# Shared by every FMP request in the process. Defaults match a 300 calls/minute plan.
+RATE_LIMIT_PER_MIN = float(os.getenv("FMP_RATE_LIMIT_PER_MIN", "300"))
+MAX_CONCURRENCY = int(os.getenv("FMP_MAX_CONCURRENCY", "20"))
+MAX_RETRIES = int(os.getenv("FMP_MAX_RETRIES", "4"))
+
+# Event loop id -> (loop, client); the loop is kept so its id can't be reused by a new loop
+_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, "httpx.AsyncClient"]] = {}
+_limiter = AdaptiveRateLimiter("fmp", rate_per_sec=RATE_LIMIT_PER_MIN / 60.0, max_concurrency=MAX_CONCURRENCY)
+_cache: Optional[TieredCache] = None
+_refresh_tasks = set() # Strong refs so background revalidations aren't garbage collected
+# Identical requests in flight at the same time share one HTTP call across all graph runs
+_inflight = SingleFlight("fmp")
+
+def _http2_available() -> bool:
+    """HTTP/2 support in httpx needs the optional 'h2' package."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def get_api_key() -> str:
+    """The FMP API key from the environment, read once on first use."""
+    global API_KEY
+    if not API_KEY:
+        API_KEY = os.getenv("FMP_API_KEY")
+        if not API_KEY:
+            logger.error("FMP_API_KEY not found in environment variables.")
+            raise ValueError("FMP_API_KEY not found in environment variables. Please set it in your .env file.")
+    return API_KEY
+
+def _current_client(loop: asyncio.AbstractEventLoop) -> Optional["httpx.AsyncClient"]:
+    entry = _clients.get(id(loop))
+    if entry is not None and entry[0] is loop and not entry[1].is_closed:
+        return entry[1]
+    return None
+
+async def init_client() -> "httpx.AsyncClient":
+    """Creates the pooled client for the running event loop. Safe to call more than once."""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _current_client(loop)
+    if client is not None:
+        return client
+    # Clients of loops that have since closed can't be used (or closed) any more
+    for key in [key for key, (owner, _) in _clients.items() if owner.is_closed()]:
+        del _clients[key]
+
+    http2 = HTTP2_ENABLED
+    if http2 and not _http2_available():
+        logger.warning("FMP_HTTP2 is enabled but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    client = httpx.AsyncClient(base_url=BASE_URL, timeout=REQUEST_TIMEOUT, limits=limits, http2=http2)
+    _clients[id(loop)] = (loop, client)
+    logger.info(f"FMP client initialized (http2={http2}, max_connections={MAX_CONNECTIONS}, "
+                f"max_keepalive={MAX_KEEPALIVE_CONNECTIONS})")
+    return client
+
+async def close_client():
+    """Closes the running event loop's client and releases its pooled connections."""
+    loop = asyncio.get_running_loop()
+    entry = _clients.pop(id(loop), None)
+    if entry is not None and entry[0] is loop:
+        await entry[1].aclose()
+        logger.info("FMP client closed.")
+
+async def get_client() -> "httpx.AsyncClient":
+    """Returns the running event loop's client, creating it on first use.
+
+    The FastAPI app opens the client at startup, but scripts and the
+    ExecutionEngine can call the fetch helpers without going through it.
+    """
+    client = _current_client(asyncio.get_running_loop())
+    if client is None:
+        return await init_client()
+    return client
+
+def get_cache() -> TieredCache:
+    """Returns the FMP response cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        backend = build_backend(CACHE_BACKEND, directory=CACHE_DIR, redis_url=REDIS_URL)
+        _cache = TieredCache("fmp", max_entries=CACHE_MAX_ENTRIES, backend=backend)
+        logger.info(f"FMP cache initialized (backend={CACHE_BACKEND}, max_entries={CACHE_MAX_ENTRIES})")
+    return _cache
+
+async def close_cache():
+    """Closes the persistent cache tier, if any."""
+    global _cache
+    if _cache is not None:
+        await _cache.close()
+    _cache = None
+
+def cache_stats() -> dict:
+    """Hit/miss counters for the FMP cache, plus request coalescing counters."""
+    stats = _cache.get_stats() if _cache is not None else {}
+    return {**stats, "singleflight": dict(_inflight.stats), "profile_batches": dict(_profile_batcher.stats)}
+
+def _cache_key(endpoint: str, params: Optional[dict]) -> str:
+    """Normalized key: endpoint, ticker, period and limit."""
+    kind, _, ticker = endpoint.partition("/")
+    params = params or {}
+    period = str(params.get("period", "-")).lower()
+    limit = params.get("limit", "-")
+    return f"fmp:{kind}:{ticker.upper()}:{period}:{limit}"
+
+def _is_cacheable(data) -> bool:
+    # FMP returns [] for unknown symbols and a dict with "Error Message" on some failures
+    if not data:
+        return False
+    if isinstance(data, dict) and "Error Message" in data:
+        return False
+    return True
+
+async def _store(key: str, endpoint: str, data):
+    if _is_cacheable(data):
+        kind = endpoint.split("/", 1)[0]
+        ttl = ENDPOINT_TTLS.get(kind, 3600)
+        await get_cache().set(key, data, ttl=ttl, stale_ttl=CACHE_STALE_SECONDS)
+
+async def _fetch_profiles_batch(tickers: List[str]) -> Dict[str, list]:
+    """Fetches several profiles in one call and splits the response per ticker."""
+    data = await _fetch_fmp(f"profile/{','.join(tickers)}")
+    if isinstance(data, dict):
+        # Error payload for the whole request; every caller gets what a single call would have
+        return {ticker: data for ticker in tickers}
+    by_symbol: Dict[str, list] = {}
+    for item in data or []:
+        if isinstance(item, dict):
+            by_symbol.setdefault(str(item.get("symbol", "")).upper(), []).append(item)
+    # Same shape as a single-symbol call: a list with the profile, or [] if unknown
+    return {ticker: by_symbol.get(ticker, []) for ticker in tickers}
+
+_profile_batcher = MicroBatcher(
+    _fetch_profiles_batch,
+    window=PROFILE_BATCH_WINDOW_MS / 1000.0,
+    max_batch_size=PROFILE_BATCH_MAX_SIZE,
+    default_factory=list,
+    name="fmp-profile",
+)
+
+async def _load(endpoint: str, params: Optional[dict]):
+    """Sends the request, batching profile lookups when enabled."""
+    kind, _, ticker = endpoint.partition("/")
+    if kind == "profile" and PROFILE_BATCH_WINDOW_MS > 0 and not params and "," not in ticker:
+        return await _profile_batcher.load(ticker.upper())
+    return await _fetch_fmp(endpoint, params)
+
+async def _fetch_and_store(key: str, endpoint: str, params: Optional[dict]):
+    data = await _load(endpoint, params)
+    if CACHE_ENABLED:
+        await _store(key, endpoint, data)
+    return data
+
+async def _coalesced_fetch(key: str, endpoint: str, params: Optional[dict]):
+    return await _inflight.do(key, lambda: _fetch_and_store(key, endpoint, params))
+
+async def _revalidate(key: str, endpoint: str, params: Optional[dict]):
+    try:
+        await _coalesced_fetch(key, endpoint, params)
+        logger.debug(f"Revalidated cache entry {key}")
+    except Exception as e:
+        # Keep serving the stale value; the next lookup will try again
+        logger.warning(f"Background refresh failed for {key}: {e}")
+
+def _schedule_revalidation(key: str, endpoint: str, params: Optional[dict]):
+    if _inflight.in_flight(key):
+        return # A refresh (or a regular fetch) for this key is already running
+    task = asyncio.create_task(_revalidate(key, endpoint, params))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+async def _cached_fetch(endpoint: str, params: Optional[dict] = None):
+    """Fetches through the cache, serving stale entries while revalidating them."""
+    key = _cache_key(endpoint, params)
+    if not CACHE_ENABLED:
+        return await _coalesced_fetch(key, endpoint, params)
+
+    cached = await get_cache().get(key)
+    if cached is not None:
+        data, is_fresh = cached
+        if not is_fresh:
+            _schedule_revalidation(key, endpoint, params)
+        return data
+
+    return await _coalesced_fetch(key, endpoint, params)
+
+def _classify_error(exc: Exception) -> RetryDecision:
+    """429 and 5xx are retried and slow the limiter down; network errors are just retried."""
+    import httpx
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        if status == 429 or status >= 500:
+            return RetryDecision(True, throttled=True,
+                                 retry_after=parse_retry_after(exc.response.headers.get("Retry-After")))
+        return RetryDecision(False)
+    if isinstance(exc, httpx.TransportError):
+        return RetryDecision(True)
+    return RetryDecision(False)
+
+async def _request(endpoint: str, params: dict):
+    import httpx
+
+    client = await get_client()
+    operation = endpoint.strip("/").split("/")[0] # e.g. "income-statement"
+    status = "exception"
+    start = time.perf_counter()
+    try:
+        logger.debug(f"Fetching FMP endpoint: {endpoint} with params: {params}")
+        response = await client.get(endpoint, params=params)
+        status = str(response.status_code)
+        metrics.PAYLOAD_BYTES.observe(len(response.content), service="fmp", operation=operation)
+        response.raise_for_status() # Raises HTTPStatusError for 4xx/5xx responses
+        logger.debug(f"FMP Response Status: {response.status_code} ({response.http_version})")
+        return response.json()
+    except httpx.RequestError as exc:
+        logger.error(f"An error occurred while requesting {exc.request.url!r}: {exc}")
+        raise # Re-raise the exception to be handled by the caller node
+    except httpx.HTTPStatusError as exc:
+        logger.error(f"Error response {exc.response.status_code} while requesting {exc.request.url!r}: {exc.response.text}")
+        raise # Re-raise the exception
+    finally:
+        metrics.EXTERNAL_CALLS.inc(service="fmp", operation=operation, status=status)
+        metrics.EXTERNAL_CALL_DURATION.observe(time.perf_counter() - start, service="fmp", operation=operation)
+
+async def _fetch_fmp(endpoint: str, params: Optional[dict] = None):
+    """Helper function to fetch data from FMP API, rate limited and retried."""
+    # Copy so the caller's dict (or a shared default) never carries the API key around
+    params = dict(params or {})
+    params["apikey"] = get_api_key()
+    return await call_with_retry(_limiter, lambda: _request(endpoint, params), _classify_error,
+                                 max_retries=MAX_RETRIES)
+
+def rate_limiter_stats() -> dict:
+    return _limiter.get_stats()
 
 async def fetch_company_profile(ticker: str):
     """Fetches company profile information."""
     endpoint = f"profile/{ticker}"
-    return await _fetch_fmp(endpoint)
+    return await _cached_fetch(endpoint)
 
 async def fetch_income_statement(ticker: str, period: str = "annual", limit: int = 5):
     """Fetches income statements."""
     endpoint = f"income-statement/{ticker}"
     params = {"period": period, "limit": limit}
-    return await _fetch_fmp(endpoint, params)
+    return await _cached_fetch(endpoint, params)
 
 async def fetch_balance_sheet(ticker: str, period: str = "annual", limit: int = 5):
     """Fetches balance sheet statements."""
     endpoint = f"balance-sheet-statement/{ticker}"
     params = {"period": period, "limit": limit}
-    return await _fetch_fmp(endpoint, params)
+    return await _cached_fetch(endpoint, params)
 
 async def fetch_cash_flow_statement(ticker: str, period: str = "annual", limit: int = 5):
     """Fetches cash flow statements."""
     endpoint = f"cash-flow-statement/{ticker}"
     params = {"period": period, "limit": limit}
-    return await _fetch_fmp(endpoint, params) 
\ No newline at end of file
+    return await _cached_fetch(endpoint, params)
@@ -1,28 +1,110 @@
+import asyncio
 import os
+import hashlib
+import json
 import logging
+import time
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
-# Remove direct import if using client
-# import openai
-# Import the new client classes
-from openai import AsyncOpenAI, OpenAIError
+from backend.core import metrics
+from backend.utils.cache import TieredCache, build_backend
+from backend.utils.singleflight import SingleFlight
+from backend.utils.rate_limiter import AdaptiveRateLimiter, RetryDecision, call_with_retry, parse_retry_after
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
 # --- OpenAI Client Setup --- 
-# Use the new client initialization for openai >= 1.0.0
-API_KEY = os.getenv("OPENAI_API_KEY")
-if not API_KEY:
-    logger.warning("OPENAI_API_KEY not found in environment variables. LLM calls will fail.")
-    # Set client to None or handle differently if key is missing
-    client = None
-else:
+# Use the new client initialization for openai >= 1.0.0. The openai package is
+# slow to import, so it is imported (and the client built) on the first LLM call.
+API_KEY = None
+client = None
+_client_initialized = False
+
+def get_client():
+    """Returns the shared AsyncOpenAI client, creating it on first use. None if not configured."""
+    global API_KEY, client, _client_initialized
+    if _client_initialized:
+        return client
+    _client_initialized = True
+    API_KEY = os.getenv("OPENAI_API_KEY")
+    if not API_KEY:
+        logger.warning("OPENAI_API_KEY not found in environment variables. LLM calls will fail.")
+        return None
     try:
-        client = AsyncOpenAI(api_key=API_KEY)
+        from openai import AsyncOpenAI
+        # Retries are handled by our shared limiter below, not by the SDK
+        client = AsyncOpenAI(api_key=API_KEY, max_retries=0)
         logger.info("AsyncOpenAI client initialized.")
     except Exception as e:
         logger.exception("Failed to initialize AsyncOpenAI client")
         client = None
+    return client
+
+# --- Rate Limiting ---
+# Shared by every LLM call in the process
+RATE_LIMIT_PER_MIN = float(os.getenv("OPENAI_RATE_LIMIT_PER_MIN", "500"))
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+_limiter = AdaptiveRateLimiter("openai", rate_per_sec=RATE_LIMIT_PER_MIN / 60.0, max_concurrency=MAX_CONCURRENCY)
+
+def _classify_error(exc: Exception) -> RetryDecision:
+    """429 and 5xx are retried and slow the limiter down; connection errors and timeouts are just retried."""
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(exc, APIStatusError):
+        if exc.status_code == 429 or exc.status_code >= 500:
+            headers = exc.response.headers
+            retry_after = parse_retry_after(headers.get("retry-after"))
+            if retry_after is None and headers.get("retry-after-ms"):
+                retry_after = parse_retry_after(headers.get("retry-after-ms"))
+                retry_after = retry_after / 1000.0 if retry_after is not None else None
+            return RetryDecision(True, throttled=True, retry_after=retry_after)
+        return RetryDecision(False)
+    if isinstance(exc, APIConnectionError): # Includes APITimeoutError
+        return RetryDecision(True)
+    return RetryDecision(False)
+
+def rate_limiter_stats() -> dict:
+    return _limiter.get_stats()
+
+# --- Response Cache ---
+# Reports are built deterministically from the same data, so identical
+# requests (model, prompts, temperature) return the stored completion.
+SYSTEM_PROMPT = "You are a helpful financial analyst assistant."
+TEMPERATURE = 0.3
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "disk") # "memory", "disk" or "redis"
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".cache/llm")
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_cache: Optional[TieredCache] = None
+_inflight = SingleFlight("llm")
+
+def get_cache() -> TieredCache:
+    """Returns the LLM response cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        backend = build_backend(CACHE_BACKEND, directory=CACHE_DIR, redis_url=os.getenv("REDIS_URL"),
+                                max_bytes=CACHE_MAX_BYTES)
+        _cache = TieredCache("llm", max_entries=CACHE_MAX_ENTRIES, backend=backend)
+    return _cache
+
+async def close_cache():
+    global _cache
+    if _cache is not None:
+        await _cache.close()
+    _cache = None
+
+def cache_stats() -> dict:
+    return _cache.get_stats() if _cache is not None else {}
+
+def cache_key(model: str, system_prompt: str, prompt: str, temperature: float) -> str:
+    """Content address of an LLM request."""
+    payload = json.dumps([model, system_prompt, prompt, temperature], ensure_ascii=False)
+    return "llm:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 # --- Comment out or remove legacy setup --- 
 # # For openai < 1.0.0 (older style)
@@ -33,24 +115,76 @@ else:
 #     # raise ValueError("OPENAI_API_KEY is not set.")
 
 # --- LLM Call Function --- 
-async def call_llm(prompt: str, model: str = "gpt-4o-mini") -> str:
-    """Calls the specified OpenAI model with the given prompt using the new client."""
-    if not client:
+async def call_llm(prompt: str, model: str = "gpt-4o-mini", use_cache: bool = True) -> str:
+    """Calls the specified OpenAI model with the given prompt using the new client.
+
+    Successful responses are cached by content address unless use_cache is False.
+    Concurrent identical requests share one API call.
+    """
+    if not get_client():
         logger.error("OpenAI client not initialized. Cannot call LLM.")
         return "Error: LLM client not configured."
 
+    if not (use_cache and CACHE_ENABLED):
+        return await _call_llm(prompt, model)
+
+    key = cache_key(model, SYSTEM_PROMPT, prompt, TEMPERATURE)
+    cached = await get_cache().get(key)
+    if cached is not None:
+        logger.info(f"LLM cache hit for model {model}.")
+        return cached[0]
+    return await _inflight.do(key, lambda: _call_and_store(key, prompt, model))
+
+def _call_status(exc: Exception) -> str:
+    from openai import APIStatusError
+
+    if isinstance(exc, APIStatusError):
+        return str(exc.status_code)
+    return "exception"
+
+async def _create_completion(operation: str, **kwargs):
+    """One chat completion request (a single attempt), with call metrics."""
+    status = "exception"
+    start = time.perf_counter()
+    try:
+        response = await get_client().chat.completions.create(**kwargs)
+        status = "200"
+        return response
+    except Exception as exc:
+        status = _call_status(exc)
+        raise
+    finally:
+        metrics.EXTERNAL_CALLS.inc(service="openai", operation=operation, status=status)
+        metrics.EXTERNAL_CALL_DURATION.observe(time.perf_counter() - start, service="openai", operation=operation)
+
+async def _call_and_store(key: str, prompt: str, model: str) -> str:
+    content = await _call_llm(prompt, model)
+    if not content.startswith("Error:"): # Never cache failures
+        await get_cache().set(key, content, ttl=CACHE_TTL_SECONDS)
+    return content
+
+async def _call_llm(prompt: str, model: str) -> str:
+    from openai import OpenAIError
+
     logger.info(f"Calling LLM model {model}...")
     try:
         # --- Use the new client method --- 
-        response = await client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a helpful financial analyst assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
+        response = await call_with_retry(
+            _limiter,
+            lambda: _create_completion(
+                "chat",
+                model=model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=TEMPERATURE
+            ),
+            _classify_error,
+            max_retries=MAX_RETRIES,
         )
         content = response.choices[0].message.content.strip()
+        metrics.PAYLOAD_BYTES.observe(len(content.encode("utf-8")), service="openai", operation="chat")
         logger.info(f"LLM call successful. Response length: {len(content)}")
         return content
 
@@ -75,4 +209,73 @@ async def call_llm(prompt: str, model: str = "gpt-4o-mini") -> str:
     except Exception as e:
         # Catch other potential errors
         logger.exception(f"Unexpected error calling LLM model {model}: {e}")
-        return f"Error: LLM call failed unexpectedly - {e}" 
\ No newline at end of file
+        return f"Error: LLM call failed unexpectedly - {e}" 
+
+# --- Streaming LLM Call ---
+async def stream_llm(prompt: str, model: str = "gpt-4o-mini", use_cache: bool = True) -> AsyncIterator[str]:
+    """Streams the completion for the prompt as text chunks.
+
+    Unlike call_llm, failures are raised rather than returned as "Error:"
+    strings, since part of the response may already have been delivered.
+    A cache hit is yielded as a single chunk; a completed stream is cached.
+    """
+    if not get_client():
+        raise RuntimeError("LLM client not configured.")
+
+    key = cache_key(model, SYSTEM_PROMPT, prompt, TEMPERATURE)
+    caching = use_cache and CACHE_ENABLED
+    if caching:
+        cached = await get_cache().get(key)
+        if cached is not None:
+            logger.info(f"LLM cache hit for model {model}.")
+            yield cached[0]
+            return
+
+    logger.info(f"Streaming LLM model {model}...")
+    # Retries only cover opening the stream; a failure mid-stream is raised to the caller.
+    # The concurrency slot is held until the stream is consumed or closed, and a failure
+    # mid-stream is reported to the limiter like a failed call.
+    stream = await call_with_retry(
+        _limiter,
+        lambda: _create_completion(
+            "chat_stream",
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=TEMPERATURE,
+            stream=True
+        ),
+        _classify_error,
+        max_retries=MAX_RETRIES,
+        hold_slot=True,
+    )
+    chunks = []
+    failed = throttled = False
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                chunks.append(text)
+                yield text
+    except asyncio.CancelledError:
+        failed = True
+        raise
+    except Exception as e:
+        failed = True
+        throttled = _classify_error(e).throttled
+        raise
+    finally:
+        _limiter.release(throttled=throttled, failed=failed)
+        close = getattr(stream, "close", None)
+        if close is not None:
+            await close() # Frees the connection if the consumer stopped early
+
+    content = "".join(chunks).strip()
+    metrics.PAYLOAD_BYTES.observe(len(content.encode("utf-8")), service="openai", operation="chat_stream")
+    logger.info(f"LLM stream finished. Response length: {len(content)}")
+    if caching and content:
+        await get_cache().set(key, content, ttl=CACHE_TTL_SECONDS)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+class RetryDecision(NamedTuple):
+    retryable: bool
+    throttled: bool = False # 429 or 5xx: the upstream is asking us to slow down
+    retry_after: Optional[float] = None # Seconds, from a Retry-After header
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class AdaptiveRateLimiter:
+    """Token bucket plus an AIMD concurrency limit, shared by all callers of an API.
+
+    The token bucket keeps the request rate under the provider's quota. The
+    concurrency limit grows by roughly one slot per window of successful calls
+    and is halved when the upstream throttles (429) or fails (5xx), at most
+    once per cooldown so a single burst of errors doesn't collapse it.
+    A Retry-After from the upstream pauses every caller, not just the one
+    that received it.
+
+    Callers may run on different event loops (engine threads, successive
+    asyncio.run calls), so the shared state sits behind a thread lock and
+    waiters are woken on their own loop.
+    """
+
+    def __init__(self, name: str, rate_per_sec: float, burst: Optional[float] = None,
+                 max_concurrency: int = 16, min_concurrency: int = 1, decrease_cooldown: float = 1.0):
+        self.name = name
+        self.rate = max(rate_per_sec, 1e-6)
+        self.burst = burst if burst is not None else max(1.0, rate_per_sec)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.decrease_cooldown = decrease_cooldown
+
+        self.limit = float(self.max_concurrency)
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._lock = threading.Lock() # Held only briefly, never across an await
+        self.stats = {"acquired": 0, "throttled": 0, "failed": 0, "retries": 0}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def _wait_for_slot(self, future: asyncio.Future):
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._wake_one() # We were woken but won't use the slot; pass it on
+            raise
+
+    def _wake_one(self):
+        with self._lock:
+            while self._waiters:
+                future = self._waiters.popleft()
+                if future.done():
+                    continue
+                try:
+                    # The future may belong to another loop (and thread); resolve it on its own
+                    future.get_loop().call_soon_threadsafe(self._resolve, future)
+                    return
+                except RuntimeError:
+                    continue # Its loop has closed
+
+    def _resolve(self, future: asyncio.Future):
+        if future.done():
+            self._wake_one() # Cancelled before the wake-up arrived; pass it on
+        else:
+            future.set_result(None)
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            future = None
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                elif self._in_flight >= int(self.limit):
+                    # Queued under the lock, so a release can't slip in between the check and the wait
+                    future = loop.create_future()
+                    self._waiters.append(future)
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        self._in_flight += 1
+                        self.stats["acquired"] += 1
+                        return
+                    delay = (1.0 - self._tokens) / self.rate
+            if future is not None:
+                await self._wait_for_slot(future)
+            else:
+                await asyncio.sleep(delay)
+
+    def release(self, throttled: bool = False, failed: bool = False):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if throttled:
+                self.stats["throttled"] += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self._last_decrease = now
+                    self.limit = max(float(self.min_concurrency), self.limit / 2)
+                    logger.warning(f"{self.name}: upstream throttling, concurrency limit lowered to {int(self.limit)}")
+            elif failed:
+                self.stats["failed"] += 1
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+        self._wake_one()
+
+    def block_for(self, seconds: float):
+        """Pauses all new acquisitions for `seconds` (e.g. from Retry-After)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self.stats, "concurrency_limit": int(self.limit), "in_flight": self._in_flight}
+
+def backoff_delay(attempt: int, base_delay: float = 0.5, max_delay: float = 30.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+async def call_with_retry(limiter: AdaptiveRateLimiter, func: Callable[[], Awaitable[Any]],
+                          classify: Callable[[Exception], RetryDecision], max_retries: int = 4,
+                          base_delay: float = 0.5, max_delay: float = 30.0, hold_slot: bool = False) -> Any:
+    """Calls func under the limiter, retrying retryable failures with backoff.
+
+    classify decides, per exception, whether to retry and whether it counts as
+    throttling. Non-retryable errors and the last failed attempt are re-raised.
+    With hold_slot, a successful call keeps its concurrency slot and the
+    caller must release it (e.g. once a returned stream has been consumed).
+    """
+    attempt = 0
+    while True:
+        await limiter.acquire()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            limiter.release(failed=True) # Don't leak the slot when the caller goes away
+            raise
+        except Exception as e:
+            decision = classify(e)
+            limiter.release(throttled=decision.throttled, failed=True)
+            if not decision.retryable or attempt >= max_retries:
+                raise
+            if decision.retry_after is not None:
+                delay = min(decision.retry_after, max_delay)
+                limiter.block_for(delay)
+            else:
+                delay = backoff_delay(attempt, base_delay, max_delay)
+            attempt += 1
+            limiter.stats["retries"] += 1
+            logger.warning(f"{limiter.name}: attempt {attempt} failed ({e}); retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+        if not hold_slot:
+            limiter.release()
+        return result
@@ -0,0 +1,180 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.utils.statement_store import numeric_column
+from backend.utils.statements import safe_divide
+
+# Cross-ticker screening over (ticker x period x metric) arrays. Every metric
+# is computed for the whole universe at once, so screening thousands of
+# tickers costs a handful of array operations rather than per-ticker dict lookups.
+
+INCOME_FIELDS = ("revenue", "grossProfit", "operatingIncome", "netIncome", "eps")
+BALANCE_FIELDS = ("totalAssets", "totalStockholdersEquity", "totalDebt", "totalLiabilities",
+                  "totalCurrentAssets", "totalCurrentLiabilities")
+
+# Metrics where a lower value ranks better
+LOWER_IS_BETTER = {"debt_to_equity", "debt_to_assets"}
+
+def stack_statements(statements: Sequence[Optional[List[Dict[str, Any]]]], fields: Sequence[str],
+                     periods: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Stacks per-ticker statement lists into a (ticker x period x field) float64 array.
+
+    Periods are newest first; tickers with fewer periods (or none) are NaN-padded.
+    Also returns the (ticker x period) period dates, "" where missing.
+    """
+    values = np.full((len(statements), periods, len(fields)), np.nan, dtype=np.float64)
+    dates = np.full((len(statements), periods), "", dtype="U10")
+    for t, records in enumerate(statements):
+        if not records:
+            continue
+        rows = sorted((r for r in records if isinstance(r, dict) and r.get("date")),
+                      key=lambda r: r["date"], reverse=True)[:periods]
+        for p, record in enumerate(rows):
+            dates[t, p] = record["date"][:10]
+            for f, field in enumerate(fields):
+                value = record.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values[t, p, f] = value
+    return values, dates
+
+def stack_arrays(statements: Sequence[Optional[np.ndarray]], fields: Sequence[str],
+                 periods: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Same as stack_statements, for structured arrays from the statement store (newest period first).
+
+    Columns are copied straight out of the arrays, so no per-period dicts are built.
+    """
+    values = np.full((len(statements), periods, len(fields)), np.nan, dtype=np.float64)
+    dates = np.full((len(statements), periods), "", dtype="U10")
+    for t, array in enumerate(statements):
+        if array is None or len(array) == 0:
+            continue
+        rows = array[:periods]
+        n = len(rows)
+        dates[t, :n] = rows["date"]
+        for f, field in enumerate(fields):
+            column = numeric_column(rows, field)
+            if column is not None:
+                values[t, :n, f] = column
+    return values, dates
+
+def _field(values: np.ndarray, fields: Sequence[str], name: str) -> np.ndarray:
+    return values[..., fields.index(name)]
+
+# How far from exactly one year back a period may be dated to count as the prior year
+# (fiscal year ends drift by a few days, and quarter ends by up to a month and a half)
+YEAR_TOLERANCE_DAYS = 46
+
+def align_periods(values: np.ndarray, dates: np.ndarray, target_dates: np.ndarray) -> np.ndarray:
+    """Reorders (ticker x period x field) values so each period lines up with target_dates.
+
+    Period p of ticker t gets the values dated target_dates[t, p], or NaN if
+    there are none (e.g. a balance sheet missing for that period).
+    """
+    aligned = np.full(target_dates.shape + values.shape[2:], np.nan, dtype=np.float64)
+    for q in range(dates.shape[1]):
+        for p in range(target_dates.shape[1]):
+            match = (dates[:, q] == target_dates[:, p]) & (target_dates[:, p] != "")
+            aligned[match, p] = values[match, q]
+    return aligned
+
+def _days_before_latest(dates: np.ndarray) -> np.ndarray:
+    """Days between each period and the latest one (period 0), NaN where a date is missing."""
+    parsed = dates.astype("datetime64[D]") # "" parses as NaT
+    days = (parsed[:, :1] - parsed).astype(np.float64)
+    days[np.isnat(parsed) | np.isnat(parsed[:, :1])] = np.nan
+    return days
+
+def screening_metrics(income: np.ndarray, income_dates: np.ndarray, balance: np.ndarray,
+                      balance_dates: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-ticker metrics for the latest period (plus growth over the history).
+
+    Balance sheet rows are paired with income statement rows by period date,
+    and growth is measured over the time between the periods' dates, so
+    missing periods don't shift either.
+    """
+    balance = align_periods(balance, balance_dates, income_dates)
+    revenue = _field(income, INCOME_FIELDS, "revenue")
+    net_income = _field(income, INCOME_FIELDS, "netIncome")
+    equity = _field(balance, BALANCE_FIELDS, "totalStockholdersEquity")
+    assets = _field(balance, BALANCE_FIELDS, "totalAssets")
+    debt = _field(balance, BALANCE_FIELDS, "totalDebt")
+
+    metrics = {
+        "revenue": revenue[:, 0],
+        "gross_margin": safe_divide(_field(income, INCOME_FIELDS, "grossProfit")[:, 0], revenue[:, 0]),
+        "operating_margin": safe_divide(_field(income, INCOME_FIELDS, "operatingIncome")[:, 0], revenue[:, 0]),
+        "net_margin": safe_divide(net_income[:, 0], revenue[:, 0]),
+        "return_on_equity": safe_divide(net_income[:, 0], equity[:, 0]),
+        "return_on_assets": safe_divide(net_income[:, 0], assets[:, 0]),
+        "debt_to_equity": safe_divide(debt[:, 0], equity[:, 0]),
+        "debt_to_assets": safe_divide(debt[:, 0], assets[:, 0]),
+        "current_ratio": safe_divide(_field(balance, BALANCE_FIELDS, "totalCurrentAssets")[:, 0],
+                                     _field(balance, BALANCE_FIELDS, "totalCurrentLiabilities")[:, 0]),
+    }
+    rows = np.arange(revenue.shape[0])
+    days = _days_before_latest(income_dates)
+    has_value = np.isfinite(revenue) & np.isfinite(days)
+
+    # Year-over-year revenue growth against the period dated closest to one year back
+    distance = np.where(has_value, np.abs(days - 365.25), np.inf)
+    prior_slot = np.argmin(distance, axis=1)
+    prior = revenue[rows, prior_slot]
+    prior = np.where((distance[rows, prior_slot] <= YEAR_TOLERANCE_DAYS) & (prior > 0), prior, np.nan)
+    metrics["revenue_growth_yoy"] = safe_divide(revenue[:, 0] - prior, prior)
+
+    # Revenue CAGR from the oldest period with data to the newest, over the years between their dates
+    oldest = revenue.shape[1] - 1 - np.argmax(has_value[:, ::-1], axis=1)
+    oldest_revenue = revenue[rows, oldest]
+    years = days[rows, oldest] / 365.25
+    valid = has_value[:, 0] & (years > 0) & (oldest_revenue > 0) & (revenue[:, 0] > 0)
+    cagr = np.full(revenue.shape[0], np.nan)
+    cagr[valid] = (revenue[valid, 0] / oldest_revenue[valid]) ** (1.0 / years[valid]) - 1.0
+    metrics["revenue_cagr"] = cagr
+    return metrics
+
+def percentile_ranks(values: np.ndarray, higher_is_better: bool = True) -> np.ndarray:
+    """Percentile (0-100) of each value among the finite ones; 100 is best. NaN stays NaN."""
+    ranks = np.full(values.shape, np.nan)
+    valid = np.flatnonzero(np.isfinite(values))
+    if len(valid) == 0:
+        return ranks
+    order = np.argsort(values[valid], kind="stable")
+    if not higher_is_better:
+        order = order[::-1]
+    positions = np.empty(len(valid))
+    positions[order] = np.arange(len(valid))
+    ranks[valid] = positions / max(len(valid) - 1, 1) * 100.0
+    return ranks
+
+def screen(metrics: Dict[str, np.ndarray], filters: Dict[str, Dict[str, float]], rank_by: str,
+           top_n: int) -> Tuple[np.ndarray, int, Dict[str, np.ndarray]]:
+    """Applies the filters and returns the indices of the top_n tickers by rank_by, best first.
+
+    filters maps a metric to any of "min", "max", "min_percentile" and
+    "max_percentile". Tickers with a missing value for a filtered or ranked
+    metric are excluded. Also returns how many tickers passed the filters and
+    the percentile of every metric.
+    """
+    unknown = (set(filters) | {rank_by}) - set(metrics)
+    if unknown:
+        raise ValueError(f"Unknown screening metrics: {sorted(unknown)}. Available: {sorted(metrics)}")
+
+    percentiles = {name: percentile_ranks(values, name not in LOWER_IS_BETTER) for name, values in metrics.items()}
+    mask = np.isfinite(metrics[rank_by])
+    for name, bounds in filters.items():
+        values, pct = metrics[name], percentiles[name]
+        mask &= np.isfinite(values)
+        if "min" in bounds:
+            mask &= values >= bounds["min"]
+        if "max" in bounds:
+            mask &= values <= bounds["max"]
+        if "min_percentile" in bounds:
+            mask &= pct >= bounds["min_percentile"]
+        if "max_percentile" in bounds:
+            mask &= pct <= bounds["max_percentile"]
+
+    candidates = np.flatnonzero(mask)
+    scores = percentiles[rank_by][candidates]
+    order = np.argsort(-scores, kind="stable")[:max(0, top_n)]
+    return candidates[order], len(candidates), percentiles
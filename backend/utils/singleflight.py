@@ -0,0 +1,44 @@
+import asyncio
+import copy
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one in-flight task.
+
+    The first caller for a key starts the work as its own task; every caller
+    (including the first) awaits it through asyncio.shield, so a cancelled
+    caller never cancels the shared work for the others. The key is released
+    as soon as the task finishes, so later calls start a fresh one.
+    The caller that started the work gets its result; callers that joined
+    get a deep copy each, so one can't mutate what another sees.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        # Keyed on (event loop, key) since tasks can't be awaited across loops
+        self._calls: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def in_flight(self, key: Hashable) -> bool:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return (id(loop), key) in self._calls
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        task = self._calls.get(call_key)
+        if task is None:
+            self.stats["calls"] += 1
+            task = loop.create_task(func())
+            self._calls[call_key] = task
+            task.add_done_callback(lambda _: self._calls.pop(call_key, None))
+            return await asyncio.shield(task)
+        self.stats["coalesced"] += 1
+        logger.debug(f"{self.name}: joining in-flight call for {key}")
+        return copy.deepcopy(await asyncio.shield(task))
@@ -0,0 +1,419 @@
+import asyncio
+import io
+import json
+import logging
+import mmap
+import os
+import re
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Local, memory-mapped store of historical statements.
+#
+# Past reporting periods never change, yet every loader call downloads the
+# whole `limit`-period history again. The store keeps one .npy file per
+# ticker, statement type and period type: a structured array with one row per
+# reporting period (newest first) and one column per statement field. Reading
+# a ticker is an open, a header lookup (cached per schema) and an mmap, so no
+# JSON is parsed and only the pages actually touched are read from disk.
+#
+# In "sync" mode, the newest stored period date is the record of how far a
+# ticker's history goes, and the file's mtime of when it was last checked. Only
+# periods that can have ended since then are requested (plus one overlapping
+# period to confirm there is no gap), and none at all while the next period
+# is still running, so a nightly refresh of a universe costs a few short calls.
+
+STATEMENT_STORE_DIR = os.getenv("STATEMENT_STORE_DIR", ".cache/statements")
+# How loaders use the store by default (overridable per node with the `store` param):
+#   "off"    - always fetch from FMP (the store is not touched)
+#   "prefer" - serve stored periods while fresh, otherwise fetch and merge them into the store
+#   "sync"   - like "prefer", but once stale only fetch periods newer than the stored ones
+#   "only"   - serve stored periods only, never call FMP (fails for tickers not in the store)
+STATEMENT_STORE_MODE = os.getenv("STATEMENT_STORE_MODE", "off").lower()
+# How long (seconds) stored periods are served in "prefer" and "sync" mode before they are fetched again
+STATEMENT_STORE_MAX_AGE = float(os.getenv("STATEMENT_STORE_MAX_AGE", str(24 * 3600)))
+
+STORE_MODES = ("off", "prefer", "sync", "only")
+STATEMENT_TYPES = ("income-statement", "balance-sheet-statement", "cash-flow-statement")
+PERIOD_TYPES = ("annual", "quarter")
+# Tickers become file names, so only symbol characters are allowed (e.g. BRK.B, ^GSPC)
+_TICKER_PATTERN = re.compile(r"^[A-Z0-9.\-^]{1,20}$")
+
+_NPY_MAGIC = b"\x93NUMPY"
+_HEADER_CACHE_SIZE = 4096
+
+# Columns that make the arrays lossless without object dtypes (which can't be
+# memory-mapped): "<field>~state" marks periods where the field was None or
+# absent, and "<field>~json" holds fields that mix types (or hold lists and
+# dicts) as JSON text.
+_STATE_SUFFIX = "~state"
+_JSON_SUFFIX = "~json"
+_PRESENT, _NULL, _ABSENT = 0, 1, 2
+_MAX_EXACT_FLOAT = 2 ** 53
+_MISSING = object()
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _column_kind(present: List[Any]) -> str:
+    if not present:
+        return "<f8" # Never set: all NaN, the state column says None or absent
+    if all(isinstance(v, str) for v in present):
+        return "<U"
+    if all(isinstance(v, bool) for v in present):
+        return "?"
+    if all(_is_number(v) for v in present):
+        ints = [v for v in present if isinstance(v, int)]
+        if len(ints) == len(present) and all(-2 ** 63 <= v < 2 ** 63 for v in ints):
+            return "<i8"
+        if all(abs(v) <= _MAX_EXACT_FLOAT for v in ints):
+            return "<f8"
+    return "json"
+
+def to_array(records: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """FMP's list of period dicts as a structured array, newest period first.
+
+    Fields whose values are all integers become int64, other numbers float64
+    (missing values are NaN), strings fixed-width unicode and booleans bool. Anything else is kept as JSON text. Where a field is None or absent
+    in some periods, a state column records which, so to_records gives back
+    the same dicts. Periods without a date, and repeated dates, are dropped.
+    """
+    rows = sorted((r for r in records if isinstance(r, dict) and isinstance(r.get("date"), str) and r["date"]),
+                  key=lambda r: r["date"], reverse=True)
+    # Keep the first occurrence of each date (FMP occasionally repeats a period)
+    seen = set()
+    rows = [r for r in rows if not (r["date"] in seen or seen.add(r["date"]))]
+
+    names: List[str] = []
+    for row in rows:
+        for key in row:
+            if key not in names:
+                names.append(key)
+
+    columns = []
+    for name in names:
+        values = [row.get(name, _MISSING) for row in rows]
+        states = [_ABSENT if v is _MISSING else _NULL if v is None else _PRESENT for v in values]
+        present = [v for v, state in zip(values, states) if state == _PRESENT]
+        kind = _column_kind(present)
+        if kind == "json":
+            name, kind = name + _JSON_SUFFIX, "<U"
+            values = [json.dumps(v) if state == _PRESENT else "" for v, state in zip(values, states)]
+        elif kind == "<f8":
+            values = [v if state == _PRESENT else np.nan for v, state in zip(values, states)]
+        elif kind == "<U":
+            values = [v if state == _PRESENT else "" for v, state in zip(values, states)]
+        elif kind == "?":
+            values = [v if state == _PRESENT else False for v, state in zip(values, states)]
+        elif kind == "<i8":
+            values = [v if state == _PRESENT else 0 for v, state in zip(values, states)]
+        if kind == "<U":
+            kind = f"<U{max([len(v) for v in values] + [1])}"
+        columns.append((name, kind, values))
+        if any(states):
+            columns.append((name.removesuffix(_JSON_SUFFIX) + _STATE_SUFFIX, "u1", states))
+
+    array = np.zeros(len(rows), dtype=[(name, kind) for name, kind, _ in columns])
+    for name, _, values in columns:
+        array[name] = values
+    return array
+
+def numeric_column(array: np.ndarray, name: str) -> Optional[np.ndarray]:
+    """A numeric field as float64 with NaN where it was None or absent (None if not a numeric field)."""
+    if name not in array.dtype.names or array.dtype[name].kind not in "iuf":
+        return None
+    values = array[name].astype(np.float64)
+    if name + _STATE_SUFFIX in array.dtype.names:
+        values[array[name + _STATE_SUFFIX] != _PRESENT] = np.nan
+    return values
+
+def to_records(array: np.ndarray, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """The stored periods back as FMP-style dicts, newest first (the inverse of to_array)."""
+    rows = array[:limit] if limit is not None else array
+    names = rows.dtype.names
+    records: List[Dict[str, Any]] = [{} for _ in range(len(rows))]
+    for name in names:
+        if name.endswith(_STATE_SUFFIX):
+            continue
+        is_json = name.endswith(_JSON_SUFFIX)
+        key = name.removesuffix(_JSON_SUFFIX)
+        values = rows[name].tolist()
+        if key + _STATE_SUFFIX in names:
+            states = rows[key + _STATE_SUFFIX].tolist()
+        elif rows.dtype[name].kind == "f":
+            states = [_NULL if v != v else _PRESENT for v in values] # NaN (files written without state columns)
+        else:
+            states = None
+        for i, (record, value) in enumerate(zip(records, values)):
+            state = states[i] if states is not None else _PRESENT
+            if state == _PRESENT:
+                record[key] = json.loads(value) if is_json else value
+            elif state == _NULL:
+                record[key] = None
+    return records
+
+def merge_arrays(stored: Optional[np.ndarray], records: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Stored periods combined with newly fetched ones; fetched periods replace stored ones with the same date."""
+    if stored is None or len(stored) == 0:
+        return to_array(records)
+    fetched_dates = {r.get("date") for r in records if isinstance(r, dict)}
+    kept = [r for r in to_records(stored) if r["date"] not in fetched_dates]
+    return to_array(list(records) + kept)
+
+class StatementStore:
+    """Statements on local disk, one memory-mapped .npy file per ticker, statement type and period type."""
+
+    def __init__(self, directory: str = STATEMENT_STORE_DIR):
+        self.directory = Path(directory)
+        self._root = str(self.directory)
+        self._headers: Dict[bytes, Tuple[np.dtype, Tuple[int, ...]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"reads": 0, "hits": 0, "misses": 0, "writes": 0,
+                      "fetches": 0, "delta_fetches": 0, "fetched_periods": 0, "sync_skips": 0}
+
+    def _filename(self, ticker: str, statement: str, period: str) -> str:
+        # Plain string formatting: pathlib costs more than the rest of a read
+        if statement not in STATEMENT_TYPES:
+            raise ValueError(f"Unknown statement type '{statement}'. Expected one of {', '.join(STATEMENT_TYPES)}")
+        period = period.lower()
+        if period not in PERIOD_TYPES:
+            raise ValueError(f"Unknown period '{period}'. Expected one of {', '.join(PERIOD_TYPES)}")
+        ticker = ticker.upper()
+        if not _TICKER_PATTERN.match(ticker) or ticker.strip(".") == "":
+            raise ValueError(f"Invalid ticker '{ticker}'")
+        return f"{self._root}{os.sep}{statement}{os.sep}{period}{os.sep}{ticker}.npy"
+
+    def path(self, ticker: str, statement: str, period: str) -> Path:
+        return Path(self._filename(ticker, statement, period))
+
+    def _parse_header(self, header: bytes, major: int) -> Tuple[np.dtype, Tuple[int, ...]]:
+        """dtype and shape from an .npy header, parsed once per distinct header."""
+        parsed = self._headers.get(header)
+        if parsed is None:
+            prefix = _NPY_MAGIC + bytes([major, 0]) + len(header).to_bytes(2 if major == 1 else 4, "little")
+            reader = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+            buffer = io.BytesIO(prefix + header)
+            np.lib.format.read_magic(buffer)
+            shape, fortran_order, dtype = reader(buffer)
+            if fortran_order or dtype.hasobject:
+                raise ValueError("Unsupported statement file layout")
+            parsed = (dtype, shape)
+            with self._lock:
+                if len(self._headers) >= _HEADER_CACHE_SIZE:
+                    self._headers.clear()
+                self._headers[header] = parsed
+        return parsed
+
+    def read(self, ticker: str, statement: str, period: str) -> Optional[np.ndarray]:
+        """The stored periods as a read-only, memory-mapped structured array (None if not stored)."""
+        filename = self._filename(ticker, statement, period)
+        self.stats["reads"] += 1
+        try:
+            fd = os.open(filename, os.O_RDONLY)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        try:
+            head = os.pread(fd, 4096, 0)
+            if head[:6] != _NPY_MAGIC:
+                raise ValueError("not an .npy file")
+            major = head[6]
+            start = 10 if major == 1 else 12
+            header_len = int.from_bytes(head[8:start], "little")
+            if start + header_len > len(head):
+                head = os.pread(fd, start + header_len, 0)
+            dtype, shape = self._parse_header(head[start:start + header_len], major)
+            buffer = mmap.mmap(fd, 0, access=mmap.ACCESS_READ) # Keeps its own descriptor
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable statement file {filename}: {e}")
+            self.stats["misses"] += 1
+            return None
+        finally:
+            os.close(fd)
+        self.stats["hits"] += 1
+        return np.ndarray(shape, dtype=dtype, buffer=buffer, offset=start + header_len)
+
+    def age(self, ticker: str, statement: str, period: str) -> Optional[float]:
+        """Seconds since the ticker's statements were last written (None if not stored)."""
+        try:
+            return time.time() - self.path(ticker, statement, period).stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def latest_date(self, ticker: str, statement: str, period: str) -> Optional[str]:
+        """Date of the newest stored period (None if not stored)."""
+        stored = self.read(ticker, statement, period)
+        return str(stored["date"][0]) if stored is not None and len(stored) else None
+
+    def touch(self, ticker: str, statement: str, period: str):
+        """Marks the stored periods as checked just now, without rewriting them."""
+        try:
+            os.utime(self._filename(ticker, statement, period))
+        except FileNotFoundError:
+            pass
+
+    def write(self, ticker: str, statement: str, period: str, array: np.ndarray):
+        """Replaces the stored periods. Readers see either the old or the new file, never a partial one."""
+        path = self.path(ticker, statement, period)
+        if len(array) == 0:
+            return # Nothing worth storing; an empty file could not be mapped
+        root = os.path.realpath(self._root)
+        if not os.path.realpath(path).startswith(root + os.sep):
+            raise ValueError(f"Statement file {path} is outside the store directory {root}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.lib.format.write_array(f, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(tmp_path, path)
+        self.stats["writes"] += 1
+
+    def merge(self, ticker: str, statement: str, period: str, records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Merges fetched periods into the stored ones, writes the result and returns it."""
+        merged = merge_arrays(self.read(ticker, statement, period), records)
+        self.write(ticker, statement, period, merged)
+        return merged
+
+    def tickers(self, statement: str, period: str) -> List[str]:
+        """Tickers with stored statements of the given type and period."""
+        if statement not in STATEMENT_TYPES or period.lower() not in PERIOD_TYPES:
+            return []
+        directory = self.directory / statement / period.lower()
+        if not directory.is_dir():
+            return []
+        return sorted(p.stem for p in directory.glob("*.npy"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "directory": str(self.directory), "schemas": len(self._headers)}
+
+_store: Optional[StatementStore] = None
+
+def get_store() -> StatementStore:
+    """Returns the process-wide statement store, creating it on first use."""
+    global _store
+    if _store is None:
+        _store = StatementStore(STATEMENT_STORE_DIR)
+    return _store
+
+def _resolve_mode(mode: Optional[str]) -> str:
+    mode = (mode or STATEMENT_STORE_MODE).lower()
+    if mode not in STORE_MODES:
+        raise ValueError(f"Unknown statement store mode '{mode}'. Expected one of {', '.join(STORE_MODES)}")
+    return mode
+
+async def _fetch(statement: str, ticker: str, period: str, limit: int):
+    from backend.utils import fmp_client
+
+    fetch = {
+        "income-statement": fmp_client.fetch_income_statement,
+        "balance-sheet-statement": fmp_client.fetch_balance_sheet,
+        "cash-flow-statement": fmp_client.fetch_cash_flow_statement,
+    }[statement]
+    return await fetch(ticker, period=period, limit=limit)
+
+def periods_due(latest_date: str, period: str, today: Optional[date] = None) -> int:
+    """How many reporting periods can have ended since the one ending on latest_date."""
+    today = today or date.today()
+    latest = date.fromisoformat(latest_date[:10])
+    months = (today.year - latest.year) * 12 + today.month - latest.month - (today.day < latest.day)
+    return max(0, months // (3 if period.lower() == "quarter" else 12))
+
+async def _fetch_records(store: StatementStore, statement: str, ticker: str, period: str,
+                         limit: int) -> List[Dict[str, Any]]:
+    records = await _fetch(statement, ticker, period, limit)
+    if not isinstance(records, list):
+        raise ValueError(f"Unexpected {statement} response for {ticker}: {str(records)[:200]}")
+    store.stats["fetches"] += 1
+    store.stats["fetched_periods"] += len(records)
+    return records
+
+async def _sync(store: StatementStore, statement: str, ticker: str, period: str, stored: np.ndarray) -> np.ndarray:
+    """Fetches only the periods newer than the stored ones and merges them in."""
+    latest = str(stored["date"][0])
+    due = periods_due(latest, period)
+    if due == 0:
+        # The period after the latest one hasn't ended yet, so there is nothing to ask for
+        store.stats["sync_skips"] += 1
+        await asyncio.to_thread(store.touch, ticker, statement, period)
+        return stored
+    records = await _fetch_records(store, statement, ticker, period, due + 1)
+    store.stats["delta_fetches"] += 1
+    if latest not in {r.get("date") for r in records if isinstance(r, dict)}:
+        # No overlap with the stored periods (more new periods than expected, or a changed
+        # fiscal calendar), so fetch enough history to close the gap
+        logger.info(f"{statement} ({period}) for {ticker}: no overlap with stored {latest}, fetching full history")
+        records = await _fetch_records(store, statement, ticker, period, len(stored) + due)
+    return await asyncio.to_thread(store.merge, ticker, statement, period, records)
+
+async def load_statement_array(statement: str, ticker: str, period: str = "annual", limit: int = 5,
+                               mode: Optional[str] = None, store: Optional[StatementStore] = None,
+                               max_age: Optional[float] = None) -> Optional[np.ndarray]:
+    """Up to `limit` periods of a statement as a structured array, going through the store per `mode`.
+
+    Stored periods younger than max_age seconds (default
+    STATEMENT_STORE_MAX_AGE) are served without calling FMP. Returns None in
+    "off" mode, where nothing is stored; callers use the fetched records
+    directly (see load_statement).
+    """
+    mode = _resolve_mode(mode)
+    if mode == "off":
+        return None
+    store = store or get_store()
+    # Reads are a few microseconds, so they run inline rather than on a thread
+    stored = store.read(ticker, statement, period)
+    if mode == "only":
+        if stored is None:
+            raise LookupError(f"No stored {statement} ({period}) for {ticker}")
+        return stored[:limit]
+    if stored is not None and len(stored) >= limit:
+        age = store.age(ticker, statement, period)
+        if age is not None and age <= (STATEMENT_STORE_MAX_AGE if max_age is None else max_age):
+            return stored[:limit]
+        if mode == "sync":
+            return (await _sync(store, statement, ticker, period, stored))[:limit]
+
+    # Not stored, or fewer periods than asked for: fetch the whole history
+    records = await _fetch_records(store, statement, ticker, period, limit)
+    merged = await asyncio.to_thread(store.merge, ticker, statement, period, records)
+    return merged[:limit]
+
+async def load_statement(statement: str, ticker: str, period: str = "annual", limit: int = 5,
+                         mode: Optional[str] = None, store: Optional[StatementStore] = None):
+    """Up to `limit` periods of a statement as FMP-style dicts, going through the store per `mode`."""
+    array = await load_statement_array(statement, ticker, period, limit, mode, store)
+    if array is None:
+        return await _fetch(statement, ticker, period, limit)
+    return to_records(array)
+
+async def sync_universe(tickers: Sequence[str], statements: Sequence[str] = STATEMENT_TYPES,
+                        period: str = "annual", limit: int = 5, concurrency: int = 50,
+                        store: Optional[StatementStore] = None) -> Dict[str, Any]:
+    """Brings every ticker's stored statements up to date, fetching only periods that can be new.
+
+    Meant for a scheduled (e.g. nightly) refresh: stored periods are checked
+    however recently they were written. Tickers not in the store yet get
+    their last `limit` periods. Returns the tickers that failed and this
+    run's fetch counters.
+    """
+    store = store or get_store()
+    before = dict(store.stats)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    jobs = [(ticker.upper(), statement) for ticker in tickers for statement in statements]
+
+    async def sync_one(ticker: str, statement: str):
+        async with semaphore:
+            await load_statement_array(statement, ticker, period, limit, mode="sync", store=store, max_age=0)
+
+    outcomes = await asyncio.gather(*(sync_one(*job) for job in jobs), return_exceptions=True)
+    failed = sorted({ticker for (ticker, _), outcome in zip(jobs, outcomes) if isinstance(outcome, Exception)})
+    if failed:
+        logger.warning(f"Statement sync failed for {len(failed)} of {len(tickers)} tickers")
+    counters = ("fetches", "delta_fetches", "fetched_periods", "sync_skips", "writes")
+    return {"tickers": len(tickers), "failed": failed,
+            **{name: store.stats[name] - before[name] for name in counters}}
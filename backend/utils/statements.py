@@ -0,0 +1,179 @@
+import math
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Columnar view of FMP statements. FMP returns one dict per period with ~40
+# keys each; for long (e.g. quarterly limit=40+) histories a single
+# period x metric float64 array is far smaller and lets ratios and growth
+# rates be computed for every period at once.
+
+# Non-numeric keys FMP includes in every statement period
+NON_NUMERIC_FIELDS = {"date", "symbol", "reportedCurrency", "cik", "fillingDate", "acceptedDate",
+                      "calendarYear", "period", "link", "finalLink"}
+
+class StatementTable:
+    """Statement periods as a (period x metric) float64 array, newest period first.
+
+    Missing or non-numeric values are NaN.
+    """
+
+    def __init__(self, dates: Sequence[str], fields: Sequence[str], values: np.ndarray,
+                 period_labels: Optional[Sequence[str]] = None):
+        self.dates = list(dates)
+        self.fields = list(fields)
+        self.field_index = {field: i for i, field in enumerate(self.fields)}
+        self.values = values
+        self.period_labels = list(period_labels) if period_labels is not None else [None] * len(self.dates)
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], fields: Optional[Sequence[str]] = None) -> "StatementTable":
+        """Builds a table from FMP's list of period dicts (sorted newest first)."""
+        records = sorted((r for r in records if isinstance(r, dict) and r.get("date")),
+                         key=lambda r: r["date"], reverse=True)
+        if fields is None:
+            fields = []
+            seen = set()
+            for record in records:
+                for key, value in record.items():
+                    if (key not in seen and key not in NON_NUMERIC_FIELDS and isinstance(value, (int, float))
+                            and not isinstance(value, bool)):
+                        seen.add(key)
+                        fields.append(key)
+        values = np.full((len(records), len(fields)), np.nan, dtype=np.float64)
+        for row, record in enumerate(records):
+            for col, field in enumerate(fields):
+                value = record.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values[row, col] = value
+        return cls([r["date"] for r in records], fields, values, [r.get("period") for r in records])
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def is_quarterly(self) -> bool:
+        return any(isinstance(label, str) and label.startswith("Q") for label in self.period_labels)
+
+    def column(self, field: str) -> np.ndarray:
+        """The field's values for every period (all NaN if the field is absent)."""
+        index = self.field_index.get(field)
+        if index is None:
+            return np.full(len(self.dates), np.nan)
+        return self.values[:, index]
+
+    def take(self, rows: Sequence[int]) -> "StatementTable":
+        rows = list(rows)
+        return StatementTable([self.dates[i] for i in rows], self.fields, self.values[rows],
+                              [self.period_labels[i] for i in rows])
+
+    def align(self, other: "StatementTable"):
+        """Both tables restricted to the period dates they share, in the same order."""
+        other_rows = {d: i for i, d in enumerate(other.dates)}
+        rows = [(i, other_rows[d]) for i, d in enumerate(self.dates) if d in other_rows]
+        return self.take([i for i, _ in rows]), other.take([j for _, j in rows])
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+# --- Vectorized metrics ---
+def safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division with NaN wherever the denominator is zero or missing."""
+    out = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=np.isfinite(denominator) & (denominator != 0))
+    return out
+
+def growth(values: np.ndarray, lag: int = 1) -> np.ndarray:
+    """Period-over-period growth for newest-first values: values[i] / values[i + lag] - 1.
+
+    Comparisons against a negative base are NaN, since the sign of the
+    result would be meaningless.
+    """
+    out = np.full(values.shape, np.nan)
+    if lag <= 0 or len(values) <= lag:
+        return out
+    current, prior = values[:-lag], values[lag:]
+    out[:-lag] = safe_divide(current - prior, np.where(prior > 0, prior, np.nan))
+    return out
+
+def cagr(values: np.ndarray, dates: Sequence[str]) -> Optional[float]:
+    """Compound annual growth rate between the oldest and newest periods with data."""
+    valid = np.flatnonzero(np.isfinite(values))
+    if len(valid) < 2:
+        return None
+    newest, oldest = valid[0], valid[-1]
+    years = (date.fromisoformat(dates[newest][:10]) - date.fromisoformat(dates[oldest][:10])).days / 365.25
+    if years <= 0 or values[oldest] <= 0 or values[newest] <= 0:
+        return None
+    return float((values[newest] / values[oldest]) ** (1.0 / years) - 1.0)
+
+def to_list(values: np.ndarray, digits: int = 6) -> List[Optional[float]]:
+    """JSON-friendly list: NaN/inf become None."""
+    return [round(float(v), digits) if math.isfinite(v) else None for v in values]
+
+def income_metrics(income: StatementTable) -> Dict[str, Any]:
+    lag = 4 if income.is_quarterly else 1 # Year-over-year, also for quarterly data
+    revenue = income.column("revenue")
+    return {
+        "dates": income.dates,
+        "revenue_growth_yoy": to_list(growth(revenue, lag)),
+        "net_income_growth_yoy": to_list(growth(income.column("netIncome"), lag)),
+        "eps_growth_yoy": to_list(growth(income.column("eps"), lag)),
+        "gross_margin": to_list(safe_divide(income.column("grossProfit"), revenue)),
+        "operating_margin": to_list(safe_divide(income.column("operatingIncome"), revenue)),
+        "net_margin": to_list(safe_divide(income.column("netIncome"), revenue)),
+    }
+
+def balance_metrics(balance: StatementTable) -> Dict[str, Any]:
+    equity = balance.column("totalStockholdersEquity")
+    assets = balance.column("totalAssets")
+    return {
+        "dates": balance.dates,
+        "debt_to_equity": to_list(safe_divide(balance.column("totalDebt"), equity)),
+        "debt_to_assets": to_list(safe_divide(balance.column("totalDebt"), assets)),
+        "liabilities_to_assets": to_list(safe_divide(balance.column("totalLiabilities"), assets)),
+        "current_ratio": to_list(safe_divide(balance.column("totalCurrentAssets"),
+                                             balance.column("totalCurrentLiabilities"))),
+    }
+
+def return_metrics(income: StatementTable, balance: StatementTable) -> Dict[str, Any]:
+    income, balance = income.align(balance)
+    net_income = income.column("netIncome")
+    return {
+        "dates": income.dates,
+        "return_on_equity": to_list(safe_divide(net_income, balance.column("totalStockholdersEquity"))),
+        "return_on_assets": to_list(safe_divide(net_income, balance.column("totalAssets"))),
+    }
+
+def cash_flow_metrics(income: StatementTable, cash_flow: StatementTable) -> Dict[str, Any]:
+    income, cash_flow = income.align(cash_flow)
+    revenue = income.column("revenue")
+    operating_cash_flow = cash_flow.column("operatingCashFlow")
+    return {
+        "dates": income.dates,
+        "free_cash_flow_margin": to_list(safe_divide(cash_flow.column("freeCashFlow"), revenue)),
+        "cash_conversion": to_list(safe_divide(operating_cash_flow, income.column("netIncome"))),
+    }
+
+def financial_history(raw_income_statement: List[Dict[str, Any]], raw_balance_sheet: List[Dict[str, Any]],
+                      raw_cash_flow: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Multi-period growth, margin, leverage and return metrics for every fetched period."""
+    income = StatementTable.from_records(raw_income_statement)
+    balance = StatementTable.from_records(raw_balance_sheet)
+    history = {
+        "periods": len(income),
+        "period_type": "quarter" if income.is_quarterly else "annual",
+        "income": income_metrics(income),
+        "balance": balance_metrics(balance),
+        "returns": return_metrics(income, balance),
+        "cagr": {
+            "revenue": cagr(income.column("revenue"), income.dates),
+            "net_income": cagr(income.column("netIncome"), income.dates),
+            "total_assets": cagr(balance.column("totalAssets"), balance.dates),
+        },
+    }
+    if raw_cash_flow:
+        history["cash_flow"] = cash_flow_metrics(income, StatementTable.from_records(raw_cash_flow))
+    return history
@@ -0,0 +1,452 @@
+"""Offline benchmark harness.
+
+Starts the FMP and OpenAI stand-ins from benchmarks/stubs.py in a separate
+process, points the backend at them and drives three targets at each
+requested concurrency level:
+
+  engine     ExecutionEngine.run on a fetch/compute graph of BaseNode stand-ins
+  langgraph  backend.core.graph_runner.run_graph on the full report graph
+  http       POST /api/execute-graph against a uvicorn server in its own process
+
+Each scenario reports throughput, latency percentiles and peak RSS as JSON,
+so two runs can be diffed or checked against a baseline.
+
+The sync target instead refreshes the statements of a --requests-ticker
+universe, downloading everything again vs. syncing the statement store
+incrementally, and reports FMP calls and response bytes for each.
+
+Example:
+    python benchmarks/run_benchmarks.py --targets langgraph,http --concurrency 1,8,32 \\
+        --requests 64 --latency-ms 50 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Ensure the project root is in the Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from backend.engine.base_node import BaseNode
+from benchmarks.stubs import StubConfig, free_port, serve, wait_for_port
+
+logger = logging.getLogger("benchmarks")
+
+STATEMENTS = ("income-statement", "balance-sheet-statement", "cash-flow-statement")
+
+def report_graph(ticker: str, limit: int) -> dict:
+    """The README example graph: profile, three statement loaders, preprocess, summary, LLM report."""
+    return {
+        "nodes": [
+            {"id": "load_profile", "type": "LoadTickerData", "params": {"ticker": ticker}},
+            {"id": "load_income", "type": "LoadIncomeStatement", "params": {"limit": limit}},
+            {"id": "load_balance", "type": "LoadBalanceSheet", "params": {"limit": limit}},
+            {"id": "load_cashflow", "type": "LoadCashFlow", "params": {"limit": limit}},
+            {"id": "preprocess", "type": "PreprocessFinancials", "params": {}},
+            {"id": "summarize", "type": "SummarizeIncomeStatement", "params": {}},
+            {"id": "report", "type": "GenerateLLMReport", "params": {"model": "gpt-4o-mini"}},
+        ],
+        "edges": [
+            {"from_": "load_profile", "to": "load_income"},
+            {"from_": "load_profile", "to": "load_balance"},
+            {"from_": "load_profile", "to": "load_cashflow"},
+            {"from_": "load_income", "to": "preprocess"},
+            {"from_": "load_balance", "to": "preprocess"},
+            {"from_": "load_cashflow", "to": "preprocess"},
+            {"from_": "preprocess", "to": "summarize"},
+            {"from_": "summarize", "to": "report"},
+        ],
+    }
+
+def engine_graph(ticker: str, limit: int) -> dict:
+    """Three parallel statement fetches joined by one CPU-bound ratio node."""
+    nodes = [{"id": f"fetch_{kind}", "type": "BenchFetchStatement",
+              "params": {"ticker": ticker, "statement": kind, "limit": limit}} for kind in STATEMENTS]
+    nodes.append({"id": "ratios", "type": "BenchComputeRatios", "params": {}})
+    edges = [{"from": f"fetch_{kind}", "to": "ratios"} for kind in STATEMENTS]
+    return {"nodes": nodes, "edges": edges}
+
+# --- Measurement ---
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+class RssSampler:
+    """Tracks the peak resident set size of a process while a scenario runs.
+
+    Samples /proc/<pid>/statm; where that is unavailable, falls back to the
+    lifetime peak of this process from getrusage.
+    """
+
+    def __init__(self, pid: Optional[int] = None, interval: float = 0.02):
+        self.pid = pid or os.getpid()
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            rss = _rss_bytes(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        if not self.peak and self.pid == os.getpid():
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak = max_rss if platform.system() == "Darwin" else max_rss * 1024
+
+def summarize(target: str, concurrency: int, latencies: List[float], errors: int,
+              elapsed: float, peak_rss: int) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "target": target,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else None,
+        "latency_ms": {
+            "mean": to_ms(sum(ordered) / len(ordered)) if ordered else None,
+            "p50": to_ms(percentile(ordered, 50)),
+            "p95": to_ms(percentile(ordered, 95)),
+            "p99": to_ms(percentile(ordered, 99)),
+            "max": to_ms(ordered[-1]) if ordered else None,
+        },
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 2),
+    }
+
+# --- Targets ---
+# backend/nodes only holds LangGraph node factories, so the engine is
+# driven with BaseNode stand-ins that do the same I/O and arithmetic.
+_engine_client = None # httpx.Client for the FMP stub, opened per engine scenario
+
+class BenchFetchStatement(BaseNode):
+    def run(self, context, params):
+        response = _engine_client.get(f"{params['statement']}/{params['ticker']}",
+                                      params={"period": "annual", "limit": params["limit"], "apikey": "bench"})
+        response.raise_for_status()
+        return response.json()
+
+class BenchComputeRatios(BaseNode):
+    cpu_bound = True
+
+    def run(self, context, params):
+        income, balance, cash = (context[f"fetch_{kind}"] for kind in STATEMENTS)
+        return [{
+            "date": inc["date"],
+            "net_margin": inc["netIncome"] / inc["revenue"],
+            "debt_to_equity": bs["totalDebt"] / bs["totalStockholdersEquity"],
+            "fcf_margin": cf["freeCashFlow"] / inc["revenue"],
+        } for inc, bs, cf in zip(income, balance, cash)]
+
+def bench_engine(concurrency: int, requests: int, limit: int,
+                 process_pool: Optional[Any] = None) -> Dict[str, Any]:
+    import httpx
+    from backend.engine.execution_engine import ExecutionEngine
+    from backend.engine.models import GraphSpec
+    from backend.engine.node_loader import register_node_class
+
+    global _engine_client
+    _engine_client = httpx.Client(base_url=os.environ["FMP_BASE_URL"], timeout=30.0,
+                                  limits=httpx.Limits(max_connections=max(10, concurrency * 4)))
+    for node_class in (BenchFetchStatement, BenchComputeRatios):
+        register_node_class(node_class)
+
+    engine = ExecutionEngine(process_pool=process_pool)
+
+    def run_one(i: int):
+        spec = GraphSpec(**engine_graph(f"T{i:05d}", limit))
+        start = time.perf_counter()
+        results = engine.run(spec)
+        return time.perf_counter() - start, any(r.status != "done" for r in results.values())
+
+    try:
+        with RssSampler() as rss, ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            outcomes = list(pool.map(run_one, range(requests)))
+            elapsed = time.perf_counter() - start
+    finally:
+        _engine_client.close()
+    # Process pool workers aren't included in peak RSS
+    return summarize("engine", concurrency, [o[0] for o in outcomes], sum(o[1] for o in outcomes),
+                     elapsed, rss.peak)
+
+async def _drive(concurrency: int, requests: int, call: Callable[[int], Any]):
+    """Runs call(i) for every request with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception as e:
+                logger.debug(f"Request {i} failed: {e}")
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, errors, time.perf_counter() - start
+
+async def bench_langgraph(levels: List[int], requests: int, limit: int) -> List[Dict[str, Any]]:
+    from backend.core.graph_runner import run_graph
+    from backend.models.graph_spec import GraphSpec
+    from backend.utils import fmp_client
+
+    async def call(i: int):
+        result = await run_graph(GraphSpec(**report_graph(f"T{i:05d}", limit)))
+        return not result.get("errors")
+
+    results = []
+    try:
+        await run_graph(GraphSpec(**report_graph("WARMUP", limit))) # Compile the graph, open the pool
+        for concurrency in levels:
+            with RssSampler() as rss:
+                latencies, errors, elapsed = await _drive(concurrency, requests, call)
+            results.append(summarize("langgraph", concurrency, latencies, errors, elapsed, rss.peak))
+    finally:
+        await fmp_client.close_client()
+    return results
+
+async def bench_http(levels: List[int], requests: int, limit: int, env: Dict[str, str]) -> List[Dict[str, Any]]:
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=str(project_root), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    results = []
+    try:
+        wait_for_port(port, timeout=30.0)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120.0,
+                                     limits=httpx.Limits(max_connections=max(levels))) as client:
+
+            async def call(i: int):
+                response = await client.post("/api/execute-graph", json=report_graph(f"T{i:05d}", limit))
+                return response.status_code == 200
+
+            await call(-1) # Warm up
+            for concurrency in levels:
+                with RssSampler(server.pid) as rss:
+                    latencies, errors, elapsed = await _drive(concurrency, requests, call)
+                results.append(summarize("http", concurrency, latencies, errors, elapsed, rss.peak))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return results
+
+def fmp_traffic() -> Tuple[float, float]:
+    """FMP calls made and response bytes received so far in this process, from the backend's metrics."""
+    from backend.core import metrics
+
+    def total(lines: List[str], prefix: str) -> float:
+        return sum(float(line.rsplit(" ", 1)[1]) for line in lines
+                   if line.startswith(prefix) and 'service="fmp"' in line)
+
+    return (total(metrics.EXTERNAL_CALLS.render(), metrics.EXTERNAL_CALLS.name + "{"),
+            total(metrics.PAYLOAD_BYTES.render(), metrics.PAYLOAD_BYTES.name + "_sum{"))
+
+async def bench_sync(tickers: int, limit: int, concurrency: int, period: str) -> List[Dict[str, Any]]:
+    """A nightly statement refresh of a universe: full re-download vs. incremental store sync."""
+    import tempfile
+    from backend.utils import fmp_client
+    from backend.utils.statement_store import STATEMENT_TYPES, StatementStore, load_statement, sync_universe
+
+    universe = [f"T{i:05d}" for i in range(tickers)]
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Dict[str, Any]] = []
+
+    async def full_refresh():
+        async def one(ticker: str, statement: str):
+            async with semaphore:
+                await load_statement(statement, ticker, period, limit, mode="off")
+        await asyncio.gather(*(one(ticker, statement) for ticker in universe for statement in STATEMENT_TYPES))
+
+    async def measure(scenario: str, run: Callable[[], Any]):
+        calls, payload = fmp_traffic()
+        start = time.perf_counter()
+        await run()
+        elapsed = time.perf_counter() - start
+        new_calls, new_payload = fmp_traffic()
+        results.append({"target": "sync", "scenario": scenario, "tickers": tickers, "period": period,
+                        "elapsed_s": round(elapsed, 4), "fmp_calls": int(new_calls - calls),
+                        "fmp_bytes": int(new_payload - payload)})
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            store = StatementStore(directory)
+            sync = lambda: sync_universe(universe, period=period, limit=limit, concurrency=concurrency, store=store)
+            await measure("full_refresh", full_refresh)
+            await measure("initial_sync", sync)
+            await measure("incremental_no_new_periods", sync)
+            # Store one older period (not measured), then drop every newest one, as if each
+            # ticker had just reported a new period on top of a full `limit`-period history
+            await sync_universe(universe, period=period, limit=limit + 1, concurrency=concurrency, store=store)
+            for ticker in universe:
+                for statement in STATEMENT_TYPES:
+                    stored = store.read(ticker, statement, period)
+                    store.write(ticker, statement, period, stored[1:].copy())
+            await measure("incremental_one_new_period", sync)
+    finally:
+        await fmp_client.close_client()
+
+    full = results[0]
+    for result in results:
+        result["calls_vs_full"] = round(result["fmp_calls"] / full["fmp_calls"], 4) if full["fmp_calls"] else None
+        result["bytes_vs_full"] = round(result["fmp_bytes"] / full["fmp_bytes"], 4) if full["fmp_bytes"] else None
+    return results
+
+# --- Main ---
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AssetGraph against local FMP/OpenAI stand-ins.")
+    parser.add_argument("--targets", default="engine,langgraph,http",
+                        help="Comma-separated subset of engine, langgraph, http, sync.")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=64, help="Graph runs per scenario.")
+    parser.add_argument("--limit", type=int, default=5, help="Statement periods fetched per loader.")
+    parser.add_argument("--latency-ms", type=float, default=StubConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=StubConfig.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    parser.add_argument("--extra-fields", type=int, default=StubConfig.extra_fields,
+                        help="Padding fields per statement period, to grow payloads.")
+    parser.add_argument("--report-words", type=int, default=StubConfig.report_words)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--cache", action="store_true",
+                        help="Keep the FMP and LLM response caches on (off by default, so every run hits the stubs).")
+    parser.add_argument("--process-pool", action="store_true",
+                        help="Run the engine target's cpu_bound node in a ProcessNodePool.")
+    parser.add_argument("--sync-period", default="annual", choices=("annual", "quarter"),
+                        help="Statement period type for the sync target.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    return parser.parse_args(argv)
+
+def configure_env(fmp_port: int, openai_port: int, cache: bool) -> Dict[str, str]:
+    """Points the backend at the stubs. Must run before any backend module is imported."""
+    overrides = {
+        "FMP_API_KEY": "benchmark",
+        "OPENAI_API_KEY": "benchmark",
+        "FMP_BASE_URL": f"http://127.0.0.1:{fmp_port}/api/v3",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "FMP_CACHE_ENABLED": "true" if cache else "false",
+        "LLM_CACHE_ENABLED": "true" if cache else "false",
+        "LLM_CACHE_BACKEND": "memory",
+        # The stubs are not rate limited; keep the client-side limiters out of the way
+        "FMP_RATE_LIMIT_PER_MIN": "1000000",
+        "FMP_MAX_CONCURRENCY": "1000",
+        "OPENAI_RATE_LIMIT_PER_MIN": "1000000",
+        "OPENAI_MAX_CONCURRENCY": "1000",
+    }
+    os.environ.update(overrides)
+    return dict(os.environ)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = set(targets) - {"engine", "langgraph", "http", "sync"}
+    if unknown:
+        raise SystemExit(f"Unknown targets: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    stub_config = StubConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                             extra_fields=args.extra_fields, report_words=args.report_words, seed=args.seed)
+    fmp_port, openai_port = free_port(), free_port()
+    stubs = multiprocessing.get_context("spawn").Process(target=serve, args=(stub_config, fmp_port, openai_port),
+                                                         daemon=True)
+    stubs.start()
+    env = configure_env(fmp_port, openai_port, args.cache)
+
+    scenarios: List[Dict[str, Any]] = []
+    try:
+        wait_for_port(fmp_port)
+        wait_for_port(openai_port)
+        if "engine" in targets:
+            process_pool = None
+            if args.process_pool:
+                from backend.engine.process_pool import ProcessNodePool
+                process_pool = ProcessNodePool()
+            try:
+                for concurrency in levels:
+                    scenarios.append(bench_engine(concurrency, args.requests, args.limit, process_pool))
+            finally:
+                if process_pool is not None:
+                    process_pool.shutdown()
+        if "langgraph" in targets:
+            scenarios.extend(asyncio.run(bench_langgraph(levels, args.requests, args.limit)))
+        if "http" in targets:
+            scenarios.extend(asyncio.run(bench_http(levels, args.requests, args.limit, env)))
+        if "sync" in targets:
+            scenarios.extend(asyncio.run(bench_sync(args.requests, args.limit, max(levels), args.sync_period)))
+    finally:
+        stubs.terminate()
+        stubs.join(timeout=10)
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {"requests": args.requests, "limit": args.limit, "cache": args.cache,
+                   "process_pool": args.process_pool, "sync_period": args.sync_period,
+                   "stub": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+                            "error_rate": args.error_rate, "extra_fields": args.extra_fields,
+                            "report_words": args.report_words, "seed": args.seed}},
+        "scenarios": scenarios,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    for s in scenarios:
+        if s["target"] == "sync":
+            print(f"{s['target']:>9} {s['scenario']:<28} calls={s['fmp_calls']} ({s['calls_vs_full']} of full)  "
+                  f"bytes={s['fmp_bytes']} ({s['bytes_vs_full']} of full)  {s['elapsed_s']}s", file=sys.stderr)
+            continue
+        lat = s["latency_ms"]
+        print(f"{s['target']:>9} c={s['concurrency']:<4} {s['throughput_rps']:>9} req/s  "
+              f"p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms  "
+              f"errors={s['errors']}  peak_rss={s['peak_rss_mb']}MB", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Cold-start profile and budget check for the API process.
+
+Reports what importing the app costs, per module and per top-level package
+(parsed from `python -X importtime`), and the time from spawning a uvicorn
+worker to its first successful response. Each measurement runs in a fresh
+interpreter, so nothing is already imported.
+
+With --budget-ms (or STARTUP_BUDGET_MS) the script exits with status 1 when
+the median time-to-first-request is over budget, so it can gate CI or a
+deploy. --import-budget-ms does the same for the app import alone.
+
+Example:
+    python benchmarks/startup_profile.py --runs 5 --top 15 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Ensure the project root is in the Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from benchmarks.stubs import free_port
+
+APP_MODULE = "backend.main"
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Rows of `-X importtime` output as {"module", "self_us", "cumulative_us", "depth"}."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue # Header line
+        name = parts[2].rstrip()
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+    return rows
+
+def profile_imports(module: str, env: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Imports the module in a fresh interpreter with -X importtime."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=project_root, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+def import_summary(rows: List[Dict[str, Any]], module: str, top: int) -> Dict[str, Any]:
+    total_us = next((r["cumulative_us"] for r in rows if r["module"] == module), sum(r["self_us"] for r in rows))
+    packages: Dict[str, int] = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + row["self_us"]
+    return {
+        "total_ms": round(total_us / 1000.0, 1),
+        "modules_imported": len(rows),
+        "by_package_ms": {name: round(us / 1000.0, 1) for name, us in
+                          sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]},
+        "slowest_modules": [{"module": r["module"], "self_ms": round(r["self_us"] / 1000.0, 1),
+                             "cumulative_ms": round(r["cumulative_us"] / 1000.0, 1)}
+                            for r in sorted(rows, key=lambda r: r["self_us"], reverse=True)[:top]],
+    }
+
+def time_to_first_request(env: Dict[str, str], timeout: float = 60.0) -> float:
+    """Seconds from spawning a uvicorn worker until GET / returns 200."""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{APP_MODULE}:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=project_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        while time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with status {server.returncode} before serving a request")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1.0) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.005)
+        raise RuntimeError(f"Server did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Profile API cold start and check it against a budget.")
+    parser.add_argument("--runs", type=int, default=3, help="Server cold starts to measure (median is reported).")
+    parser.add_argument("--top", type=int, default=15, help="Modules and packages to list.")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "0")) or None,
+                        help="Fail if median time-to-first-request exceeds this (default: STARTUP_BUDGET_MS).")
+    parser.add_argument("--import-budget-ms", type=float,
+                        default=float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "0")) or None,
+                        help=f"Fail if importing {APP_MODULE} exceeds this (default: STARTUP_IMPORT_BUDGET_MS).")
+    parser.add_argument("--skip-server", action="store_true", help="Only profile imports.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    env = dict(os.environ)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+
+    imports = import_summary(profile_imports(APP_MODULE, env), APP_MODULE, args.top)
+    first_request: Optional[Dict[str, Any]] = None
+    if not args.skip_server:
+        samples = [time_to_first_request(env) * 1000.0 for _ in range(max(1, args.runs))]
+        first_request = {"median_ms": round(statistics.median(samples), 1),
+                         "samples_ms": [round(s, 1) for s in samples]}
+
+    failures = []
+    if args.import_budget_ms is not None and imports["total_ms"] > args.import_budget_ms:
+        failures.append(f"import of {APP_MODULE} took {imports['total_ms']}ms (budget {args.import_budget_ms}ms)")
+    if args.budget_ms is not None and first_request is not None and first_request["median_ms"] > args.budget_ms:
+        failures.append(f"time to first request was {first_request['median_ms']}ms (budget {args.budget_ms}ms)")
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "imports": imports,
+        "time_to_first_request": first_request,
+        "budget": {"time_to_first_request_ms": args.budget_ms, "import_ms": args.import_budget_ms,
+                   "failures": failures},
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    print(f"import {APP_MODULE}: {imports['total_ms']}ms ({imports['modules_imported']} modules)", file=sys.stderr)
+    for package, ms in imports["by_package_ms"].items():
+        print(f"  {package:<24} {ms:>8}ms", file=sys.stderr)
+    if first_request is not None:
+        print(f"time to first request: median {first_request['median_ms']}ms {first_request['samples_ms']}",
+              file=sys.stderr)
+    for failure in failures:
+        print(f"OVER BUDGET: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
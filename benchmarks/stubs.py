@@ -0,0 +1,186 @@
+"""Local stand-ins for the FMP and OpenAI APIs, used by the benchmark harness.
+
+Both stubs serve deterministic fake data with configurable latency, error
+rate and payload size, so benchmark runs need no network or API keys.
+"""
+import asyncio
+import json
+import random
+import socket
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 50.0 # Mean added latency per request
+    jitter_ms: float = 10.0 # Uniform +/- jitter around latency_ms
+    error_rate: float = 0.0 # Fraction of requests answered with error_status
+    error_status: int = 503
+    extra_fields: int = 0 # Padding fields per statement period, to grow payloads
+    report_words: int = 300 # Length of the fake LLM report
+    stream_chunk_words: int = 5
+    seed: Optional[int] = None
+
+    async def delay(self, rng: random.Random):
+        latency = max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms))
+        if latency:
+            await asyncio.sleep(latency / 1000)
+
+    def should_fail(self, rng: random.Random) -> bool:
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+STATEMENT_FIELDS = {
+    "income-statement": ["revenue", "costOfRevenue", "grossProfit", "operatingExpenses",
+                         "operatingIncome", "interestExpense", "incomeBeforeTax", "netIncome", "eps"],
+    "balance-sheet-statement": ["cashAndCashEquivalents", "totalCurrentAssets", "totalAssets",
+                                "totalCurrentLiabilities", "totalDebt", "totalLiabilities",
+                                "totalStockholdersEquity"],
+    "cash-flow-statement": ["operatingCashFlow", "capitalExpenditure", "freeCashFlow",
+                            "dividendsPaid", "netChangeInCash"],
+}
+
+def _ticker_seed(ticker: str) -> int:
+    return sum(ord(c) * (i + 1) for i, c in enumerate(ticker.upper()))
+
+def fake_statement(kind: str, ticker: str, period: str, limit: int, extra_fields: int = 0) -> List[dict]:
+    """Newest-first statement periods shaped like FMP's responses."""
+    rng = random.Random(_ticker_seed(ticker) + len(kind))
+    base = rng.uniform(1e8, 1e11)
+    periods = []
+    today = date.today()
+    for i in range(limit):
+        if period == "quarter":
+            year, quarter = divmod(today.year * 4 + (today.month - 1) // 3 - 1 - i, 4)
+            period_end = date(year, quarter * 3 + 3, 28)
+            label = f"Q{quarter + 1}"
+        else:
+            period_end = date(today.year - 1 - i, 12, 31)
+            label = "FY"
+        scale = base * (0.92 ** i)
+        row = {"date": period_end.isoformat(), "symbol": ticker.upper(), "reportedCurrency": "USD",
+               "calendarYear": str(period_end.year), "period": label}
+        for j, field in enumerate(STATEMENT_FIELDS[kind]):
+            row[field] = round(scale * (1.0 - 0.07 * j) * rng.uniform(0.9, 1.1), 2)
+        for j in range(extra_fields):
+            row[f"extraField{j}"] = round(scale * rng.random(), 2)
+        periods.append(row)
+    return periods
+
+def fake_profile(ticker: str) -> dict:
+    return {"symbol": ticker.upper(), "companyName": f"{ticker.upper()} Holdings Inc.",
+            "sector": "Technology", "industry": "Software", "currency": "USD",
+            "mktCap": 1e9 + _ticker_seed(ticker) * 1e6, "price": 100.0}
+
+def create_fmp_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="FMP stub")
+    rng = random.Random(config.seed)
+
+    async def respond(payload):
+        await config.delay(rng)
+        if config.should_fail(rng):
+            return JSONResponse(status_code=config.error_status, content={"Error Message": "stub error"},
+                                headers={"Retry-After": "0"})
+        return JSONResponse(payload)
+
+    @app.get("/api/v3/profile/{symbols}")
+    async def profile(symbols: str):
+        return await respond([fake_profile(symbol) for symbol in symbols.split(",") if symbol])
+
+    @app.get("/api/v3/{kind}/{ticker}")
+    async def statement(kind: str, ticker: str, period: str = "annual", limit: int = 5):
+        if kind not in STATEMENT_FIELDS:
+            return JSONResponse(status_code=404, content={"Error Message": f"Unknown endpoint {kind}"})
+        return await respond(fake_statement(kind, ticker, period, limit, config.extra_fields))
+
+    return app
+
+def create_openai_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="OpenAI stub")
+    rng = random.Random(config.seed)
+
+    def report_words() -> List[str]:
+        return [f"word{i % 97}" for i in range(config.report_words)]
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await config.delay(rng)
+        if config.should_fail(rng):
+            return JSONResponse(status_code=config.error_status,
+                                content={"error": {"message": "stub error", "type": "server_error"}},
+                                headers={"retry-after-ms": "0"})
+
+        created = int(time.time())
+        model = body.get("model", "stub-model")
+        words = report_words()
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+            })
+
+        async def events():
+            step = max(1, config.stream_chunk_words)
+            for i in range(0, len(words), step):
+                chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created,
+                         "model": model, "choices": [{"index": 0, "finish_reason": None,
+                                                      "delta": {"content": " ".join(words[i:i + step]) + " "}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def _serve_all(apps_and_ports):
+    servers = [uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                             access_log=False))
+               for app, port in apps_and_ports]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+def serve(config: StubConfig, fmp_port: int, openai_port: int):
+    """Serves both stubs until the process is stopped. Meant to run in its own process."""
+    asyncio.run(_serve_all([(create_fmp_app(config), fmp_port), (create_openai_app(config), openai_port)]))
+
+def wait_for_port(port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+            time.sleep(0.05)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the FMP and OpenAI stand-ins.")
+    parser.add_argument("--fmp-port", type=int, default=8101)
+    parser.add_argument("--openai-port", type=int, default=8102)
+    parser.add_argument("--latency-ms", type=float, default=StubConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=StubConfig.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    parser.add_argument("--extra-fields", type=int, default=StubConfig.extra_fields)
+    parser.add_argument("--report-words", type=int, default=StubConfig.report_words)
+    args = parser.parse_args()
+
+    print(f"FMP_BASE_URL=http://127.0.0.1:{args.fmp_port}/api/v3")
+    print(f"OPENAI_BASE_URL=http://127.0.0.1:{args.openai_port}/v1")
+    serve(StubConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                     extra_fields=args.extra_fields, report_words=args.report_words),
+          args.fmp_port, args.openai_port)
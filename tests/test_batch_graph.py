@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api.routes import batch_graph
+from backend.core import graph_runner
+
+_running = {"now": 0, "peak": 0}
+
+def batch_node(params):
+    """Test node factory: tracks how many runs are in flight; "FAIL" and "RAISE" tickers fail."""
+    async def node(state):
+        _running["now"] += 1
+        _running["peak"] = max(_running["peak"], _running["now"])
+        try:
+            await asyncio.sleep(params.get("sleep", 0.02))
+        finally:
+            _running["now"] -= 1
+        if params["ticker"] == "RAISE":
+            raise RuntimeError("node crashed")
+        if params["ticker"] == "FAIL":
+            return {"errors": ["load: no data for FAIL"]}
+        return {"current_ticker": params["ticker"], "income_summary": params.get("note")}
+    return node
+
+@pytest.fixture
+def client(monkeypatch):
+    mapping = {**graph_runner.NODE_TYPE_MAPPING, "BatchLoad": (__name__, "batch_node")}
+    monkeypatch.setattr(graph_runner, "NODE_TYPE_MAPPING", mapping)
+    _running.update(now=0, peak=0)
+    app = FastAPI()
+    app.include_router(batch_graph.router, prefix="/api")
+    return TestClient(app)
+
+TEMPLATE = {"nodes": [{"id": "load", "type": "BatchLoad", "params": {"ticker": "TEMPLATE", "note": "kept"}}],
+            "edges": []}
+
+def _batch(client, tickers, concurrency=8, graph=TEMPLATE):
+    return client.post("/api/execute-graph/batch",
+                       json={"graph": graph, "tickers": tickers, "concurrency": concurrency})
+
+def _lines(response):
+    assert response.status_code == 200 and response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def test_every_ticker_gets_a_line_with_its_own_params(client):
+    lines = _lines(_batch(client, ["AAPL", " MSFT ", "", "NVDA"]))
+    assert sorted(line["ticker"] for line in lines) == ["AAPL", "MSFT", "NVDA"]
+    for line in lines:
+        assert line["status"] == "ok" and line["error"] is None
+        assert line["result"]["current_ticker"] == line["ticker"]
+        assert line["result"]["income_summary"] == "kept"
+
+def test_concurrency_is_bounded(client):
+    tickers = [f"T{i}" for i in range(12)]
+    lines = _lines(_batch(client, tickers, concurrency=3))
+    assert len(lines) == 12 and _running["peak"] == 3
+
+def test_concurrency_is_capped_by_the_server(client, monkeypatch):
+    monkeypatch.setattr(batch_graph, "MAX_BATCH_CONCURRENCY", 2)
+    _lines(_batch(client, [f"T{i}" for i in range(6)], concurrency=100))
+    assert _running["peak"] == 2
+
+def test_lines_arrive_in_completion_order(client, monkeypatch):
+    template_params = graph_runner.ticker_node_params
+
+    def slow_first(graph_spec, ticker):
+        node_params = template_params(graph_spec, ticker)
+        node_params["load"]["sleep"] = 0.2 if ticker == "SLOW" else 0.0
+        return node_params
+
+    monkeypatch.setattr(graph_runner, "ticker_node_params", slow_first)
+    assert [line["ticker"] for line in _lines(_batch(client, ["SLOW", "FAST"]))] == ["FAST", "SLOW"]
+
+def test_failures_are_reported_per_ticker(client):
+    lines = {line["ticker"]: line for line in _lines(_batch(client, ["AAPL", "FAIL", "RAISE"]))}
+    assert lines["AAPL"]["status"] == "ok"
+    assert lines["FAIL"]["status"] == "error" and lines["FAIL"]["result"]["errors"] == ["load: no data for FAIL"]
+    assert lines["RAISE"]["status"] == "error" and lines["RAISE"]["result"] is None
+    assert "node crashed" in lines["RAISE"]["error"]
+
+def test_bad_requests_are_rejected_before_streaming(client, monkeypatch):
+    assert _batch(client, ["", "  "]).status_code == 400
+    monkeypatch.setattr(batch_graph, "MAX_BATCH_TICKERS", 2)
+    assert _batch(client, ["A", "B", "C"]).status_code == 400
+    unknown = {"nodes": [{"id": "x", "type": "NoSuchNode"}], "edges": []}
+    assert _batch(client, ["A"], graph=unknown).status_code == 400
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from backend.utils.batcher import MicroBatcher
+
+class _Backend:
+    """A batch function that records the batches it receives."""
+
+    def __init__(self, delay: float = 0.0, error: Exception = None, known=None):
+        self.batches = []
+        self.delay = delay
+        self.error = error
+        self.known = known
+
+    async def __call__(self, keys):
+        self.batches.append(list(keys))
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {key: f"value:{key}" for key in keys if self.known is None or key in self.known}
+
+def test_loads_within_the_window_share_one_batch():
+    backend = _Backend()
+    batcher = MicroBatcher(backend, window=0.02)
+
+    async def main():
+        return await asyncio.gather(*(batcher.load(key) for key in ["A", "B", "A", "C"]))
+
+    assert asyncio.run(main()) == ["value:A", "value:B", "value:A", "value:C"]
+    assert backend.batches == [["A", "B", "C"]] # Distinct keys only
+    assert batcher.stats == {"loads": 4, "batches": 1, "keys": 3}
+
+def test_loads_after_the_window_start_a_new_batch():
+    backend = _Backend()
+    batcher = MicroBatcher(backend, window=0.01)
+
+    async def main():
+        first = asyncio.ensure_future(batcher.load("A"))
+        await asyncio.sleep(0.05)
+        return await first, await batcher.load("B")
+
+    assert asyncio.run(main()) == ("value:A", "value:B")
+    assert backend.batches == [["A"], ["B"]]
+
+def test_full_batch_is_sent_without_waiting_for_the_window():
+    backend = _Backend()
+    batcher = MicroBatcher(backend, window=10, max_batch_size=3)
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.load(key) for key in "ABCDEF")), 1)
+
+    assert asyncio.run(main()) == [f"value:{key}" for key in "ABCDEF"]
+    assert backend.batches == [["A", "B", "C"], ["D", "E", "F"]]
+
+def test_errors_reach_every_waiter_in_the_batch():
+    batcher = MicroBatcher(_Backend(error=RuntimeError("upstream down")), window=0.01)
+
+    async def main():
+        return await asyncio.gather(*(batcher.load(key) for key in "ABA"), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+def test_missing_keys_get_a_fresh_default_each():
+    batcher = MicroBatcher(_Backend(known={"A"}), window=0.01, default_factory=list)
+
+    async def main():
+        return await asyncio.gather(batcher.load("A"), batcher.load("X"), batcher.load("Y"))
+
+    found, x, y = asyncio.run(main())
+    assert found == "value:A" and x == [] and y == []
+    assert x is not y
+
+def test_missing_keys_without_a_factory_are_none():
+    batcher = MicroBatcher(_Backend(known=set()), window=0.01)
+    assert asyncio.run(batcher.load("A")) is None
+
+def test_cancelled_waiter_does_not_break_the_batch():
+    batcher = MicroBatcher(_Backend(delay=0.02), window=0.01)
+
+    async def main():
+        cancelled = asyncio.ensure_future(batcher.load("A"))
+        other = asyncio.ensure_future(batcher.load("A"))
+        await asyncio.sleep(0.015) # Batch sent, still running
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await other
+
+    assert asyncio.run(main()) == "value:A"
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+
+from backend.utils.cache import DiskTier, LRUCache, TieredCache, build_backend
+
+def test_lru_fresh_stale_and_expired_entries():
+    cache = LRUCache()
+    now = time.time()
+    cache.set("fresh", 1, now + 60, now + 120)
+    cache.set("stale", 2, now - 1, now + 60)
+    cache.set("expired", 3, now - 2, now - 1)
+    assert cache.get("fresh") == (1, True)
+    assert cache.get("stale") == (2, False)
+    assert cache.get("expired") is None and len(cache) == 2 # Dropped on lookup
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    until = time.time() + 60
+    cache.set("a", 1, until, until)
+    cache.set("b", 2, until, until)
+    cache.get("a")
+    cache.set("c", 3, until, until)
+    assert cache.get("b") is None and cache.get("a") == (1, True) and cache.get("c") == (3, True)
+
+def test_lru_hands_out_copies():
+    cache = LRUCache()
+    until = time.time() + 60
+    value = {"rows": [{"revenue": 1}]}
+    cache.set("a", value, until, until)
+    value["rows"].append("added after set")
+    first, _ = cache.get("a")
+    first["rows"][0]["revenue"] = 2
+    assert cache.get("a") == ({"rows": [{"revenue": 1}]}, True)
+
+def test_lru_skips_values_that_cannot_be_copied():
+    cache = LRUCache()
+    until = time.time() + 60
+    cache.set("a", 1, until, until)
+    cache.set("a", {"fn": lambda: None}, until, until)
+    assert cache.get("a") is None
+
+def test_tiered_cache_stats_and_copies():
+    cache = TieredCache("test")
+
+    async def main():
+        await cache.set("fresh", [1, 2], ttl=60)
+        await cache.set("stale", "s", ttl=-1, stale_ttl=60)
+        await cache.set("gone", "g", ttl=-1)
+        found, _ = await cache.get("fresh")
+        found.append(3)
+        return [await cache.get(key) for key in ("fresh", "stale", "gone", "missing")]
+
+    assert asyncio.run(main()) == [([1, 2], True), ("s", False), None, None]
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (2, 1, 2)
+    assert stats["hit_rate"] == 0.6
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    async def main():
+        await TieredCache("a", backend=DiskTier(str(tmp_path))).set("key", {"v": 1}, ttl=60)
+        fresh = TieredCache("b", backend=DiskTier(str(tmp_path)))
+        return fresh, await fresh.get("key"), await fresh.get("key")
+
+    fresh, first, second = asyncio.run(main())
+    assert first == second == ({"v": 1}, True)
+    assert fresh.stats["backend_hits"] == 1 # The second lookup is served from memory
+
+def test_disk_tier_drops_expired_and_unreadable_files(tmp_path):
+    tier = DiskTier(str(tmp_path))
+
+    async def main():
+        await tier.set("old", {"value": 1, "expires_at": 0, "stale_until": time.time() - 1})
+        await tier.set("bad", {"value": 1, "expires_at": 0, "stale_until": time.time() + 60})
+        tier._path("bad").write_text("{not json")
+        return await tier.get("old"), await tier.get("bad"), await tier.get("missing")
+
+    assert asyncio.run(main()) == (None, None, None)
+    assert not tier._path("old").exists()
+
+def test_disk_tier_prunes_oldest_files(tmp_path):
+    tier = DiskTier(str(tmp_path), max_bytes=1000, prune_every=1)
+    record = {"value": "x" * 300, "expires_at": 0, "stale_until": time.time() + 60}
+    tier._write("a", record)
+    tier._write("b", record)
+    past = time.time() - 100
+    os.utime(tier._path("a"), (past, past))
+    tier._write("c", record)
+    assert not tier._path("a").exists()
+    assert tier._path("b").exists() and tier._path("c").exists()
+
+class _BrokenTier:
+    async def get(self, key):
+        raise ConnectionError("down")
+
+    async def set(self, key, record):
+        raise ConnectionError("down")
+
+def test_backend_errors_are_misses():
+    cache = TieredCache("test", backend=_BrokenTier())
+
+    async def main():
+        await cache.set("key", 1, ttl=60)
+        cache.memory.clear()
+        return await cache.get("key")
+
+    assert asyncio.run(main()) is None
+    assert cache.stats["backend_errors"] == 2
+
+def test_build_backend(tmp_path):
+    assert build_backend("memory") is None and build_backend(None) is None
+    disk = build_backend("DISK", directory=str(tmp_path / "c"), max_bytes=10)
+    assert isinstance(disk, DiskTier) and disk.max_bytes == 10 and (tmp_path / "c").is_dir()
+    assert build_backend("redis") is None # No URL
+    assert build_backend("memcached") is None
+
+def test_disk_tier_counts_concurrent_writes(tmp_path):
+    tier = DiskTier(str(tmp_path))
+    record = {"value": 1, "expires_at": 0, "stale_until": time.time() + 60}
+
+    async def main():
+        await asyncio.gather(*(tier.set(f"key{i}", record) for i in range(50)))
+
+    asyncio.run(main())
+    assert tier._writes == 50
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from backend.engine.base_node import BaseNode
+from backend.engine.execution_engine import ExecutionEngine
+from backend.engine.models import GraphSpec
+from backend.engine.node_loader import register_node_class
+
+def _spec(nodes, edges=()) -> GraphSpec:
+    return GraphSpec.parse_obj({
+        "nodes": [{"id": node_id, "type": node_type, "params": params} for node_id, node_type, params in nodes],
+        "edges": [{"from": source, "to": target} for source, target in edges],
+    })
+
+class EngineFails(BaseNode):
+    def run(self, context, params):
+        time.sleep(params.get("sleep", 0))
+        raise ValueError("bad input")
+
+register_node_class(EngineFails)
+
+def test_failed_node_keeps_its_timing_and_error():
+    results = ExecutionEngine().run(_spec([("fail", "EngineFails", {"sleep": 0.05})]))
+    failed = results["fail"]
+    assert failed.status == "error" and failed.error == "Execution failed: bad input"
+    assert failed.duration_ms >= 50 and failed.finished_at - failed.started_at >= 0.05
+
+_order = []
+_active = {"io": 0, "cpu": 0}
+_peak = {"io": 0, "cpu": 0}
+_lock = threading.Lock()
+
+def _track(kind, node_id, sleep):
+    with _lock:
+        _order.append(node_id)
+        _active[kind] += 1
+        _peak[kind] = max(_peak[kind], _active[kind])
+    time.sleep(sleep)
+    with _lock:
+        _active[kind] -= 1
+
+class EngineIO(BaseNode):
+    def run(self, context, params):
+        _track("io", params["id"], params.get("sleep", 0.02))
+        return sorted(context)
+
+class EngineCPU(BaseNode):
+    cpu_bound = True
+
+    def run(self, context, params):
+        _track("cpu", params["id"], params.get("sleep", 0.02))
+        return sorted(context)
+
+class EngineSlow(EngineIO):
+    estimated_cost = 10.0
+
+for _node_class in (EngineIO, EngineCPU, EngineSlow):
+    register_node_class(_node_class)
+
+def _reset():
+    _order.clear()
+    _active.update(io=0, cpu=0)
+    _peak.update(io=0, cpu=0)
+
+def _nodes(node_type, *node_ids, **params):
+    return [(node_id, node_type, {"id": node_id, **params}) for node_id in node_ids]
+
+def test_nodes_start_after_their_dependencies():
+    _reset()
+    nodes = _nodes("EngineIO", "a", "b", "c", "d")
+    results = ExecutionEngine(max_workers=4).run(_spec(nodes, [("a", "c"), ("b", "c"), ("c", "d")]))
+    assert all(result.status == "done" for result in results.values())
+    assert set(_order[:2]) == {"a", "b"} and _order[2:] == ["c", "d"]
+    assert results["c"].result == ["a", "b"]
+    assert results["c"].started_at >= max(results["a"].finished_at, results["b"].finished_at)
+
+def test_io_and_cpu_nodes_have_separate_concurrency_caps():
+    _reset()
+    nodes = _nodes("EngineIO", *[f"io{i}" for i in range(6)]) + _nodes("EngineCPU", *[f"cpu{i}" for i in range(6)])
+    results = ExecutionEngine(max_workers=8, max_io_workers=3, max_cpu_workers=2).run(_spec(nodes))
+    assert all(result.status == "done" for result in results.values())
+    assert _peak == {"io": 3, "cpu": 2}
+
+def test_failed_dependency_fails_its_descendants_only():
+    _reset()
+    nodes = [("fail", "EngineFails", {})] + _nodes("EngineIO", "child", "grandchild", "other")
+    results = ExecutionEngine().run(_spec(nodes, [("fail", "child"), ("child", "grandchild")]))
+    assert results["fail"].status == "error"
+    for node_id in ("child", "grandchild"):
+        assert results[node_id].status == "error"
+        assert "did not complete successfully" in results[node_id].error
+    assert results["other"].status == "done"
+    assert sorted(_order) == ["other"]
+
+def test_longest_remaining_path_starts_first():
+    _reset()
+    # With one slot, "head" (in front of the expensive "slow") goes before the
+    # short branches, even though they come first in topological order
+    nodes = _nodes("EngineIO", "a", "b", "head", sleep=0) + _nodes("EngineSlow", "slow", sleep=0)
+    results = ExecutionEngine(max_workers=1).run(_spec(nodes, [("head", "slow")]))
+    assert all(result.status == "done" for result in results.values())
+    assert _order == ["head", "slow", "a", "b"]
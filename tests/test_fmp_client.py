@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.utils import fmp_client
+from backend.utils.rate_limiter import AdaptiveRateLimiter
+
+class _StandIn:
+    """A local stand-in for FMP: answers profile requests and records the URLs it was asked for."""
+
+    def __init__(self, status: int = 200):
+        self.paths = []
+        self.status = status
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.paths.append(request.url.path)
+        if self.status != 200:
+            return httpx.Response(self.status, json={"Error Message": "bad"})
+        symbols = request.url.path.rsplit("/", 1)[-1].split(",")
+        body = [{"symbol": symbol, "companyName": f"{symbol} Inc."} for symbol in symbols if symbol != "NOPE"]
+        return httpx.Response(200, content=json.dumps(body), headers={"Content-Type": "application/json"})
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    server = _StandIn()
+    monkeypatch.setattr(fmp_client, "API_KEY", "test-key")
+    monkeypatch.setattr(fmp_client, "CACHE_ENABLED", False)
+    monkeypatch.setattr(fmp_client, "MAX_RETRIES", 0)
+    monkeypatch.setattr(fmp_client, "_limiter", AdaptiveRateLimiter("fmp-test", rate_per_sec=1e6))
+    monkeypatch.setattr(fmp_client._profile_batcher, "window", 0.02)
+    return server
+
+def _run(server, coroutine):
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(base_url="https://fmp.test/api/v3", transport=httpx.MockTransport(server))
+        fmp_client._clients[id(loop)] = (loop, client)
+        try:
+            return await coroutine()
+        finally:
+            await fmp_client.close_client()
+
+    return asyncio.run(main())
+
+def test_concurrent_profiles_are_fetched_in_one_request(stand_in):
+    async def fetch():
+        return await asyncio.gather(*(fmp_client.fetch_company_profile(t) for t in ["AAPL", "msft", "NOPE", "AAPL"]))
+
+    aapl, msft, unknown, aapl_again = _run(stand_in, fetch)
+    assert stand_in.paths == ["/api/v3/profile/AAPL,MSFT,NOPE"]
+    assert aapl == [{"symbol": "AAPL", "companyName": "AAPL Inc."}] and aapl_again == aapl
+    assert msft[0]["symbol"] == "MSFT"
+    assert unknown == [] # Same shape as a single-symbol call for an unknown symbol
+
+def test_profiles_outside_the_window_are_separate_requests(stand_in):
+    async def fetch():
+        first = await fmp_client.fetch_company_profile("AAPL")
+        return first, await fmp_client.fetch_company_profile("MSFT")
+
+    _run(stand_in, fetch)
+    assert stand_in.paths == ["/api/v3/profile/AAPL", "/api/v3/profile/MSFT"]
+
+def test_batch_size_limit_splits_requests(stand_in, monkeypatch):
+    monkeypatch.setattr(fmp_client._profile_batcher, "max_batch_size", 2)
+
+    async def fetch():
+        return await asyncio.gather(*(fmp_client.fetch_company_profile(t) for t in ["A", "B", "C"]))
+
+    assert [r[0]["symbol"] for r in _run(stand_in, fetch)] == ["A", "B", "C"]
+    assert stand_in.paths == ["/api/v3/profile/A,B", "/api/v3/profile/C"]
+
+def test_failed_batch_reaches_every_caller(stand_in):
+    stand_in.status = 404
+
+    async def fetch():
+        return await asyncio.gather(*(fmp_client.fetch_company_profile(t) for t in ["A", "B"]), return_exceptions=True)
+
+    results = _run(stand_in, fetch)
+    assert len(stand_in.paths) == 1
+    assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
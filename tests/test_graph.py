@@ -0,0 +1,49 @@
+from backend.engine.graph import Graph, dirty_nodes
+from backend.engine.models import GraphSpec
+
+def _spec(nodes, edges=()) -> GraphSpec:
+    return GraphSpec.parse_obj({
+        "nodes": [{"id": node_id, "type": node_type, "params": params} for node_id, node_type, params in nodes],
+        "edges": [{"from": source, "to": target} for source, target in edges],
+    })
+
+# income, balance -> ratios -> report; prices -> report
+NODES = [("income", "LoadIncomeStatement", {"ticker": "AAPL"}),
+         ("balance", "LoadBalanceSheet", {"ticker": "AAPL"}),
+         ("prices", "LoadTickerData", {"ticker": "AAPL"}),
+         ("ratios", "ComputeRatios", {}),
+         ("report", "WriteReport", {"model": "gpt-4o-mini"})]
+EDGES = [("income", "ratios"), ("balance", "ratios"), ("ratios", "report"), ("prices", "report")]
+
+def _with(node_id, **changes):
+    return [(i, changes.get("type", t), changes.get("params", p)) if i == node_id else (i, t, p) for i, t, p in NODES]
+
+def test_unchanged_spec_is_clean():
+    assert dirty_nodes(_spec(NODES, EDGES), _spec(NODES, EDGES)) == set()
+
+def test_changed_params_dirty_the_node_and_its_descendants():
+    previous = _spec(NODES, EDGES)
+    assert dirty_nodes(previous, _spec(_with("report", params={"model": "gpt-4o"}), EDGES)) == {"report"}
+    assert dirty_nodes(previous, _spec(_with("income", params={"ticker": "MSFT"}), EDGES)) == {
+        "income", "ratios", "report"}
+
+def test_changed_type_dirties_the_node():
+    assert dirty_nodes(_spec(NODES, EDGES), _spec(_with("prices", type="LoadPrices"), EDGES)) == {"prices", "report"}
+
+def test_new_node_and_changed_parents_are_dirty():
+    nodes = NODES + [("cash", "LoadCashFlow", {"ticker": "AAPL"})]
+    edges = EDGES + [("cash", "ratios")]
+    assert dirty_nodes(_spec(NODES, EDGES), _spec(nodes, edges)) == {"cash", "ratios", "report"}
+
+def test_removed_edge_dirties_the_child():
+    edges = [edge for edge in EDGES if edge != ("prices", "report")]
+    assert dirty_nodes(_spec(NODES, EDGES), _spec(NODES, edges)) == {"report"}
+
+def test_failed_nodes_are_rerun():
+    assert dirty_nodes(_spec(NODES, EDGES), _spec(NODES, EDGES), failed=["balance"]) == {
+        "balance", "ratios", "report"}
+
+def test_descendants_include_the_nodes_themselves():
+    graph = Graph(_spec(NODES, EDGES))
+    assert graph.descendants(["ratios"]) == {"ratios", "report"}
+    assert graph.descendants([]) == set()
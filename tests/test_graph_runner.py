@@ -0,0 +1,76 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from backend.core import graph_runner
+from backend.models.graph_spec import GraphSpec
+
+def echo_node(params):
+    """Test node factory: writes its ticker to current_ticker after a short pause."""
+    async def node(state):
+        await asyncio.sleep(params.get("sleep", 0))
+        return {"current_ticker": params.get("ticker")}
+    return node
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    mapping = {**graph_runner.NODE_TYPE_MAPPING, "RunnerEcho": (__name__, "echo_node")}
+    monkeypatch.setattr(graph_runner, "NODE_TYPE_MAPPING", mapping)
+    monkeypatch.setattr(graph_runner, "_compiled_graphs", OrderedDict())
+    monkeypatch.setattr(graph_runner, "_graph_cache_stats", {"hits": 0, "misses": 0, "evictions": 0})
+
+def _spec(ticker="AAPL", node_id="echo", edges=()):
+    nodes = [{"id": node_id, "type": "RunnerEcho", "params": {"ticker": ticker}}]
+    nodes += [{"id": target, "type": "RunnerEcho", "params": {"ticker": ticker}} for _, target in edges]
+    return GraphSpec.parse_obj({"nodes": nodes, "edges": [{"from_": s, "to": t} for s, t in edges]})
+
+def test_specs_differing_only_in_params_share_a_compiled_graph():
+    first = graph_runner.get_compiled_graph(_spec("AAPL"))
+    assert graph_runner.get_compiled_graph(_spec("MSFT")) is first
+    assert graph_runner.graph_structure_key(_spec("AAPL")) == graph_runner.graph_structure_key(_spec("MSFT"))
+    assert graph_runner.graph_cache_stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+def test_structure_changes_miss_the_cache():
+    keys = {graph_runner.graph_structure_key(spec) for spec in
+            (_spec(), _spec(node_id="other"), _spec(edges=[("echo", "next")]))}
+    assert len(keys) == 3
+    # Edge order and duplicates don't matter
+    twice = GraphSpec.parse_obj({**_spec(edges=[("echo", "next")]).dict(),
+                                 "edges": [{"from_": "echo", "to": "next"}] * 2})
+    assert graph_runner.graph_structure_key(twice) == graph_runner.graph_structure_key(_spec(edges=[("echo", "next")]))
+
+def test_least_recently_used_graph_is_evicted(monkeypatch):
+    monkeypatch.setattr(graph_runner, "GRAPH_CACHE_SIZE", 2)
+    a = graph_runner.get_compiled_graph(_spec(node_id="a"))
+    graph_runner.get_compiled_graph(_spec(node_id="b"))
+    graph_runner.get_compiled_graph(_spec(node_id="a"))
+    graph_runner.get_compiled_graph(_spec(node_id="c")) # Evicts b
+    assert graph_runner.get_compiled_graph(_spec(node_id="a")) is a
+    stats = graph_runner.graph_cache_stats()
+    assert (stats["evictions"], stats["size"], stats["misses"]) == (1, 2, 3)
+    graph_runner.get_compiled_graph(_spec(node_id="b"))
+    assert graph_runner.graph_cache_stats()["misses"] == 4
+
+def test_unknown_node_type_is_not_cached():
+    spec = GraphSpec.parse_obj({"nodes": [{"id": "x", "type": "NoSuchNode"}], "edges": []})
+    with pytest.raises(ValueError):
+        graph_runner.get_compiled_graph(spec)
+    assert graph_runner.graph_cache_stats()["size"] == 0
+
+def test_concurrent_runs_of_one_compiled_graph_keep_their_own_params():
+    tickers = ["AAPL", "MSFT", "NVDA", "AMZN"]
+
+    async def main():
+        # Later tickers finish first, so runs overlap on the shared graph
+        return await asyncio.gather(*(graph_runner.run_graph(
+            _spec(ticker), {"echo": {"ticker": ticker, "sleep": 0.01 * (len(tickers) - i)}})
+            for i, ticker in enumerate(tickers)))
+
+    results = asyncio.run(main())
+    assert [result["current_ticker"] for result in results] == tickers
+    assert all("node_params" not in result for result in results)
+    assert graph_runner.graph_cache_stats()["misses"] == 1
+
+def test_run_graph_uses_the_spec_params_by_default():
+    assert asyncio.run(graph_runner.run_graph(_spec("TSLA")))["current_ticker"] == "TSLA"
@@ -0,0 +1,17 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("langgraph", "openai", "httpx")
+
+def test_importing_the_app_leaves_heavy_modules_for_first_use():
+    # A fresh interpreter, since this test session has already imported everything
+    code = ("import json, sys; import backend.main; "
+            "print(json.dumps(sorted(m for m in sys.modules "
+            f"if m.split('.')[0] in {HEAVY!r} or m == 'backend.nodes' or m.startswith('backend.nodes.'))))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
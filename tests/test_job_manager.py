@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api.routes import jobs
+from backend.core import job_manager as job_manager_module
+from backend.core.job_manager import JobManager, JobManagerNotRunningError, JobQueueFullError
+from backend.models.graph_spec import GraphSpec
+
+SPEC = GraphSpec.parse_obj({"nodes": [{"id": "a", "type": "LoadTickerData", "params": {"ticker": "AAPL"}}],
+                            "edges": []})
+
+@pytest.fixture
+def runs(monkeypatch):
+    """Replaces run_graph; each run's outcome is taken from the ticker param."""
+    calls = []
+
+    async def run_graph(graph_spec):
+        ticker = graph_spec.nodes[0].params["ticker"]
+        calls.append(ticker)
+        if ticker == "SLOW":
+            await asyncio.sleep(10)
+        if ticker == "BOOM":
+            raise ValueError("exploded")
+        return {"errors": ["a: no data"]} if ticker == "NONE" else {"price": 1}
+
+    monkeypatch.setattr(job_manager_module, "run_graph", run_graph)
+    return calls
+
+def _spec(ticker: str) -> GraphSpec:
+    return GraphSpec.parse_obj({"nodes": [{"id": "a", "type": "LoadTickerData", "params": {"ticker": ticker}}],
+                                "edges": []})
+
+def test_submit_before_start_raises():
+    with pytest.raises(JobManagerNotRunningError):
+        JobManager().submit(SPEC)
+
+def test_jobs_run_and_record_their_outcome(runs):
+    manager = JobManager(workers=2)
+
+    async def main():
+        await manager.start()
+        records = [manager.submit(_spec(ticker)) for ticker in ("AAPL", "NONE", "BOOM")]
+        assert all(record.status == "queued" for record in records)
+        finished = [await manager.wait(record.job_id, 5) for record in records]
+        await manager.stop()
+        return finished
+
+    ok, empty, failed = asyncio.run(main())
+    assert (ok.status, ok.result) == ("done", {"price": 1})
+    assert (empty.status, empty.result) == ("error", {"errors": ["a: no data"]})
+    assert (failed.status, failed.error) == ("error", "exploded")
+    assert ok.started_at >= ok.submitted_at and ok.finished_at >= ok.started_at
+    assert sorted(runs) == ["AAPL", "BOOM", "NONE"]
+
+def test_full_queue_rejects_submissions(runs):
+    manager = JobManager(workers=1, max_queue=1)
+
+    async def main():
+        await manager.start()
+        manager.submit(_spec("SLOW"))
+        with pytest.raises(JobQueueFullError):
+            manager.submit(_spec("AAPL"))
+        assert manager.queue_depth() == 1
+        await manager.stop()
+
+    asyncio.run(main())
+
+def test_stop_finishes_waiting_jobs_and_allows_a_restart(runs):
+    manager = JobManager(workers=1)
+
+    async def first_loop():
+        await manager.start()
+        running = manager.submit(_spec("SLOW"))
+        waiting = manager.submit(_spec("AAPL"))
+        await asyncio.sleep(0.01)
+        await manager.stop()
+        return running, waiting
+
+    running, waiting = asyncio.run(first_loop())
+    assert running.status == waiting.status == "error"
+    assert waiting.error == "Job cancelled (server shutting down)." and waiting.done.is_set()
+    with pytest.raises(JobManagerNotRunningError):
+        manager.submit(SPEC)
+    assert manager.queue_depth() == 0
+
+    async def second_loop():
+        await manager.start()
+        record = await manager.wait(manager.submit(_spec("AAPL")).job_id, 5)
+        await manager.stop()
+        return record
+
+    assert asyncio.run(second_loop()).status == "done"
+
+def test_wait_for_unknown_job():
+    assert asyncio.run(JobManager().wait("missing", 0.01)) is None
+
+def _client(monkeypatch, manager: JobManager) -> TestClient:
+    monkeypatch.setattr(jobs, "job_manager", manager)
+    monkeypatch.setattr(jobs, "get_compiled_graph", lambda graph_spec: None)
+    app = FastAPI()
+    app.include_router(jobs.router, prefix="/api")
+    app.add_event_handler("startup", manager.start)
+    app.add_event_handler("shutdown", manager.stop)
+    return TestClient(app)
+
+def test_routes_submit_and_poll(monkeypatch, runs):
+    with _client(monkeypatch, JobManager()) as client:
+        response = client.post("/api/jobs", json=SPEC.dict())
+        assert response.status_code == 202 and response.json()["status"] == "queued"
+        job = client.get(f"/api/jobs/{response.json()['job_id']}", params={"wait": 5}).json()
+        assert job["status"] == "done" and job["result"] == {"price": 1}
+        assert client.get("/api/jobs/missing").status_code == 404
+
+def test_routes_answer_503_when_not_running_or_full(monkeypatch, runs):
+    client = _client(monkeypatch, JobManager()) # Not entered, so the manager never starts
+    response = client.post("/api/jobs", json=SPEC.dict())
+    assert response.status_code == 503 and response.json()["detail"] == "Job manager is not running."
+
+    with _client(monkeypatch, JobManager(workers=1, max_queue=1)) as client:
+        client.post("/api/jobs", json=_spec("SLOW").dict())
+        client.post("/api/jobs", json=_spec("SLOW").dict())
+        response = client.post("/api/jobs", json=SPEC.dict())
+        assert response.status_code == 503 and response.headers["Retry-After"] == "5"
@@ -0,0 +1,64 @@
+import math
+
+from backend.core.metrics import CallbackMetric, Counter, Gauge, Histogram, Registry
+
+def test_counter_renders_one_sample_per_label_set():
+    requests = Counter("requests_total", "Requests.", ["route", "status"])
+    requests.inc(route="/a", status="200")
+    requests.inc(2, route="/a", status="200")
+    requests.inc(route='/b"\n', status="500")
+    assert requests.render() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a",status="200"} 3.0',
+        'requests_total{route="/b\\"\\n",status="500"} 1.0',
+    ]
+
+def test_gauge_goes_up_and_down():
+    in_flight = Gauge("in_flight", "In flight.")
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    assert in_flight.render()[-1] == "in_flight 1.0"
+    in_flight.set(7)
+    assert in_flight.render()[-1] == "in_flight 7.0"
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    latency = Histogram("latency_seconds", "Latency.", ["op"], buckets=(1.0, 0.1, 0.5))
+    for value in (0.05, 0.1, 0.3, 0.5, 2.0):
+        latency.observe(value, op="get")
+    lines = latency.render()
+    assert lines[2:] == [
+        'latency_seconds_bucket{op="get",le="0.1"} 2', # Upper bounds are inclusive
+        'latency_seconds_bucket{op="get",le="0.5"} 4',
+        'latency_seconds_bucket{op="get",le="1.0"} 4',
+        'latency_seconds_bucket{op="get",le="+Inf"} 5',
+        f'latency_seconds_sum{{op="get"}} {repr(0.05 + 0.1 + 0.3 + 0.5 + 2.0)}',
+        'latency_seconds_count{op="get"} 5',
+    ]
+
+def test_histogram_without_labels():
+    sizes = Histogram("size_bytes", "Size.", buckets=(10,))
+    sizes.observe(math.inf)
+    assert sizes.render()[2:] == ['size_bytes_bucket{le="10.0"} 0', 'size_bytes_bucket{le="+Inf"} 1',
+                                  "size_bytes_sum +Inf", "size_bytes_count 1"]
+
+def test_callback_metric_reads_at_render_time_and_survives_errors():
+    values = {("hits",): 1.0}
+    metric = CallbackMetric("cache", "Cache.", ["kind"], lambda: dict(values), kind="counter")
+    values[("hits",)] = 5.0
+    assert metric.render() == ["# HELP cache Cache.", "# TYPE cache counter", 'cache{kind="hits"} 5.0']
+
+    def broken():
+        raise RuntimeError("stats unavailable")
+
+    assert CallbackMetric("broken", "Broken.", [], broken).render() == ["# HELP broken Broken.", "# TYPE broken gauge"]
+
+def test_registry_keeps_the_first_metric_of_a_name():
+    registry = Registry()
+    first = registry.register(Counter("runs_total", "Runs."))
+    assert registry.register(Counter("runs_total", "Runs.")) is first
+    first.inc()
+    registry.register(Gauge("queue", "Queue."))
+    assert registry.render() == ("# HELP runs_total Runs.\n# TYPE runs_total counter\nruns_total 1.0\n"
+                                 "# HELP queue Queue.\n# TYPE queue gauge\n")
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from backend.engine.base_node import BaseNode
+from backend.engine.execution_engine import ExecutionEngine
+from backend.engine.models import GraphSpec
+from backend.engine.node_cache import (DiskNodeCache, MemoryNodeCache, build_node_cache, hash_value,
+                                       node_cache_key)
+from backend.engine.node_loader import register_node_class
+
+class _Point:
+    def __init__(self, x):
+        self.x = x
+
+def test_hash_value_ignores_dict_order():
+    assert hash_value({"a": 1, "b": [1, 2]}) == hash_value({"b": [1, 2], "a": 1})
+    assert hash_value({"a": 1}) != hash_value({"a": 2})
+    assert hash_value([1, 2]) != hash_value([2, 1])
+
+def test_hash_value_pickle_fallback_is_canonical():
+    # Tuple keys and custom objects aren't JSON, so these go through the pickle fallback
+    first = {(1, 2): {3, 1, 2}, "rows": [OrderedDict([(2, "b"), (1, "a")])], "point": frozenset({4, 5})}
+    second = {"point": frozenset({5, 4}), "rows": [{1: "a", 2: "b"}], (1, 2): {2, 3, 1}}
+    assert hash_value(first) == hash_value(second)
+    assert hash_value({(1, 2): 1}) != hash_value({(2, 1): 1})
+    assert len(hash_value(_Point(1))) == 64
+
+def test_hash_value_of_arrays_uses_their_contents():
+    assert hash_value({"a": np.arange(3)}) == hash_value({"a": np.arange(3)})
+    assert hash_value({"a": np.arange(3)}) != hash_value({"a": np.arange(3, dtype=np.float32)})
+    assert hash_value({"a": np.arange(3)}) != hash_value({"a": np.arange(1, 4)})
+
+def test_node_cache_key_covers_type_version_params_and_inputs():
+    key = node_cache_key("Load", "1", {"ticker": "AAPL"}, {"dep": "h1"})
+    assert key == node_cache_key("Load", "1", {"ticker": "AAPL"}, {"dep": "h1"})
+    assert key != node_cache_key("Other", "1", {"ticker": "AAPL"}, {"dep": "h1"})
+    assert key != node_cache_key("Load", "2", {"ticker": "AAPL"}, {"dep": "h1"})
+    assert key != node_cache_key("Load", "1", {"ticker": "MSFT"}, {"dep": "h1"})
+    assert key != node_cache_key("Load", "1", {"ticker": "AAPL"}, {"dep": "h2"})
+
+def test_memory_cache_returns_copies_and_evicts_least_recently_used():
+    cache = MemoryNodeCache(max_entries=2)
+    value = {"rows": [1, 2]}
+    cache.set("a", value)
+    cache.get("a")["rows"].append(3)
+    assert cache.get("a") == value
+    cache.set("b", 2)
+    cache.get("a") # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == value and cache.get("c") == 3
+    assert cache.get_stats()["evictions"] == 1
+
+def test_memory_cache_evicts_by_size_and_skips_huge_values():
+    cache = MemoryNodeCache(max_bytes=300)
+    cache.set("a", "x" * 100)
+    cache.set("b", "y" * 100)
+    cache.set("c", "z" * 100)
+    assert cache.get("a") is None and cache.get("c") == "z" * 100
+    cache.set("huge", "h" * 1000)
+    assert cache.get("huge") is None and cache.get("c") is not None
+    assert cache.get_stats()["bytes"] <= 300
+
+def test_disk_cache_prunes_least_recently_used(tmp_path):
+    cache = DiskNodeCache(str(tmp_path), max_bytes=500, prune_every=1)
+    cache.set("aa1", "x" * 200)
+    cache.set("bb2", "y" * 200)
+    past = time.time() - 100
+    os.utime(tmp_path / "aa" / "aa1.pkl", (past, past))
+    cache.set("cc3", "z" * 200)
+    assert cache.get("aa1") is None
+    assert cache.get("bb2") == "y" * 200 and cache.get("cc3") == "z" * 200
+    assert cache.get_stats()["evictions"] == 1
+
+def test_disk_cache_treats_unreadable_entries_as_misses(tmp_path):
+    cache = DiskNodeCache(str(tmp_path))
+    cache.set("ab1", {"a": 1})
+    (tmp_path / "ab" / "ab1.pkl").write_bytes(b"not a pickle")
+    assert cache.get("ab1") is None
+    assert cache.get_stats()["errors"] == 1
+    cache.clear()
+    assert list(tmp_path.glob("*/*.pkl")) == []
+
+def test_build_node_cache(tmp_path):
+    assert isinstance(build_node_cache("memory"), MemoryNodeCache)
+    assert isinstance(build_node_cache("disk", str(tmp_path)), DiskNodeCache)
+    assert build_node_cache("none") is None
+    with pytest.raises(ValueError):
+        build_node_cache("redis")
+
+_runs = []
+_threads = set()
+
+class CountingLoad(BaseNode):
+    def run(self, context, params):
+        _runs.append(("load", params["ticker"]))
+        return {"values": [1, 2, 3]}
+
+class CountingSum(BaseNode):
+    def run(self, context, params):
+        _runs.append(("sum", None))
+        return sum(sum(v["values"]) for v in context.values())
+
+class _TrackingCache(MemoryNodeCache):
+    def get(self, key):
+        _threads.add(threading.current_thread().name)
+        return super().get(key)
+
+for _node_class in (CountingLoad, CountingSum):
+    register_node_class(_node_class)
+
+def _graph(ticker):
+    return GraphSpec.parse_obj({"nodes": [{"id": "load", "type": "CountingLoad", "params": {"ticker": ticker}},
+                                          {"id": "sum", "type": "CountingSum"}],
+                                "edges": [{"from": "load", "to": "sum"}]})
+
+def test_engine_serves_unchanged_nodes_from_the_cache():
+    _runs.clear()
+    _threads.clear()
+    engine = ExecutionEngine(node_cache=_TrackingCache())
+    first = engine.run(_graph("AAPL"))
+    second = engine.run(_graph("AAPL"))
+    assert _runs == [("load", "AAPL"), ("sum", None)]
+    assert second["sum"].result == first["sum"].result == 6
+    assert all(result.cached for result in second.values())
+    assert second["load"].result_hash == first["load"].result_hash
+    # Lookups run on the engine's worker threads, not the scheduling thread
+    assert _threads and all(name.startswith("graph-node") for name in _threads)
+
+    third = engine.run(_graph("MSFT"))
+    assert _runs[2:] == [("load", "MSFT")] # Same result hash for load, so sum is still a hit
+    assert not third["load"].cached and third["sum"].cached
@@ -0,0 +1,125 @@
+import os
+import sys
+
+import pytest
+
+from backend.engine import node_loader
+from backend.engine.node_loader import (NodeLoaderError, available_node_types, get_node_class,
+                                        register_node_class, reload_node_classes)
+
+PACKAGE = "loader_test_nodes"
+
+BASE = "from backend.engine.base_node import BaseNode\n"
+
+@pytest.fixture
+def nodes_dir(tmp_path, monkeypatch):
+    """An empty node package the loader is pointed at, with fresh loader state."""
+    package = tmp_path / PACKAGE
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(sys, "dont_write_bytecode", True) # Edits within a second must not hit a stale .pyc
+    monkeypatch.setattr(node_loader, "NODES_DIR", package)
+    monkeypatch.setattr(node_loader, "NODES_PACKAGE", PACKAGE)
+    monkeypatch.setattr(node_loader, "_modules", None)
+    for name in ("_index", "_duplicates", "_loaded", "_registered"):
+        monkeypatch.setattr(node_loader, name, {})
+    yield package
+    for name in [m for m in sys.modules if m == PACKAGE or m.startswith(PACKAGE + ".")]:
+        del sys.modules[name]
+
+def _write(package, module, source):
+    path = package / f"{module}.py"
+    path.write_text(source)
+    # Move the mtime on, so the edit is seen even on filesystems with coarse timestamps
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def _node(name, base="BaseNode", result=None):
+    return f"class {name}({base}):\n    def run(self, context, params):\n        return {result!r}\n"
+
+def test_types_are_indexed_without_importing(nodes_dir):
+    _write(nodes_dir, "a", BASE + _node("Alpha"))
+    _write(nodes_dir, "b", BASE + _node("Beta") + "raise RuntimeError('imported')\n")
+    assert available_node_types() == ["Alpha", "Beta"]
+    assert f"{PACKAGE}.a" not in sys.modules and f"{PACKAGE}.b" not in sys.modules
+    assert get_node_class("Alpha").__name__ == "Alpha"
+    assert f"{PACKAGE}.a" in sys.modules and f"{PACKAGE}.b" not in sys.modules
+    with pytest.raises(NodeLoaderError, match="Could not import"):
+        get_node_class("Beta")
+
+def test_subclasses_are_followed_across_modules(nodes_dir):
+    _write(nodes_dir, "a", BASE + "from abc import abstractmethod\n"
+           + "class Mid(BaseNode):\n    @abstractmethod\n    def run(self, context, params): ...\n")
+    _write(nodes_dir, "b", f"from {PACKAGE}.a import Mid\n" + _node("Leaf", "Mid"))
+    assert available_node_types() == ["Leaf"] # Mid is abstract
+    assert issubclass(get_node_class("Leaf"), sys.modules[f"{PACKAGE}.a"].Mid)
+
+def test_reload_drops_only_changed_modules(nodes_dir):
+    _write(nodes_dir, "a", BASE + _node("Alpha", result=1))
+    _write(nodes_dir, "b", BASE + _node("Beta", result=1))
+    alpha, beta = get_node_class("Alpha"), get_node_class("Beta")
+    assert reload_node_classes() == []
+
+    _write(nodes_dir, "a", BASE + _node("Alpha", result=2))
+    assert reload_node_classes() == ["a"]
+    assert get_node_class("Beta") is beta
+    reloaded = get_node_class("Alpha")
+    assert reloaded is not alpha and reloaded().run({}, {}) == 2
+
+def test_reload_also_drops_modules_subclassing_changed_ones(nodes_dir):
+    _write(nodes_dir, "a", BASE + _node("Mid", result="old"))
+    _write(nodes_dir, "b", f"from {PACKAGE}.a import Mid\nclass Leaf(Mid):\n    pass\n")
+    _write(nodes_dir, "c", f"from {PACKAGE}.b import Leaf\nclass Twig(Leaf):\n    pass\n")
+    _write(nodes_dir, "d", BASE + _node("Other"))
+    twig, other = get_node_class("Twig"), get_node_class("Other")
+
+    _write(nodes_dir, "a", BASE + _node("Mid", result="new"))
+    assert reload_node_classes() == ["a"]
+    mid, leaf = get_node_class("Mid"), get_node_class("Leaf")
+    assert issubclass(leaf, mid) and leaf().run({}, {}) == "new"
+    assert get_node_class("Twig") is not twig and issubclass(get_node_class("Twig"), mid)
+    assert get_node_class("Other") is other
+
+def test_unchanged_content_is_not_reloaded(nodes_dir):
+    _write(nodes_dir, "a", BASE + _node("Alpha"))
+    alpha = get_node_class("Alpha")
+    _write(nodes_dir, "a", BASE + _node("Alpha")) # Touched, same source
+    assert reload_node_classes() == []
+    assert get_node_class("Alpha") is alpha
+
+def test_type_moved_between_modules(nodes_dir):
+    _write(nodes_dir, "a", BASE + _node("Alpha", result="a"))
+    get_node_class("Alpha")
+    _write(nodes_dir, "a", "")
+    _write(nodes_dir, "b", BASE + _node("Alpha", result="b"))
+    assert reload_node_classes() == ["a", "b"]
+    assert get_node_class("Alpha")().run({}, {}) == "b"
+
+def test_duplicate_types_are_rejected(nodes_dir):
+    _write(nodes_dir, "a", BASE + _node("Alpha"))
+    _write(nodes_dir, "b", BASE + _node("Alpha"))
+    with pytest.raises(NodeLoaderError, match="Duplicate node type found: Alpha"):
+        get_node_class("Alpha")
+
+def test_registered_classes_cannot_shadow_indexed_types(nodes_dir):
+    from backend.engine.base_node import BaseNode
+    _write(nodes_dir, "a", BASE + _node("Alpha"))
+
+    class Alpha(BaseNode):
+        def run(self, context, params):
+            return None
+
+    class Extra(BaseNode):
+        def run(self, context, params):
+            return None
+
+    with pytest.raises(NodeLoaderError, match="Duplicate node type"):
+        register_node_class(Alpha)
+    register_node_class(Extra)
+    register_node_class(Extra) # Registering the same class again is fine
+    assert get_node_class("Extra") is Extra and "Extra" in available_node_types()
+
+def test_unknown_type(nodes_dir):
+    with pytest.raises(NodeLoaderError, match="not found"):
+        get_node_class("Missing")
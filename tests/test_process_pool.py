@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from backend.engine.base_node import BaseNode, NodeRunError
+from backend.engine.execution_engine import ExecutionEngine
+from backend.engine.models import GraphSpec
+from backend.engine.node_cache import hash_value
+from backend.engine.node_loader import register_node_class
+from backend.engine.process_pool import NodeTimeoutError, ProcessNodePool
+
+class PoolSquare(BaseNode):
+    cpu_bound = True
+
+    def run(self, context, params):
+        time.sleep(params.get("sleep", 0))
+        return {"square": params["x"] ** 2, "pid": os.getpid()}
+
+class PoolFails(BaseNode):
+    cpu_bound = True
+
+    def run(self, context, params):
+        time.sleep(params.get("sleep", 0))
+        raise ValueError("bad input")
+
+class PoolStubborn(BaseNode):
+    """Swallows the soft timeout, like a node stuck in C code would."""
+    cpu_bound = True
+
+    def run(self, context, params):
+        deadline = time.time() + params["seconds"]
+        while time.time() < deadline:
+            try:
+                time.sleep(0.01)
+            except NodeTimeoutError:
+                pass
+        return "finished"
+
+class PoolCrash(BaseNode):
+    cpu_bound = True
+
+    def run(self, context, params):
+        os._exit(1)
+
+@pytest.fixture
+def pool():
+    pool = ProcessNodePool(max_workers=1, kill_grace=0.3)
+    yield pool
+    pool.shutdown()
+
+def test_runs_the_node_in_a_worker_and_hashes_the_result(pool):
+    result, started_at, finished_at, result_hash = pool.run(PoolSquare, {}, {"x": 3}, hash_result=True)
+    assert result["square"] == 9 and result["pid"] != os.getpid()
+    assert finished_at >= started_at
+    assert result_hash == hash_value(result)
+
+def test_node_errors_come_back_with_their_timings(pool):
+    with pytest.raises(NodeRunError) as info:
+        pool.run(PoolFails, {}, {"sleep": 0.05})
+    assert isinstance(info.value.error, ValueError) and str(info.value) == "bad input"
+    assert info.value.finished_at - info.value.started_at >= 0.05
+
+def test_soft_timeout_interrupts_the_node_and_keeps_the_worker(pool):
+    pid = pool.run(PoolSquare, {}, {"x": 1})[0]["pid"]
+    with pytest.raises(NodeRunError) as info:
+        pool.run(PoolSquare, {}, {"x": 1, "sleep": 5}, timeout=0.1)
+    assert isinstance(info.value.error, NodeTimeoutError)
+    assert pool.run(PoolSquare, {}, {"x": 2})[0]["pid"] == pid
+    assert pool.get_stats()["timeouts"] == 1 and pool.get_stats()["recycles"] == 0
+
+def test_node_ignoring_its_timeout_is_killed_after_the_grace_period(pool):
+    start = time.time()
+    with pytest.raises(NodeTimeoutError):
+        pool.run(PoolStubborn, {}, {"seconds": 10}, timeout=0.1)
+    assert time.time() - start < 5
+    stats = pool.get_stats()
+    assert stats["timeouts"] == 1 and stats["recycles"] == 1
+    # A fresh set of workers takes over
+    assert pool.run(PoolSquare, {}, {"x": 4})[0]["square"] == 16
+    assert pool.get_stats()["generation"] == stats["generation"] + 1
+
+def test_crashed_worker_recycles_the_pool(pool):
+    with pytest.raises(BrokenProcessPool):
+        pool.run(PoolCrash, {}, {})
+    assert pool.get_stats()["recycles"] == 1
+    assert pool.run(PoolSquare, {}, {"x": 5})[0]["square"] == 25
+
+def test_task_killed_by_another_nodes_recycle_is_resubmitted():
+    pool = ProcessNodePool(max_workers=2, kill_grace=0.2)
+    try:
+        outcome = {}
+
+        def bystander():
+            outcome["result"] = pool.run(PoolSquare, {}, {"x": 6, "sleep": 1.0})[0]
+
+        thread = threading.Thread(target=bystander)
+        thread.start()
+        time.sleep(0.1) # Let the bystander reach its worker first
+        with pytest.raises(NodeTimeoutError):
+            pool.run(PoolStubborn, {}, {"seconds": 10}, timeout=0.1)
+        thread.join(10)
+        assert outcome["result"]["square"] == 36
+        stats = pool.get_stats()
+        assert stats["resubmits"] == 1 and stats["recycles"] == 1 and stats["tasks"] == 2
+    finally:
+        pool.shutdown()
+
+def test_engine_reports_failed_process_nodes_with_their_timing(pool):
+    register_node_class(PoolFails)
+    spec = GraphSpec.parse_obj({"nodes": [{"id": "fail", "type": "PoolFails", "params": {"sleep": 0.05}}],
+                                "edges": []})
+    failed = ExecutionEngine(process_pool=pool).run(spec)["fail"]
+    assert failed.status == "error" and failed.error == "Execution failed: bad input"
+    assert failed.duration_ms >= 50
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.utils.rate_limiter import AdaptiveRateLimiter, RetryDecision, call_with_retry, parse_retry_after
+
+def _limiter(**kwargs) -> AdaptiveRateLimiter:
+    kwargs.setdefault("rate_per_sec", 1e6) # Rate never the bottleneck unless a test says so
+    return AdaptiveRateLimiter("test", **kwargs)
+
+class _Throttled(Exception):
+    pass
+
+def _classify(e: Exception) -> RetryDecision:
+    return RetryDecision(retryable=isinstance(e, _Throttled), throttled=isinstance(e, _Throttled))
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(None) is None and parse_retry_after("soon") is None
+    assert parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT") == 0.0
+
+def test_throttling_halves_the_limit_once_per_cooldown():
+    limiter = _limiter(max_concurrency=16, decrease_cooldown=60)
+    limiter.release(throttled=True)
+    limiter.release(throttled=True) # Same burst: within the cooldown
+    assert limiter.get_stats()["concurrency_limit"] == 8
+    assert limiter.stats["throttled"] == 2
+
+def test_limit_grows_back_additively_and_never_below_the_minimum():
+    limiter = _limiter(max_concurrency=8, min_concurrency=2, decrease_cooldown=0)
+    for _ in range(5):
+        limiter.release(throttled=True)
+    assert limiter.limit == 2
+    for _ in range(2):
+        limiter.release()
+    assert limiter.limit == pytest.approx(2.9) # + 1/limit per success: 2 -> 2.5 -> 2.9
+    for _ in range(100):
+        limiter.release()
+    assert limiter.limit == 8
+
+def test_failures_do_not_change_the_limit():
+    limiter = _limiter(max_concurrency=4)
+    limiter.release(failed=True)
+    assert limiter.limit == 4 and limiter.stats["failed"] == 1
+
+def test_concurrency_is_capped_at_the_limit():
+    limiter = _limiter(max_concurrency=3)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        await limiter.acquire()
+        peak = max(peak, limiter.get_stats()["in_flight"])
+        await asyncio.sleep(0.01)
+        limiter.release()
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(20)))
+
+    asyncio.run(main())
+    assert peak == 3
+    assert limiter.get_stats()["in_flight"] == 0 and limiter.stats["acquired"] == 20
+
+def test_token_bucket_paces_requests():
+    limiter = _limiter(rate_per_sec=100, burst=1)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(6):
+            await limiter.acquire()
+            limiter.release()
+        return loop.time() - start
+
+    assert asyncio.run(main()) >= 0.045 # 5 requests past the burst at 100/s
+
+def test_cancelled_waiter_passes_its_slot_on():
+    limiter = _limiter(max_concurrency=1)
+
+    async def main():
+        await limiter.acquire()
+        cancelled = asyncio.create_task(limiter.acquire())
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release() # Wakes `cancelled`, which is cancelled before it can run
+        cancelled.cancel()
+        await asyncio.wait_for(waiting, 1)
+        assert cancelled.cancelled()
+
+    asyncio.run(main())
+    assert limiter.get_stats()["in_flight"] == 1
+
+def test_shared_across_event_loops_and_threads():
+    limiter = _limiter(max_concurrency=2)
+    errors = []
+
+    async def calls():
+        async def one():
+            await limiter.acquire()
+            await asyncio.sleep(0.001)
+            limiter.release()
+        await asyncio.gather(*(one() for _ in range(25)))
+
+    def worker():
+        try:
+            asyncio.run(asyncio.wait_for(calls(), 10))
+        except Exception as e: # Collected so a hang or error fails the test, not the thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert limiter.stats["acquired"] == 100 and limiter.get_stats()["in_flight"] == 0
+
+def test_call_with_retry_retries_throttled_calls():
+    limiter = _limiter(max_concurrency=4, decrease_cooldown=0)
+    attempts = []
+
+    async def func():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _Throttled()
+        return "ok"
+
+    assert asyncio.run(call_with_retry(limiter, func, _classify, base_delay=0.001)) == "ok"
+    assert len(attempts) == 3 and limiter.stats["retries"] == 2
+    assert limiter.get_stats()["in_flight"] == 0
+
+def test_call_with_retry_gives_up_on_non_retryable_errors():
+    limiter = _limiter()
+
+    async def func():
+        raise KeyError("bad request")
+
+    with pytest.raises(KeyError):
+        asyncio.run(call_with_retry(limiter, func, _classify))
+    assert limiter.stats["retries"] == 0 and limiter.get_stats()["in_flight"] == 0
+
+def test_hold_slot_keeps_the_slot_until_released():
+    limiter = _limiter()
+
+    async def func():
+        return "stream"
+
+    asyncio.run(call_with_retry(limiter, func, _classify, hold_slot=True))
+    assert limiter.get_stats()["in_flight"] == 1
+    limiter.release()
+    assert limiter.get_stats()["in_flight"] == 0
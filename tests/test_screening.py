@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from backend.utils.screening import (BALANCE_FIELDS, INCOME_FIELDS, align_periods, percentile_ranks, screen,
+                                     screening_metrics, stack_arrays, stack_statements)
+from backend.utils.statement_store import to_array
+
+def _income(date, revenue, net_income=10.0):
+    return {"date": date, "revenue": revenue, "grossProfit": revenue / 2, "operatingIncome": revenue / 4,
+            "netIncome": net_income, "eps": 1.0}
+
+def _balance(date, equity, debt=50.0):
+    return {"date": date, "totalAssets": 200.0, "totalStockholdersEquity": equity, "totalDebt": debt,
+            "totalLiabilities": 200.0 - equity, "totalCurrentAssets": 60.0, "totalCurrentLiabilities": 30.0}
+
+INCOME = [[_income("2024-09-28", 121.0), _income("2023-09-30", 110.0), _income("2022-09-24", 100.0)],
+          [_income("2024-12-31", 50.0), _income("2023-12-31", 40.0)],
+          None]
+BALANCE = [[_balance("2024-09-28", 100.0), _balance("2023-09-30", 80.0)],
+           # Newest balance sheet not published yet: slot 0 is last year's
+           [_balance("2023-12-31", 20.0)],
+           None]
+
+def _metrics(stack, income=INCOME, balance=BALANCE, periods=3):
+    income_values, income_dates = stack(income, INCOME_FIELDS, periods)
+    balance_values, balance_dates = stack(balance, BALANCE_FIELDS, periods)
+    return screening_metrics(income_values, income_dates, balance_values, balance_dates)
+
+def test_stack_statements_sorts_newest_first_and_pads():
+    shuffled = [list(reversed(INCOME[0])), [{"revenue": 1.0}, _income("2024-12-31", 50.0)], []]
+    values, dates = stack_statements(shuffled, INCOME_FIELDS, 3)
+    assert values.shape == (3, 3, len(INCOME_FIELDS))
+    assert dates[0].tolist() == ["2024-09-28", "2023-09-30", "2022-09-24"]
+    assert dates[1].tolist() == ["2024-12-31", "", ""] # The row without a date is skipped
+    assert values[0, :, 0].tolist() == [121.0, 110.0, 100.0]
+    assert np.isnan(values[1, 1:]).all() and np.isnan(values[2]).all()
+
+def test_stack_arrays_matches_stack_statements():
+    arrays = [to_array(records) if records else None for records in INCOME]
+    values, dates = stack_arrays(arrays, INCOME_FIELDS, 3)
+    expected_values, expected_dates = stack_statements(INCOME, INCOME_FIELDS, 3)
+    np.testing.assert_array_equal(values, expected_values)
+    assert (dates == expected_dates).all()
+
+def test_align_periods_pairs_rows_by_date():
+    values = np.array([[[1.0], [2.0]], [[3.0], [np.nan]]])
+    dates = np.array([["2024-01-01", "2023-01-01"], ["2023-01-01", ""]])
+    target = np.array([["2024-01-01", "2023-01-01"], ["2024-01-01", "2023-01-01"]])
+    aligned = align_periods(values, dates, target)
+    assert aligned[0, :, 0].tolist() == [1.0, 2.0]
+    assert np.isnan(aligned[1, 0, 0]) and aligned[1, 1, 0] == 3.0
+
+@pytest.mark.parametrize("stack", [stack_statements, stack_arrays])
+def test_balance_sheet_ratios_use_the_matching_period(stack):
+    if stack is stack_arrays:
+        income = [to_array(r) if r else None for r in INCOME]
+        balance = [to_array(r) if r else None for r in BALANCE]
+    else:
+        income, balance = INCOME, BALANCE
+    metrics = _metrics(stack, income, balance)
+    assert metrics["return_on_equity"][0] == pytest.approx(0.1)
+    assert metrics["debt_to_equity"][0] == pytest.approx(0.5)
+    assert metrics["current_ratio"][0] == pytest.approx(2.0)
+    # The 2023 balance sheet isn't paired with the 2024 income statement
+    assert np.isnan(metrics["return_on_equity"][1]) and np.isnan(metrics["debt_to_equity"][1])
+    assert metrics["net_margin"][1] == pytest.approx(0.2)
+    assert all(np.isnan(values[2]) for values in metrics.values())
+
+def test_growth_is_measured_between_period_dates():
+    metrics = _metrics(stack_statements)
+    assert metrics["revenue_growth_yoy"][0] == pytest.approx(0.1)
+    assert metrics["revenue_growth_yoy"][1] == pytest.approx(0.25)
+    years = (np.datetime64("2024-09-28") - np.datetime64("2022-09-24")).astype(float) / 365.25
+    assert metrics["revenue_cagr"][0] == pytest.approx(1.21 ** (1 / years) - 1)
+
+def test_missing_period_does_not_shift_growth():
+    # Annual history with the 2023 period missing: no year-ago period, and CAGR spans two years
+    income = [[_income("2024-09-28", 121.0), _income("2022-09-24", 100.0)]]
+    metrics = _metrics(stack_statements, income, [None])
+    assert np.isnan(metrics["revenue_growth_yoy"][0])
+    years = (np.datetime64("2024-09-28") - np.datetime64("2022-09-24")).astype(float) / 365.25
+    assert metrics["revenue_cagr"][0] == pytest.approx(1.21 ** (1 / years) - 1)
+    assert metrics["revenue_cagr"][0] == pytest.approx(0.1, abs=1e-3)
+
+def test_quarterly_growth_compares_against_the_same_quarter_a_year_back():
+    dates = ["2024-12-31", "2024-09-30", "2024-06-30", "2024-03-31", "2023-12-31"]
+    income = [[_income(d, r) for d, r in zip(dates, [130.0, 120.0, 110.0, 105.0, 100.0])]]
+    metrics = _metrics(stack_statements, income, [None], periods=5)
+    assert metrics["revenue_growth_yoy"][0] == pytest.approx(0.3)
+    assert metrics["revenue_cagr"][0] == pytest.approx(0.3, rel=1e-2)
+
+def test_non_positive_bases_give_no_growth():
+    income = [[_income("2024-06-30", 50.0), _income("2023-06-30", -10.0)],
+              [_income("2024-06-30", 50.0)],
+              [_income("2024-06-30", 0.0), _income("2023-06-30", 10.0)]]
+    metrics = _metrics(stack_statements, income, [None] * 3, periods=2)
+    assert np.isnan(metrics["revenue_growth_yoy"][:2]).all() and np.isnan(metrics["revenue_cagr"]).all()
+    assert metrics["revenue_growth_yoy"][2] == pytest.approx(-1.0)
+    assert np.isnan(metrics["gross_margin"][2])
+
+def test_percentile_ranks():
+    ranks = percentile_ranks(np.array([3.0, np.nan, 1.0, 2.0]))
+    assert ranks[[0, 2, 3]].tolist() == [100.0, 0.0, 50.0] and np.isnan(ranks[1])
+    assert percentile_ranks(np.array([3.0, 1.0]), higher_is_better=False).tolist() == [0.0, 100.0]
+    assert percentile_ranks(np.array([5.0])).tolist() == [0.0]
+
+def test_screen_filters_and_ranks():
+    metrics = {"net_margin": np.array([0.1, 0.3, np.nan, 0.2]), "debt_to_equity": np.array([0.5, 2.0, 0.1, 0.4])}
+    selected, passed, percentiles = screen(metrics, {"debt_to_equity": {"max": 1.0}}, "net_margin", 5)
+    assert selected.tolist() == [3, 0] and passed == 2
+    assert percentiles["debt_to_equity"][2] == 100.0 # Lower is better
+    selected, passed, _ = screen(metrics, {"net_margin": {"min_percentile": 50}}, "net_margin", 1)
+    assert selected.tolist() == [1] and passed == 2
+    with pytest.raises(ValueError):
+        screen(metrics, {"pe_ratio": {"max": 20}}, "net_margin", 5)
@@ -0,0 +1,124 @@
+import gc
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from backend.engine.base_node import BaseNode
+from backend.engine.execution_engine import ExecutionEngine
+from backend.engine.models import GraphSpec
+from backend.engine.node_loader import register_node_class
+from backend.engine.process_pool import ProcessNodePool
+from backend.engine.shared_results import SharedResults, handle_names, share_arrays, unlink_block
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs POSIX shared memory in /dev/shm")
+
+MIN_BYTES = 1024
+
+def _exists(name: str) -> bool:
+    return os.path.exists(os.path.join("/dev/shm", name))
+
+def _worker_result(shared: SharedResults, value, created=None):
+    """What a worker sends back: the value with its large arrays in blocks named after a task prefix."""
+    return share_arrays(value, MIN_BYTES, created if created is not None else [], shared.task_prefix())
+
+def test_adopted_blocks_are_unlinked_once_consumers_finish():
+    shared = SharedResults(MIN_BYTES)
+    result = _worker_result(shared, {"arr": np.arange(1000.0), "small": np.ones(3)})
+    names = handle_names(result)
+    assert len(names) == 1 and _exists(names[0])
+
+    view = shared.adopt("load", result, consumers=2)
+    assert np.array_equal(view["arr"], np.arange(1000.0)) and view["small"].shape == (3,)
+    shared.consumer_done(["load"])
+    assert _exists(names[0])
+    shared.consumer_done(["load"])
+    assert not _exists(names[0])
+    # The name is gone but the mapping lives on while a view holds it
+    gc.collect()
+    assert view["arr"][-1] == 999.0
+
+def test_result_without_consumers_is_unlinked_right_away():
+    shared = SharedResults(MIN_BYTES)
+    result = _worker_result(shared, np.zeros(1000))
+    view = shared.adopt("sink", result, consumers=0)
+    assert not any(_exists(name) for name in handle_names(result))
+    assert view.sum() == 0
+
+def test_close_unlinks_everything_left():
+    shared = SharedResults(MIN_BYTES)
+    results = [_worker_result(shared, np.zeros(1000)) for _ in range(3)]
+    for i, result in enumerate(results):
+        shared.adopt(f"node{i}", result, consumers=1)
+    shared.close()
+    assert not any(_exists(name) for result in results for name in handle_names(result))
+
+def test_task_blocks_are_released_by_name():
+    shared = SharedResults(MIN_BYTES)
+    created = []
+    sent = shared.for_process("load", {"arr": np.ones(1000)}, created)
+    assert created == handle_names(sent) and all(_exists(name) for name in created)
+    shared.release_task(created)
+    assert not any(_exists(name) for name in created)
+    assert not unlink_block(created[0]) # Already gone
+
+def test_sweep_unlinks_blocks_of_a_result_that_was_never_adopted():
+    shared = SharedResults(MIN_BYTES)
+    created = []
+    prefix = shared.task_prefix()
+    share_arrays([np.zeros(1000), np.ones(1000)], MIN_BYTES, created, prefix)
+    assert created == [f"{prefix}_0", f"{prefix}_1"]
+    shared.sweep(prefix)
+    assert not any(_exists(name) for name in created)
+    assert shared.stats["swept"] == 2
+
+def test_retried_task_replaces_stale_blocks():
+    prefix = SharedResults(MIN_BYTES).task_prefix()
+    first, second = [], []
+    share_arrays(np.zeros(1000), MIN_BYTES, first, prefix)
+    result = share_arrays(np.ones(1000), MIN_BYTES, second, prefix)
+    assert first == second
+    shared = SharedResults(MIN_BYTES)
+    assert shared.adopt("node", result, consumers=0).sum() == 1000
+
+class BigResult(BaseNode):
+    cpu_bound = True
+
+    def run(self, context, params):
+        return {"arr": np.arange(100_000, dtype=np.float64)}
+
+class SumBig(BaseNode):
+    cpu_bound = True
+
+    def run(self, context, params):
+        return float(next(iter(context.values()))["arr"].sum())
+
+class UnsendableResult(BaseNode):
+    cpu_bound = True
+
+    def run(self, context, params):
+        # The array is shared, then the lock can't be pickled on the way back
+        return {"arr": np.arange(100_000, dtype=np.float64), "lock": threading.Lock()}
+
+def _blocks():
+    return {name for name in os.listdir("/dev/shm") if name.startswith(("ag", "psm_"))}
+
+def test_engine_leaves_no_blocks_behind():
+    for node_class in (BigResult, SumBig, UnsendableResult):
+        register_node_class(node_class)
+    spec = GraphSpec.parse_obj({
+        "nodes": [{"id": "big", "type": "BigResult"}, {"id": "sum", "type": "SumBig"},
+                  {"id": "bad", "type": "UnsendableResult"}],
+        "edges": [{"from": "big", "to": "sum"}],
+    })
+    before = _blocks()
+    pool = ProcessNodePool(max_workers=1)
+    try:
+        results = ExecutionEngine(process_pool=pool, shared_memory_min_bytes=MIN_BYTES).run(spec)
+    finally:
+        pool.shutdown()
+    assert results["sum"].result == float(np.arange(100_000).sum())
+    assert results["bad"].status == "error"
+    assert np.array_equal(results["big"].result["arr"], np.arange(100_000))
+    assert _blocks() - before == set()
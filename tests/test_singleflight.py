@@ -0,0 +1,111 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.utils.singleflight import SingleFlight
+
+def test_concurrent_calls_share_one_task():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"price": 1}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("AAPL", fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1 and all(r == {"price": 1} for r in results)
+    assert flight.stats == {"calls": 1, "coalesced": 4}
+
+def test_each_caller_gets_its_own_result():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return {"prices": [1, 2]}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("AAPL", fetch) for _ in range(3)))
+
+    results = asyncio.run(main())
+    results[0]["prices"].append(3)
+    results[1]["prices"].clear()
+    assert results[2] == {"prices": [1, 2]}
+    assert len({id(r) for r in results}) == 3
+
+def test_key_is_released_when_the_call_finishes():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await flight.do("AAPL", fetch)
+        assert not flight.in_flight("AAPL")
+        return first, await flight.do("AAPL", fetch)
+
+    assert asyncio.run(main()) == (1, 2)
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def main():
+        return await asyncio.gather(flight.do("A", lambda: asyncio.sleep(0, "a")),
+                                    flight.do("B", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert flight.stats["coalesced"] == 0
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream error")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("AAPL", fetch) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(flight.do("AAPL", fetch))
+        second = asyncio.create_task(flight.do("AAPL", fetch))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+def test_calls_on_different_event_loops_are_not_shared():
+    flight = SingleFlight()
+    both_running = threading.Barrier(2)
+
+    async def fetch():
+        await asyncio.to_thread(both_running.wait, 5) # Both loops have the key in flight here
+        return asyncio.get_running_loop()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(asyncio.run(flight.do("AAPL", fetch))))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 2 and results[0] is not results[1]
+    assert flight.stats == {"calls": 2, "coalesced": 0}
@@ -0,0 +1,137 @@
+import asyncio
+import mmap
+from datetime import date
+
+import numpy as np
+import pytest
+
+from backend.utils import statement_store
+from backend.utils.statement_store import StatementStore, merge_arrays, numeric_column, periods_due, to_array, to_records
+
+PERIODS = [
+    {"date": "2024-09-28", "symbol": "AAPL", "revenue": 391035000000, "eps": 6.11, "restated": True,
+     "link": None, "segments": [{"name": "iPhone", "share": 0.51}], "note": "x", "guidance": 1.5},
+    {"date": "2023-09-30", "symbol": "AAPL", "revenue": 383285000000, "eps": None, "restated": False,
+     "link": None, "segments": None, "note": "", "guidance": "withdrawn"},
+    {"date": "2022-09-24", "symbol": "AAPL", "revenue": 394328000000, "eps": 6, "link": None,
+     "note": None},
+]
+
+def test_round_trip_keeps_every_field():
+    array = to_array(PERIODS)
+    assert to_records(array) == PERIODS
+    assert to_records(array, limit=2) == PERIODS[:2]
+
+def test_round_trip_keeps_none_and_absent_apart():
+    records = to_records(to_array(PERIODS))
+    assert "restated" not in records[2] and "segments" not in records[2] and "guidance" not in records[2]
+    assert records[1]["note"] == "" and records[2]["note"] is None
+    assert records[0]["link"] is None and records[1]["eps"] is None
+
+def test_numeric_columns_stay_numeric():
+    array = to_array(PERIODS)
+    assert array.dtype["revenue"] == np.int64
+    assert array.dtype["eps"] == np.float64 and np.isnan(array["eps"][1])
+    assert not array.dtype.hasobject
+
+def test_integer_fields_with_gaps_stay_integers():
+    records = [{"date": "2024-12-31", "shares": 6}, {"date": "2023-12-31", "shares": None}, {"date": "2022-12-31"}]
+    array = to_array(records)
+    assert array.dtype["shares"] == np.int64
+    restored = to_records(array)
+    assert restored == records and type(restored[0]["shares"]) is int
+    assert np.array_equal(numeric_column(array, "shares"), [6, np.nan, np.nan], equal_nan=True)
+
+def test_periods_sorted_and_deduplicated():
+    records = [{"date": "2022-12-31", "revenue": 1}, {"date": "2023-12-31", "revenue": 2},
+               {"date": "2023-12-31", "revenue": 3}, {"revenue": 4}]
+    assert [r["date"] for r in to_records(to_array(records))] == ["2023-12-31", "2022-12-31"]
+
+def test_round_trip_through_the_store(tmp_path):
+    store = StatementStore(str(tmp_path))
+    store.write("AAPL", "income-statement", "annual", to_array(PERIODS))
+    stored = store.read("AAPL", "income-statement", "annual")
+    assert isinstance(stored.base, mmap.mmap)
+    assert to_records(stored) == PERIODS
+
+def test_merge_replaces_periods_with_the_same_date():
+    fetched = [{"date": "2025-09-27", "symbol": "AAPL", "revenue": 1}, {**PERIODS[0], "eps": 6.2}]
+    merged = to_records(merge_arrays(to_array(PERIODS), fetched))
+    assert merged == [fetched[0], fetched[1], *PERIODS[1:]]
+
+def test_periods_due():
+    assert periods_due("2024-09-28", "annual", today=date(2025, 9, 27)) == 0
+    assert periods_due("2024-09-28", "annual", today=date(2025, 9, 28)) == 1
+    assert periods_due("2024-12-31", "quarter", today=date(2025, 3, 30)) == 0
+    assert periods_due("2024-12-31", "quarter", today=date(2025, 7, 1)) == 2
+    assert periods_due("2030-01-01", "annual", today=date(2025, 1, 1)) == 0
+
+def _annual(year: int, revenue: int):
+    return {"date": f"{year}-12-31", "symbol": "AAPL", "revenue": revenue}
+
+class _FakeFMP:
+    """Stands in for the FMP fetch: serves the newest `limit` periods of a history and counts calls."""
+
+    def __init__(self, history):
+        self.history = history
+        self.limits = []
+
+    async def __call__(self, statement, ticker, period, limit):
+        self.limits.append(limit)
+        return self.history[:limit]
+
+TODAY = date(2025, 10, 15)
+
+def _sync(monkeypatch, tmp_path, stored, history):
+    fmp = _FakeFMP(history)
+    monkeypatch.setattr(statement_store, "_fetch", fmp)
+    monkeypatch.setattr(statement_store, "periods_due", lambda latest, period: periods_due(latest, period, TODAY))
+    store = StatementStore(str(tmp_path))
+    store.write("AAPL", "income-statement", "annual", to_array(stored))
+    array = asyncio.run(statement_store.load_statement_array(
+        "income-statement", "AAPL", "annual", limit=len(stored), mode="sync", store=store, max_age=0))
+    return fmp, store, to_records(store.read("AAPL", "income-statement", "annual")), to_records(array)
+
+def test_sync_fetches_only_new_periods(monkeypatch, tmp_path):
+    year = TODAY.year
+    stored = [_annual(year - 2, 2), _annual(year - 3, 1)]
+    history = [_annual(year - 1, 3), {**stored[0], "revenue": 20}, *stored[1:]]
+    fmp, store, merged, served = _sync(monkeypatch, tmp_path, stored, history)
+    assert fmp.limits == [2] # One new period plus the stored latest as overlap
+    assert merged == history # The overlapping period is replaced by the fetched one
+    assert served == history[:2]
+    assert store.stats["delta_fetches"] == 1
+
+def test_sync_refetches_history_without_overlap(monkeypatch, tmp_path):
+    year = TODAY.year
+    stored = [_annual(year - 3, 1)]
+    # A fiscal calendar change added a period, so due + 1 periods don't reach back to the stored one
+    history = [_annual(year - 1, 4), {**_annual(year - 1, 3), "date": f"{year - 1}-06-30"}, _annual(year - 2, 2),
+               *stored]
+    fmp, _, merged, _ = _sync(monkeypatch, tmp_path, stored, history)
+    assert fmp.limits == [3, 3] # Two periods due plus the overlap, then len(stored) + due to close the gap
+    assert merged == history
+
+def test_sync_skips_while_no_period_can_have_ended(monkeypatch, tmp_path):
+    stored = [{"date": "2025-06-30", "revenue": 1}]
+    fmp, store, merged, _ = _sync(monkeypatch, tmp_path, stored, [])
+    assert fmp.limits == [] and merged == stored
+    assert store.stats["sync_skips"] == 1
+
+@pytest.mark.parametrize("ticker, period", [("../../../tmp/x", "annual"), ("..", "annual"), ("AAPL/../X", "annual"),
+                                            ("", "annual"), ("AAPL", "../annual"), ("AAPL", "monthly")])
+def test_paths_outside_the_store_are_rejected(tmp_path, ticker, period):
+    store = StatementStore(str(tmp_path / "store"))
+    with pytest.raises(ValueError):
+        store.write(ticker, "income-statement", period, to_array(PERIODS))
+    with pytest.raises(ValueError):
+        asyncio.run(statement_store.load_statement_array("income-statement", ticker, period, mode="prefer",
+                                                         store=store))
+    assert list(tmp_path.rglob("*.npy")) == []
+
+def test_symbols_with_punctuation_are_stored(tmp_path):
+    store = StatementStore(str(tmp_path))
+    for ticker in ("BRK.B", "^GSPC", "BF-B"):
+        store.write(ticker, "income-statement", "quarter", to_array(PERIODS))
+    assert store.tickers("income-statement", "quarter") == ["BF-B", "BRK.B", "^GSPC"]
+    assert store.tickers("../income-statement", "quarter") == []
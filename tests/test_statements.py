@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+import pytest
+
+from backend.utils.statements import StatementTable, cagr, financial_history, growth, safe_divide, to_list
+
+INCOME = [
+    {"date": "2022-09-24", "period": "FY", "symbol": "AAPL", "revenue": 100, "netIncome": 20, "grossProfit": 40,
+     "operatingIncome": 30, "eps": 1.0},
+    {"date": "2024-09-28", "period": "FY", "symbol": "AAPL", "revenue": 121, "netIncome": -5, "grossProfit": 50,
+     "operatingIncome": None, "eps": 1.5},
+    {"date": "2023-09-30", "period": "FY", "symbol": "AAPL", "revenue": 110, "netIncome": 10, "grossProfit": 45,
+     "operatingIncome": 33, "eps": 1.2},
+]
+BALANCE = [
+    {"date": "2024-09-28", "totalAssets": 400, "totalStockholdersEquity": 0, "totalDebt": 100,
+     "totalLiabilities": 400, "totalCurrentAssets": 60, "totalCurrentLiabilities": 30},
+    {"date": "2022-09-24", "totalAssets": 300, "totalStockholdersEquity": 100, "totalDebt": 50,
+     "totalLiabilities": 200, "totalCurrentAssets": 50, "totalCurrentLiabilities": 0},
+]
+
+def test_from_records_sorts_newest_first_and_skips_non_numeric_fields():
+    table = StatementTable.from_records(INCOME + [{"revenue": 1}, "junk"])
+    assert table.dates == ["2024-09-28", "2023-09-30", "2022-09-24"]
+    assert table.fields == ["revenue", "netIncome", "grossProfit", "eps", "operatingIncome"] # First numeric use
+    assert table.column("revenue").tolist() == [121.0, 110.0, 100.0]
+    assert np.isnan(table.column("operatingIncome")[0]) # None is NaN
+    assert np.isnan(table.column("freeCashFlow")).all() and len(table.column("freeCashFlow")) == 3
+    assert not table.is_quarterly and len(table) == 3
+    assert table.nbytes == 3 * 5 * 8
+
+def test_from_records_with_explicit_fields_and_quarters():
+    records = [{"date": "2024-06-29", "period": "Q3", "revenue": "n/a", "eps": True},
+               {"date": "2024-03-30", "period": "Q2", "revenue": 90.5}]
+    table = StatementTable.from_records(records, fields=["revenue", "eps"])
+    assert table.is_quarterly
+    assert np.isnan(table.values[0]).all() and table.values[1, 0] == 90.5 # Strings and booleans are NaN
+
+def test_empty_table():
+    table = StatementTable.from_records([])
+    assert len(table) == 0 and table.fields == [] and table.values.shape == (0, 0)
+    assert len(table.column("revenue")) == 0
+
+def test_align_keeps_shared_dates_in_order():
+    income, balance = StatementTable.from_records(INCOME).align(StatementTable.from_records(BALANCE))
+    assert income.dates == balance.dates == ["2024-09-28", "2022-09-24"]
+    assert income.column("revenue").tolist() == [121.0, 100.0]
+    assert balance.column("totalAssets").tolist() == [400.0, 300.0]
+
+def test_safe_divide_is_nan_for_zero_or_missing_denominators():
+    out = safe_divide(np.array([1.0, 1.0, np.nan, 6.0]), np.array([0.0, np.nan, 2.0, 3.0]))
+    assert np.isnan(out[:3]).all() and out[3] == 2.0
+
+def test_growth():
+    values = np.array([121.0, 110.0, 100.0])
+    assert np.allclose(growth(values)[:2], [0.1, 0.1]) and np.isnan(growth(values)[2])
+    assert growth(values, lag=2)[0] == pytest.approx(0.21)
+    assert np.isnan(growth(values, lag=3)).all() and np.isnan(growth(values, lag=0)).all()
+    assert np.isnan(growth(np.array([5.0]))).all() # A single period
+
+def test_growth_against_zero_or_negative_base_is_nan():
+    out = growth(np.array([10.0, -5.0, 0.0, np.nan, 4.0]))
+    assert np.isnan(out[:3]).all() # Bases -5, 0 and NaN
+    assert np.isnan(out[3]) and np.isnan(out[4])
+    assert growth(np.array([-2.0, 4.0]))[0] == pytest.approx(-1.5) # A negative current value is fine
+
+def test_cagr():
+    dates = ["2024-09-28", "2023-09-30", "2022-09-24"]
+    assert cagr(np.array([121.0, 110.0, 100.0]), dates) == pytest.approx(1.21 ** (365.25 / 735) - 1)
+    # Missing ends are skipped; the span comes from the dates that have values
+    assert cagr(np.array([np.nan, 110.0, 100.0]), dates) == pytest.approx(1.1 ** (365.25 / 371) - 1)
+
+@pytest.mark.parametrize("values", [[121.0, 110.0, -100.0], [0.0, 110.0, 100.0], [121.0, np.nan, np.nan], [5.0]])
+def test_cagr_without_a_meaningful_answer(values):
+    assert cagr(np.array(values), ["2024-09-28", "2023-09-30", "2022-09-24"][:len(values)]) is None
+
+def test_to_list_replaces_non_finite_values():
+    assert to_list(np.array([0.1234567, np.nan, np.inf])) == [0.123457, None, None]
+
+def test_financial_history():
+    history = financial_history(INCOME, BALANCE, [{"date": "2024-09-28", "freeCashFlow": 24.2,
+                                                   "operatingCashFlow": 30}])
+    assert history["periods"] == 3 and history["period_type"] == "annual"
+    income = history["income"]
+    assert income["dates"] == ["2024-09-28", "2023-09-30", "2022-09-24"]
+    assert income["revenue_growth_yoy"] == [0.1, 0.1, None]
+    assert income["net_income_growth_yoy"] == [-1.5, -0.5, None]
+    assert income["operating_margin"][0] is None and income["gross_margin"][2] == 0.4
+    balance = history["balance"]
+    assert balance["debt_to_equity"] == [None, 0.5] # Zero equity
+    assert balance["current_ratio"] == [2.0, None] # Zero current liabilities
+    assert history["returns"] == {"dates": ["2024-09-28", "2022-09-24"], "return_on_equity": [None, 0.2],
+                                  "return_on_assets": [-0.0125, 0.066667]}
+    assert history["cagr"]["net_income"] is None # Negative latest value
+    assert history["cagr"]["total_assets"] == pytest.approx((4 / 3) ** (365.25 / 735) - 1)
+    assert history["cash_flow"] == {"dates": ["2024-09-28"], "free_cash_flow_margin": [0.2],
+                                    "cash_conversion": [-6.0]}
+
+def test_financial_history_single_quarter_without_cash_flow():
+    history = financial_history([{"date": "2024-06-29", "period": "Q3", "revenue": 90}], [])
+    assert history["periods"] == 1 and history["period_type"] == "quarter"
+    assert history["income"]["revenue_growth_yoy"] == [None]
+    assert history["balance"]["dates"] == [] and history["returns"]["dates"] == []
+    assert all(value is None for value in history["cagr"].values())
+    assert "cash_flow" not in history
+    assert not any(isinstance(v, float) and math.isnan(v) for v in history["income"]["net_margin"])
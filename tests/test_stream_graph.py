@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api.routes import stream_graph
+from backend.core import graph_runner
+from backend.core.events import emit, reset_event_sink, set_event_sink
+
+def sleepy_node(params):
+    """Test node factory: sleeps, streams its "tokens", then writes them under its key."""
+    async def node(state):
+        await asyncio.sleep(params.get("sleep", 0))
+        if params.get("raise"):
+            raise RuntimeError(params["raise"])
+        if params.get("fail"):
+            return {"errors": [params["fail"]]}
+        key = params.get("key", "income_summary")
+        for text in params.get("tokens", []):
+            emit("token", {"key": key, "text": text})
+            await asyncio.sleep(0)
+        return {key: "".join(params.get("tokens", [])) or "ok"}
+    return node
+
+@pytest.fixture
+def client(monkeypatch):
+    mapping = {**graph_runner.NODE_TYPE_MAPPING, "StreamSleepy": (__name__, "sleepy_node")}
+    monkeypatch.setattr(graph_runner, "NODE_TYPE_MAPPING", mapping)
+    app = FastAPI()
+    app.include_router(stream_graph.router, prefix="/api")
+    return TestClient(app)
+
+def _spec(nodes, edges=()):
+    return {"nodes": [{"id": node_id, "type": "StreamSleepy", "params": params} for node_id, params in nodes],
+            "edges": [{"from_": source, "to": target} for source, target in edges]}
+
+def _events(client, spec):
+    response = client.post("/api/execute-graph/stream", json=spec)
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_node_wrapper_times_the_node_itself():
+    events = []
+    node = graph_runner._parametrized_node("load", "StreamSleepy", sleepy_node)
+
+    async def main():
+        token = set_event_sink(lambda event, data: events.append((event, data)))
+        try:
+            return await node({"node_params": {"load": {"sleep": 0.05, "fail": "load: no data"}}})
+        finally:
+            reset_event_sink(token)
+
+    assert asyncio.run(main()) == {"errors": ["load: no data"]}
+    (start_event, start), (end_event, end) = events
+    assert (start_event, end_event) == ("node_start", "node_end")
+    assert start["node"] == end["node"] == "load"
+    assert 50 <= end["duration_ms"] < 500
+    assert end["finished_at"] - start["started_at"] >= 0.05
+
+def test_node_finish_reports_the_time_spent_in_the_node(client):
+    # Both roots run in one step; the fast one's update can reach the stream only after the slow one is done
+    events = _events(client, _spec([("fast", {"sleep": 0.02, "key": "income_summary"}),
+                                    ("slow", {"sleep": 0.3, "key": "markdown_report"})]))
+    finished = {data["node"]: data for event, data in events if event == "node_finish"}
+    started = {data["node"]: data for event, data in events if event == "node_start"}
+    assert 20 <= finished["fast"]["duration_ms"] < 200
+    assert finished["slow"]["duration_ms"] >= 300
+    for node_id in ("fast", "slow"):
+        assert finished[node_id]["finished_at"] >= started[node_id]["started_at"]
+    assert "node_end" not in {event for event, _ in events}
+
+def _positions(events):
+    """(event, node) -> index of its first occurrence."""
+    positions = {}
+    for i, (event, data) in enumerate(events):
+        positions.setdefault((event, data.get("node")), i)
+    return positions
+
+def test_events_follow_the_graph(client):
+    spec = _spec([("income", {"key": "income_summary"}), ("balance", {"key": "processed_financials", "sleep": 0.02}),
+                  ("report", {"key": "markdown_report", "tokens": ["Revenue ", "grew ", "10%."]})],
+                 [("income", "report"), ("balance", "report")])
+    events = _events(client, spec)
+    assert events[0] == ("start", {"nodes": ["income", "balance", "report"]})
+    assert events[-1][0] == "result"
+    assert events[-1][1]["markdown_report"] == "Revenue grew 10%." and "node_params" not in events[-1][1]
+    at = _positions(events)
+    for node_id in ("income", "balance", "report"):
+        assert at[("node_start", node_id)] < at[("node_finish", node_id)]
+    # The joined node starts only after both parents have finished
+    assert at[("node_start", "report")] > max(at[("node_finish", "income")], at[("node_finish", "balance")])
+    tokens = [(i, data) for i, (event, data) in enumerate(events) if event == "token"]
+    assert [data["text"] for _, data in tokens] == ["Revenue ", "grew ", "10%."]
+    assert all(data["node"] == "report" and data["key"] == "markdown_report" for _, data in tokens)
+    assert all(at[("node_start", "report")] < i < at[("node_finish", "report")] for i, _ in tokens)
+    finish = events[at[("node_finish", "report")]][1]
+    assert finish["delta"] == {"markdown_report": "Revenue grew 10%."}
+
+def test_node_errors_stream_like_any_update(client):
+    events = _events(client, _spec([("load", {"fail": "load: no data"})]))
+    assert [event for event, _ in events] == ["start", "node_start", "node_finish", "result"]
+    assert events[2][1]["delta"] == {"errors": ["load: no data"]}
+    assert events[3][1]["errors"] == ["load: no data"]
+
+def test_unexpected_failure_ends_the_stream_with_an_error_event(client):
+    events = _events(client, _spec([("load", {"raise": "boom"})]))
+    assert [event for event, _ in events] == ["start", "node_start", "error"]
+    assert "boom" in events[-1][1]["detail"]
+
+def test_invalid_graph_is_rejected_before_streaming(client):
+    response = client.post("/api/execute-graph/stream",
+                           json={"nodes": [{"id": "x", "type": "NoSuchNode"}], "edges": []})
+    assert response.status_code == 400